@@ -0,0 +1,84 @@
+"""
+    benchmarks/bench_corpuspack.py
+
+    Benchmarks of a regex scan over all texts, through the ORM and through the corpus pack, and of
+    counting phrases on the token streams of the corpus pack.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import re
+
+from pathlib import Path
+
+import pytest
+
+from rechtspraak.corpuspack import CorpusPack, build_corpus_pack
+from rechtspraak.models import Uitspraak
+
+PATTERN = r"(kinderopvangtoeslag|toeslag)"
+
+PHRASES = ["kinderopvangtoeslag", "toeslag", "artikel 20 grondwet"]
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(scope="module")
+def corpus_pack(loaded_corpus: int, django_db_blocker: pytest.FixtureRequest, tmp_path_factory: pytest.TempPathFactory) -> Path:
+    directory = tmp_path_factory.mktemp("corpuspack")
+    with django_db_blocker.unblock():
+        build_corpus_pack(directory)
+    return directory
+
+
+@pytest.fixture(scope="module")
+def token_pack(loaded_corpus: int, django_db_blocker: pytest.FixtureRequest, tmp_path_factory: pytest.TempPathFactory) -> Path:
+    directory = tmp_path_factory.mktemp("tokenpack")
+    with django_db_blocker.unblock():
+        build_corpus_pack(directory, tokens=True)
+    return directory
+
+
+def test_build_corpus_pack(benchmark, loaded_corpus: int, tmp_path: Path) -> None:
+    benchmark.pedantic(build_corpus_pack, args=(tmp_path,), kwargs={"full": True}, rounds=3, iterations=1)
+
+
+def test_scan_orm(benchmark, loaded_corpus: int) -> None:
+    pattern = re.compile(PATTERN)
+
+    def scan() -> int:
+        return sum(1 for uitspraak in Uitspraak.objects.only("id", "tekst").iterator() if pattern.findall(uitspraak.tekst))
+
+    benchmark.pedantic(scan, rounds=3, iterations=1)
+
+
+@pytest.mark.parametrize("pattern", [PATTERN, PATTERN.encode("utf-8")], ids=["str", "bytes"])
+def test_scan_corpus_pack(benchmark, corpus_pack: Path, pattern) -> None:
+    with CorpusPack.open(corpus_pack) as pack:
+        benchmark.pedantic(lambda: sum(1 for _match in pack.scan(pattern)), rounds=3, iterations=1)
+
+
+def test_build_corpus_pack_with_tokens(benchmark, loaded_corpus: int, tmp_path: Path) -> None:
+    benchmark.pedantic(build_corpus_pack, args=(tmp_path,), kwargs={"full": True, "tokens": True}, rounds=3, iterations=1)
+
+
+def test_phrase_counts_regex(benchmark, corpus_pack: Path) -> None:
+    patterns = [re.compile(r"\b" + r"\W+".join(phrase.split()) + r"\b", re.IGNORECASE) for phrase in PHRASES]
+
+    def count() -> int:
+        with CorpusPack.open(corpus_pack) as pack:
+            return sum(1 for _id, tekst in pack.texts() for pattern in patterns if pattern.search(tekst))
+
+    benchmark.pedantic(count, rounds=3, iterations=1)
+
+
+def test_phrase_counts_tokens(benchmark, token_pack: Path) -> None:
+    def count() -> int:
+        with CorpusPack.open(token_pack) as pack:
+            return sum(len(counts) for _id, counts in pack.phrase_counts(PHRASES))
+
+    benchmark.pedantic(count, rounds=3, iterations=1)
@@ -0,0 +1,68 @@
+"""
+    benchmarks/bench_experiments.py
+
+    Benchmarks of the experiments, on the synthetic corpus.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import pytest
+
+from django.core.management import call_command
+
+from benchmarks.conftest import INSTANTIE_TYPE
+from rechtspraak.citations import parse_citations
+from rechtspraak.synthetic import CorpusConfig, generate_corpus
+from rechtspraak.utils import parse_uitspraak_xml
+
+# The number of uitspraken to parse the citations of outside the slow benchmarks
+CITATION_SAMPLE_SIZE = 5
+
+pytestmark = pytest.mark.django_db
+
+
+def test_keyword_search(benchmark, loaded_corpus: int) -> None:
+    benchmark.pedantic(
+        call_command,
+        args=("experiment_keyword_search", INSTANTIE_TYPE, r"(kinderopvangtoeslag|toeslag)"),
+        kwargs={"conditional_search_pattern": r"(grondwet\w*|bestaanszekerheid)", "experiment_name": "benchmark"},
+        rounds=3,
+        iterations=1
+    )
+
+
+def test_sociale_grondrechten(benchmark, loaded_corpus: int) -> None:
+    benchmark.pedantic(
+        call_command,
+        args=("experiment_sociale_grondrechten", INSTANTIE_TYPE),
+        kwargs={"experiment_name": "benchmark"},
+        rounds=3,
+        iterations=1
+    )
+
+
+def test_parse_citations(benchmark) -> None:
+    texts = [parse_uitspraak_xml(xml, ecli).tekst for ecli, xml in generate_corpus(CITATION_SAMPLE_SIZE, CorpusConfig(seed=4))]
+
+    def parse_all() -> None:
+        for tekst in texts:
+            parse_citations.func(tekst)
+
+    benchmark.pedantic(parse_all, rounds=1, iterations=1)
+
+
+@pytest.mark.slow
+def test_kamerstukcitations(benchmark, loaded_corpus: int) -> None:
+    # The uitspraken of one year, which are not in the results of the citation_results fixture
+    benchmark.pedantic(
+        call_command,
+        args=("experiment_kamerstukcitations", INSTANTIE_TYPE),
+        kwargs={"year": CorpusConfig().last_year},
+        setup=parse_citations.forget,
+        rounds=1,
+        iterations=1
+    )
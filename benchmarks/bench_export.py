@@ -0,0 +1,57 @@
+"""
+    benchmarks/bench_export.py
+
+    Benchmarks of the export commands, on the results of the experiments on the synthetic corpus.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+from pathlib import Path
+
+import pytest
+
+from django.core.management import call_command
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def in_tmp_path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """The JSON exports write to the working directory"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.mark.parametrize("export_format", ["json", "ndjson"])
+def test_sociale_grondrechten_export(benchmark, sociale_grondrechten_results: str, in_tmp_path: Path, export_format: str) -> None:
+    benchmark.pedantic(call_command, args=("experiment_sociale_grondrechten_export",), kwargs={"format": export_format}, rounds=3, iterations=1)
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("export_format", ["json", "ndjson"])
+def test_kamerstukcitations_export(benchmark, citation_results: str, in_tmp_path: Path, export_format: str) -> None:
+    benchmark.pedantic(call_command, args=("experiment_kamerstukcitations_export",), kwargs={"format": export_format}, rounds=3, iterations=1)
+
+
+def test_export_csv(benchmark, sociale_grondrechten_results: str, in_tmp_path: Path) -> None:
+    benchmark.pedantic(
+        call_command,
+        args=("export_csv", sociale_grondrechten_results, str(in_tmp_path / "export.csv")),
+        rounds=3,
+        iterations=1
+    )
+
+
+def test_export_parquet(benchmark, sociale_grondrechten_results: str, in_tmp_path: Path) -> None:
+    pytest.importorskip("pyarrow")
+    benchmark.pedantic(
+        call_command,
+        args=("export_parquet", str(in_tmp_path / "parquet")),
+        kwargs={"experiment_id": [sociale_grondrechten_results]},
+        rounds=3,
+        iterations=1
+    )
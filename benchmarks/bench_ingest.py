@@ -0,0 +1,58 @@
+"""
+    benchmarks/bench_ingest.py
+
+    Benchmarks of reading uitspraken from XML into the database.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+from pathlib import Path
+
+import pytest
+
+from django.core.management import call_command
+
+from rechtspraak.synthetic import CorpusConfig, generate_corpus, write_corpus
+from rechtspraak.utils import create_uitspraak_from_xmlstring, parse_uitspraak_xml
+
+# Documents to ingest get numbers that are not in the loaded corpus
+FIRST_NEW_NUMBER = 10_000_000
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(scope="module")
+def documents() -> list[tuple[str, str]]:
+    return list(generate_corpus(100, CorpusConfig(seed=2, first_number=FIRST_NEW_NUMBER)))
+
+
+@pytest.fixture(scope="module")
+def import_dir(tmp_path_factory: pytest.TempPathFactory, scale: int) -> Path:
+    directory = tmp_path_factory.mktemp("import")
+    write_corpus(directory, max(100, scale // 100), CorpusConfig(seed=3, first_number=FIRST_NEW_NUMBER))
+    return directory
+
+
+def test_parse_uitspraak_xml(benchmark, documents: list[tuple[str, str]]) -> None:
+    def parse_all() -> None:
+        for ecli, xml in documents:
+            parse_uitspraak_xml(xml, ecli)
+
+    benchmark(parse_all)
+
+
+def test_create_uitspraak_from_xmlstring(benchmark, loaded_corpus: int, documents: list[tuple[str, str]]) -> None:
+    # The first round inserts the uitspraken, the following rounds update them
+    def create_all() -> None:
+        for ecli, xml in documents:
+            create_uitspraak_from_xmlstring(xml, ecli)
+
+    benchmark(create_all)
+
+
+def test_create_uitspraak_from_xml_directory(benchmark, loaded_corpus: int, import_dir: Path) -> None:
+    benchmark.pedantic(call_command, args=("create_uitspraak_from_xml", str(import_dir)), rounds=3, iterations=1)
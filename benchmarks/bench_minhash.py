@@ -0,0 +1,26 @@
+"""
+    benchmarks/bench_minhash.py
+
+    Benchmarks of computing the MinHash signatures of all uitspraken, and of clustering them.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import pytest
+
+from rechtspraak.minhash import cluster_signatures, update_signatures
+
+pytestmark = pytest.mark.django_db
+
+
+def test_update_signatures(benchmark, loaded_corpus: int) -> None:
+    benchmark.pedantic(update_signatures, kwargs={"full": True}, rounds=3, iterations=1)
+
+
+def test_cluster_signatures(benchmark, loaded_corpus: int) -> None:
+    update_signatures()
+    benchmark.pedantic(cluster_signatures, rounds=3, iterations=1)
@@ -0,0 +1,40 @@
+"""
+    benchmarks/bench_startup.py
+
+    Benchmarks of the startup time of the management commands, measured as the time of --help in
+    a new process: importing Django, the command and its dependencies, and constructing the parser.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import subprocess
+import sys
+
+from pathlib import Path
+
+import pytest
+
+MANAGE_PY = Path(__file__).resolve().parent.parent / "manage.py"
+
+COMMANDS = [
+    "help",
+    "experiment_kamerstukcitations",
+    "experiment_keyword_search",
+    "download_uitspraken_for_instantie_since",
+    "create_instanties",
+    "export_parquet",
+]
+
+
+def run_help(command: str) -> None:
+    args = [sys.executable, str(MANAGE_PY), command] if command == "help" else [sys.executable, str(MANAGE_PY), command, "--help"]
+    subprocess.run(args, check=True, stdout=subprocess.DEVNULL, cwd=MANAGE_PY.parent)
+
+
+@pytest.mark.parametrize("command", COMMANDS)
+def test_startup(benchmark, command: str) -> None:
+    benchmark.pedantic(run_help, args=(command,), rounds=5, iterations=1, warmup_rounds=1)
@@ -0,0 +1,131 @@
+"""
+    benchmarks/conftest.py
+
+    Fixtures for the benchmarks: a synthetic corpus of --scale uitspraken, loaded once per session
+    into the test database, together with the results of the experiments the exports need.
+
+    Parsing citations takes in the order of ten seconds for an uitspraak of average length, so the
+    benchmarks that parse the citations of the whole corpus are marked slow, and only run with
+    --run-slow.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import logging
+
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+
+from rechtspraak.bulkload import bulk_load
+from rechtspraak.models import Uitspraak
+from rechtspraak.synthetic import CorpusConfig, create_synthetic_labels, write_corpus
+from rechtspraak.utils import create_uitspraak_from_xmlstring, parse_uitspraak_xml
+
+SEED = 1
+
+# The instantie type the experiments are benchmarked on; about 40% of the synthetic uitspraken
+INSTANTIE_TYPE = "Rechtbank"
+
+# The experiment ids the export commands expect
+SOCIALE_GRONDRECHTEN_EXPERIMENT_ID = "socialegrondrechten_all"
+CITATIONS_EXPERIMENT_ID = "citations_all_1"
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption("--run-slow", action="store_true", help="Also run the slow benchmarks, e.g. parsing the citations of the whole corpus")
+    parser.addoption("--scale", type=int, default=1000, help="The number of synthetic uitspraken to benchmark with, e.g. 1000, 100000 or 1000000")
+    parser.addoption(
+        "--corpus-dir",
+        type=str,
+        default=None,
+        help="Keep the synthetic corpus in this directory, so it is only generated once per scale"
+    )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    config.addinivalue_line("markers", "slow: benchmarks that take long, only run with --run-slow")
+
+
+def pytest_collection_modifyitems(config: pytest.Config, items: list[pytest.Item]) -> None:
+    if config.getoption("--run-slow"):
+        return
+
+    skip_slow = pytest.mark.skip(reason="slow, run with --run-slow")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip_slow)
+
+
+@pytest.fixture(scope="session")
+def scale(request: pytest.FixtureRequest) -> int:
+    return request.config.getoption("--scale")
+
+
+@pytest.fixture(scope="session")
+def corpus_dir(request: pytest.FixtureRequest, tmp_path_factory: pytest.TempPathFactory, scale: int) -> Path:
+    """A directory with the synthetic corpus"""
+    base = request.config.getoption("--corpus-dir")
+    base_dir = Path(base) if base is not None else tmp_path_factory.mktemp("corpus")
+    directory = base_dir / f"seed{SEED}_{scale}"
+
+    if not directory.is_dir() or sum(1 for _path in directory.glob("*.xml")) < scale:
+        write_corpus(directory, scale, CorpusConfig(seed=SEED))
+
+    return directory
+
+
+@pytest.fixture(scope="session", autouse=True)
+def benchmark_environment() -> Iterator[None]:
+    """No file cache and no logging, which would otherwise dominate some of the benchmarks"""
+    logging.disable(logging.INFO)
+
+    with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}):
+        yield
+
+    logging.disable(logging.NOTSET)
+
+
+@pytest.fixture(scope="session")
+def loaded_corpus(django_db_setup: None, django_db_blocker: pytest.FixtureRequest, corpus_dir: Path, scale: int) -> int:
+    """The synthetic corpus, loaded into the test database; returns the number of uitspraken"""
+    paths = sorted(corpus_dir.glob("*.xml"))[:scale]
+
+    with django_db_blocker.unblock():
+        create_synthetic_labels()
+
+        if Uitspraak.objects.count() < len(paths):
+            if connection.vendor == "postgresql":
+                bulk_load(parse_uitspraak_xml(path.read_text(encoding="utf-8"), str(path)) for path in paths)
+            else:
+                for path in paths:
+                    create_uitspraak_from_xmlstring(path.read_text(encoding="utf-8"), str(path))
+
+        return Uitspraak.objects.count()
+
+
+@pytest.fixture(scope="session")
+def sociale_grondrechten_results(loaded_corpus: int, django_db_blocker: pytest.FixtureRequest) -> str:
+    """The results of experiment_sociale_grondrechten on the corpus; returns the experiment id"""
+    with django_db_blocker.unblock():
+        call_command("experiment_sociale_grondrechten", INSTANTIE_TYPE, experiment_name="socialegrondrechten")
+
+    return SOCIALE_GRONDRECHTEN_EXPERIMENT_ID
+
+
+@pytest.fixture(scope="session")
+def citation_results(loaded_corpus: int, django_db_blocker: pytest.FixtureRequest) -> str:
+    """The results of experiment_kamerstukcitations on the corpus; returns the experiment id"""
+    with django_db_blocker.unblock():
+        call_command("experiment_kamerstukcitations", INSTANTIE_TYPE)
+
+    return CITATIONS_EXPERIMENT_ID
@@ -13,8 +13,14 @@ import django
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "uitspraken.settings")
 django.setup()
 
+from django.core.management import CommandError
+
+from rechtspraak.cache import bump_data_version
 from rechtspraak.models import Instantie, Uitspraak
+from rechtspraak.profiling import add_profiling_arguments, profiling, stage
+from rechtspraak.progress import progress
 from rechtspraak.utils import (
+    check_instantie_type,
     get_updated_eclis_for_instantie_since,
     create_uitspraak_from_ecli,
 )
@@ -24,19 +30,12 @@ logger = logging.getLogger(__name__)
 
 def parse_args() -> argparse.Namespace:
     """Parse command line arguments."""
-    instanties_types = list(
-        Instantie.objects.order_by("instantie_type")
-        .values_list("instantie_type", flat=True)
-        .distinct()
-    )
-
     parser = argparse.ArgumentParser(
         description="Crawl the Open Data Rechtspraak API for updated uitspraken"
     )
     parser.add_argument(
         "instantie_type",
-        choices=instanties_types,
-        help="The instantie type to crawl",
+        help="The instantie type to crawl, e.g. Rechtbank or HogeRaad",
     )
     parser.add_argument(
         "since",
@@ -48,12 +47,26 @@ def parse_args() -> argparse.Namespace:
         default=1.0,
         help="Delay between API requests in seconds (default: 1.0)",
     )
-    return parser.parse_args()
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        check_instantie_type(args.instantie_type)
+    except CommandError as exc:
+        parser.error(str(exc))
+
+    return args
 
 
 def main() -> None:
     args = parse_args()
 
+    with profiling(args.profile, args.sql_timing):
+        crawl(args)
+
+
+def crawl(args: argparse.Namespace) -> None:
+    """Crawl the uitspraken of the instantie type modified since the date given in args."""
     since_date = datetime.datetime.strptime(args.since, "%Y-%m-%d").date()
 
     instanties = Instantie.objects.filter(instantie_type=args.instantie_type)
@@ -67,19 +80,22 @@ def main() -> None:
 
     logger.info("Total ECLI's found: %s", len(all_eclis))
 
-    total = len(all_eclis)
-    for idx, ecli in enumerate(all_eclis, start=1):
-        logger.info("(%s/%s, %.2f%%) Fetching %s", idx, total, idx / total * 100, ecli)
-        try:
-            Uitspraak.objects.get(ecli=ecli)
-            logger.info("%s already exists, skipping", ecli)
-        except Uitspraak.DoesNotExist:
+    for ecli in progress(all_eclis, description="Crawl"):
+        logger.debug("Fetching %s", ecli)
+        with stage("lookup"):
+            exists = Uitspraak.objects.filter(ecli=ecli).exists()
+
+        if exists:
+            logger.debug("%s already exists, skipping", ecli)
+        else:
             try:
                 create_uitspraak_from_ecli(ecli)
             except Exception as exc:  # noqa: BLE001
                 logger.error("Failed to crawl %s: %s", ecli, exc)
             time.sleep(args.delay)
 
+    bump_data_version()
+
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
@@ -8,10 +8,137 @@
     SPDX-License-Identifier: EUPL-1.2
 """
 
+from typing import Any
+
 from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connection
+from django.db.models import Max, Q, QuerySet
+from django.http import HttpRequest
+from django.utils.functional import cached_property
 
 from rechtspraak.models import Uitspraak, Instantie, Rechtsgebied, ProcedureSoort
 
-# Register your models here.
-admin.site.register(Uitspraak)
-admin.site.register(Instantie)
+# Above this number of rows, the changelist shows an estimated count instead of an exact one
+EXACT_COUNT_LIMIT = 10000
+
+
+def estimated_count(queryset: QuerySet) -> int:
+    """A cheap estimate of the number of rows of the table of queryset, from the statistics of the database"""
+    table = queryset.model._meta.db_table
+
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+            elif connection.vendor == "mysql":
+                cursor.execute("SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s", [table])
+            elif connection.vendor == "sqlite":
+                # Only available after ANALYZE; the first number of every stat is the number of rows
+                cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+            else:
+                cursor.execute("SELECT NULL")
+            row = cursor.fetchone()
+    except DatabaseError:
+        row = None
+
+    if row is not None and row[0] is not None:
+        estimate = int(str(row[0]).split()[0])
+        if estimate > 0:
+            return estimate
+
+    # The largest id is an upper bound, found with a single lookup in the primary key index
+    return queryset.model.objects.aggregate(max_id=Max("id"))["max_id"] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that does not count all rows of large tables
+
+    Unfiltered lists get an estimate from the database statistics, filtered lists are counted up
+    to EXACT_COUNT_LIMIT rows. Once the requested page reaches that limit, filtered lists are
+    counted exactly, so the pages after it can be reached as well.
+    """
+
+    def __init__(self, *args: Any, requested_page: int = 1, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.requested_page = requested_page
+
+    @cached_property
+    def count(self) -> int:
+        if not self.object_list.query.where:
+            estimate = estimated_count(self.object_list)
+            if estimate > EXACT_COUNT_LIMIT:
+                return estimate
+
+        if self.requested_page * self.per_page >= EXACT_COUNT_LIMIT:
+            return self.object_list.count()
+
+        return self.object_list[:EXACT_COUNT_LIMIT].count()
+
+
+@admin.register(Uitspraak)
+class UitspraakAdmin(admin.ModelAdmin):
+    """Admin for uitspraken that stays responsive with millions of rows"""
+
+    list_display = ["ecli", "uitspraakdatum", "instantie", "uitspraak_type"]
+    list_select_related = ["instantie"]
+    list_filter = ["uitspraak_type", "instantie__instantie_type"]
+    search_fields = ["ecli", "zaaknummer"]
+    search_help_text = "Search for an exact ECLI or zaaknummer"
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    autocomplete_fields = ["instantie", "rechtsgebieden", "procedure_soorten"]
+    exclude = ["raw_xml", "data"]
+    readonly_fields = ["last_modified", "trigram_indexed"]
+
+    def get_paginator(
+        self, request: HttpRequest, queryset: QuerySet[Uitspraak], per_page: int, orphans: int = 0, allow_empty_first_page: bool = True
+    ) -> EstimatedCountPaginator:
+        try:
+            requested_page = int(request.GET.get(PAGE_VAR, 1))
+        except ValueError:
+            requested_page = 1
+
+        return self.paginator(queryset, per_page, orphans, allow_empty_first_page, requested_page=requested_page)
+
+    def get_queryset(self, request: HttpRequest) -> QuerySet[Uitspraak]:
+        # tekst and inhoudsindicatie are only loaded on the change form, raw_xml and data never
+        return super().get_queryset(request).select_related("instantie").defer("raw_xml", "data", "tekst", "inhoudsindicatie")
+
+    def get_search_results(self, request: HttpRequest, queryset: QuerySet[Uitspraak], search_term: str) -> tuple[QuerySet[Uitspraak], bool]:
+        # Exact lookups use the indexes on ecli and zaaknummer; a zaaknummer may contain spaces, so
+        # the search term is not split into words
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+
+        return queryset.filter(Q(ecli=search_term.upper()) | Q(zaaknummer=search_term)), False
+
+
+@admin.register(Instantie)
+class InstantieAdmin(admin.ModelAdmin):
+    """Admin for instanties"""
+
+    list_display = ["naam", "afkorting", "instantie_type", "begin_date", "end_date"]
+    list_filter = ["instantie_type"]
+    search_fields = ["naam", "afkorting"]
+    ordering = ["naam"]
+
+
+@admin.register(Rechtsgebied)
+class RechtsgebiedAdmin(admin.ModelAdmin):
+    """Admin for rechtsgebieden"""
+
+    search_fields = ["naam"]
+    ordering = ["naam"]
+
+
+@admin.register(ProcedureSoort)
+class ProcedureSoortAdmin(admin.ModelAdmin):
+    """Admin for procedure soorten"""
+
+    search_fields = ["naam"]
+    ordering = ["naam"]
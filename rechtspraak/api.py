@@ -0,0 +1,238 @@
+"""
+    rechtspraak/api.py
+
+    Queries and serialisation for the read-only JSON API (see views.py).
+
+    Lists are paginated with a keyset cursor on (uitspraakdatum, id) instead of OFFSET, so every
+    page is a single range scan on the uitspraakdatum index, no matter how deep it is. Only the
+    requested fields are loaded from the database.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import base64
+import binascii
+import datetime
+
+from typing import Any, Iterable, Iterator, Mapping, Optional
+
+from django.db.models import Prefetch, Q, QuerySet
+
+from rechtspraak.models import Instantie, ProcedureSoort, Rechtsgebied, Uitspraak
+
+# Fields that are columns of Uitspraak, and the fields that need a join or prefetch
+COLUMN_FIELDS = [
+    "ecli", "zaaknummer", "publicatiedatum", "uitspraakdatum", "uitspraak_type", "last_modified",
+    "inhoudsindicatie", "tekst"
+]
+INSTANTIE_FIELDS = {"instantie": "naam", "instantie_afkorting": "afkorting", "instantie_type": "instantie_type"}
+LABEL_FIELDS = {"rechtsgebieden": Rechtsgebied, "procedure_soorten": ProcedureSoort}
+FIELDS = COLUMN_FIELDS + list(INSTANTIE_FIELDS) + list(LABEL_FIELDS)
+
+DEFAULT_LIST_FIELDS = [
+    "ecli", "zaaknummer", "publicatiedatum", "uitspraakdatum", "uitspraak_type", "instantie", "instantie_type",
+    "rechtsgebieden", "procedure_soorten"
+]
+DEFAULT_DETAIL_FIELDS = [field for field in FIELDS if field != "instantie_afkorting"]
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# The number of ECLIs looked up per query by fetch_uitspraken, well below the limit on the number
+# of query parameters of SQLite
+FETCH_CHUNK_SIZE = 500
+
+
+class ApiError(ValueError):
+    """An invalid API request; the message is returned to the client"""
+
+
+def parse_fields(value: Optional[str], default: list[str]) -> list[str]:
+    """Parse a comma-separated fields parameter; the ecli is always included"""
+    if not value:
+        return default
+
+    fields = ["ecli"]
+    for field in value.split(","):
+        field = field.strip()
+        if field not in FIELDS:
+            raise ApiError(f"Unknown field {field}, choose from {', '.join(FIELDS)}")
+        if field not in fields:
+            fields.append(field)
+
+    return fields
+
+
+def select_fields(uitspraken: QuerySet[Uitspraak], fields: list[str]) -> QuerySet[Uitspraak]:
+    """Only load the columns, instantie and labels needed for fields"""
+    # Lookups by ECLI, the cursor and the Last-Modified header need ecli, uitspraakdatum and last_modified
+    only = ["id", "ecli", "uitspraakdatum", "last_modified"] + [field for field in fields if field in COLUMN_FIELDS]
+
+    instantie_fields = [INSTANTIE_FIELDS[field] for field in fields if field in INSTANTIE_FIELDS]
+    if instantie_fields:
+        uitspraken = uitspraken.select_related("instantie")
+        only += ["instantie"] + [f"instantie__{field}" for field in instantie_fields]
+
+    for field, model in LABEL_FIELDS.items():
+        if field in fields:
+            uitspraken = uitspraken.prefetch_related(Prefetch(field, queryset=model.objects.only("id", "naam")))
+
+    return uitspraken.only(*only)
+
+
+def serialize_uitspraak(uitspraak: Uitspraak, fields: list[str]) -> dict[str, Any]:
+    """The fields of an uitspraak as a JSON-serialisable dict"""
+    record: dict[str, Any] = {}
+
+    for field in fields:
+        if field in INSTANTIE_FIELDS:
+            value = getattr(uitspraak.instantie, INSTANTIE_FIELDS[field])
+        elif field in LABEL_FIELDS:
+            value = [label.naam for label in getattr(uitspraak, field).all()]
+        else:
+            value = getattr(uitspraak, field)
+
+        if isinstance(value, (datetime.date, datetime.datetime)):
+            value = value.isoformat()
+
+        record[field] = value
+
+    return record
+
+
+def _parse_date(name: str, value: str) -> datetime.date:
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError as exc:
+        raise ApiError(f"{name} must be a date like 2024-12-31") from exc
+
+
+def filter_uitspraken(params: Mapping[str, str]) -> QuerySet[Uitspraak]:
+    """Uitspraken filtered on the query parameters of a list request"""
+    uitspraken = Uitspraak.objects.all()
+
+    if params.get("instantie"):
+        # Either the full name or the abbreviation, e.g. HR
+        instanties = Instantie.objects.filter(Q(naam=params["instantie"]) | Q(afkorting=params["instantie"]))
+        uitspraken = uitspraken.filter(instantie__in=instanties)
+
+    if params.get("instantie_type"):
+        uitspraken = uitspraken.filter(instantie__instantie_type=params["instantie_type"])
+
+    if params.get("uitspraak_type"):
+        if params["uitspraak_type"] not in Uitspraak.UitspraakType.values:
+            raise ApiError(f"uitspraak_type must be one of {', '.join(Uitspraak.UitspraakType.values)}")
+        uitspraken = uitspraken.filter(uitspraak_type=params["uitspraak_type"])
+
+    if params.get("uitspraakdatum_from"):
+        uitspraken = uitspraken.filter(uitspraakdatum__gte=_parse_date("uitspraakdatum_from", params["uitspraakdatum_from"]))
+
+    if params.get("uitspraakdatum_to"):
+        uitspraken = uitspraken.filter(uitspraakdatum__lte=_parse_date("uitspraakdatum_to", params["uitspraakdatum_to"]))
+
+    # Filter through subqueries on the M2M tables instead of joins, so uitspraken are never duplicated
+    if params.get("rechtsgebied"):
+        through = Uitspraak.rechtsgebieden.through
+        uitspraken = uitspraken.filter(
+            id__in=through.objects.filter(rechtsgebied__naam=params["rechtsgebied"]).values("uitspraak_id")
+        )
+
+    if params.get("procedure"):
+        through = Uitspraak.procedure_soorten.through
+        uitspraken = uitspraken.filter(
+            id__in=through.objects.filter(proceduresoort__naam=params["procedure"]).values("uitspraak_id")
+        )
+
+    return uitspraken
+
+
+def encode_cursor(uitspraak: Uitspraak) -> str:
+    """An opaque cursor pointing just after uitspraak"""
+    position = f"{uitspraak.uitspraakdatum.isoformat()},{uitspraak.id}"
+    return base64.urlsafe_b64encode(position.encode("ascii")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime.date, int]:
+    """The (uitspraakdatum, id) encoded in a cursor"""
+    try:
+        position = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii")
+        uitspraakdatum, uitspraak_id = position.split(",")
+        return datetime.date.fromisoformat(uitspraakdatum), int(uitspraak_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise ApiError("Invalid cursor") from exc
+
+
+def parse_limit(value: Optional[str]) -> int:
+    """Parse the limit parameter of a list request"""
+    if not value:
+        return DEFAULT_LIMIT
+
+    try:
+        limit = int(value)
+    except ValueError as exc:
+        raise ApiError("limit must be an integer") from exc
+
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ApiError(f"limit must be between 1 and {MAX_LIMIT}")
+
+    return limit
+
+
+def page(uitspraken: QuerySet[Uitspraak], cursor: Optional[str], limit: int) -> tuple[list[Uitspraak], Optional[str]]:
+    """A page of at most limit uitspraken after cursor, and the cursor of the next page (None on the last page)"""
+    uitspraken = uitspraken.order_by("uitspraakdatum", "id")
+
+    if cursor:
+        uitspraakdatum, uitspraak_id = decode_cursor(cursor)
+        uitspraken = uitspraken.filter(
+            Q(uitspraakdatum__gt=uitspraakdatum) | Q(uitspraakdatum=uitspraakdatum, id__gt=uitspraak_id)
+        )
+
+    # Fetch one extra row to know whether there is a next page, without a COUNT query
+    results = list(uitspraken[:limit + 1])
+
+    if len(results) > limit:
+        results = results[:limit]
+        return results, encode_cursor(results[-1])
+
+    return results, None
+
+
+def fetch_uitspraken(
+    eclis: Iterable[str],
+    fields: Optional[list[str]] = None,
+    chunk_size: int = FETCH_CHUNK_SIZE
+) -> Iterator[tuple[str, Optional[Uitspraak]]]:
+    """Look up many uitspraken by ECLI, yielding (ecli, uitspraak) in the given order
+
+    The uitspraak is None for ECLIs that are not in the database. Duplicate ECLIs are only yielded
+    once. Every chunk of ECLIs is resolved with one query, plus one per label field (rechtsgebieden,
+    procedure_soorten) in fields; only the given fields are loaded, by default DEFAULT_LIST_FIELDS.
+    """
+    if fields is None:
+        fields = DEFAULT_LIST_FIELDS
+
+    chunk: list[str] = []
+    seen: set[str] = set()
+
+    def resolve() -> Iterator[tuple[str, Optional[Uitspraak]]]:
+        found = {uitspraak.ecli: uitspraak for uitspraak in select_fields(Uitspraak.objects.filter(ecli__in=chunk), fields)}
+        for ecli in chunk:
+            yield ecli, found.get(ecli)
+        chunk.clear()
+
+    for ecli in eclis:
+        if ecli in seen:
+            continue
+        seen.add(ecli)
+        chunk.append(ecli)
+
+        if len(chunk) >= chunk_size:
+            yield from resolve()
+
+    if chunk:
+        yield from resolve()
@@ -0,0 +1,311 @@
+"""
+    rechtspraak/blobstore.py
+
+    A content-addressed store for the raw XML of uitspraken, outside the database.
+
+    The raw XML is only needed to parse an uitspraak again, but it makes up most of the size of
+    the uitspraak table, which slows down backups, VACUUM and every scan of the table. With
+    RECHTSPRAAK_RAW_XML_STORE set, the raw XML is instead appended to large pack files in that
+    directory, and an uitspraak only keeps the SHA-256 hash of its raw XML (raw_xml_hash).
+
+    Every blob in a pack file is preceded by a header with its hash and length, so a pack file
+    describes itself. Once a pack file is full, a sorted index of its blobs (hash, offset, length)
+    is written next to it and a new pack file is started; the last pack file is indexed in memory
+    by reading its headers. Blobs are never changed or removed, and a blob that is already stored
+    is not stored again. Reads go through mmap and return a memoryview of the pack file, without
+    copying the blob.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import contextlib
+import hashlib
+import logging
+import mmap
+import os
+import re
+import struct
+
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover, not on Windows
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+# A new pack file is started once the current one is larger than this
+PACK_SIZE = 1 << 30
+
+# In a pack file, before every blob: its SHA-256 digest and length
+BLOB_HEADER = struct.Struct("<32sQ")
+# In an index file, sorted by digest: the digest, the offset of the blob in the pack file, and its length
+INDEX_ENTRY = struct.Struct("<32sQQ")
+
+PACK_NAME = re.compile(r"pack-(\d{6})\.pack")
+
+
+def blob_hash(data: bytes) -> str:
+    """The hash under which data is stored"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class _Pack:
+    """A pack file, with either its sorted index file or an in-memory index of its blobs"""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.index_path = path.with_suffix(".idx")
+        self.map: Optional[mmap.mmap] = None
+        self.index_map: Optional[mmap.mmap] = None
+        self.entries: dict[bytes, tuple[int, int]] = {}
+        self.scanned = 0
+        self._sealed = False
+
+    @property
+    def sealed(self) -> bool:
+        if not self._sealed:
+            self._sealed = self.index_path.exists()
+        return self._sealed
+
+    def find(self, digest: bytes) -> Optional[tuple[int, int]]:
+        """The offset and length of the blob with digest in this pack file, if it has it"""
+        if self.sealed:
+            return self._find_indexed(digest)
+
+        if digest not in self.entries:
+            # Another process may have added blobs since the last look
+            self.scan()
+        return self.entries.get(digest)
+
+    def _find_indexed(self, digest: bytes) -> Optional[tuple[int, int]]:
+        if self.index_map is None:
+            if self.index_path.stat().st_size == 0:
+                return None
+            with self.index_path.open("rb") as index_file:
+                self.index_map = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.entries.clear()
+
+        low, high = 0, len(self.index_map) // INDEX_ENTRY.size
+        while low < high:
+            middle = (low + high) // 2
+            entry_digest, offset, length = INDEX_ENTRY.unpack_from(self.index_map, middle * INDEX_ENTRY.size)
+            if entry_digest < digest:
+                low = middle + 1
+            elif entry_digest > digest:
+                high = middle
+            else:
+                return offset, length
+
+        return None
+
+    def scan(self) -> None:
+        """Add the blobs written since the last scan to the in-memory index"""
+        with self.path.open("rb") as pack_file:
+            size = os.fstat(pack_file.fileno()).st_size
+            pack_file.seek(self.scanned)
+
+            while self.scanned + BLOB_HEADER.size <= size:
+                digest, length = BLOB_HEADER.unpack(pack_file.read(BLOB_HEADER.size))
+                if self.scanned + BLOB_HEADER.size + length > size:
+                    # A blob that is still being written, or was cut off by a crash
+                    break
+
+                self.entries[digest] = (self.scanned + BLOB_HEADER.size, length)
+                self.scanned += BLOB_HEADER.size + length
+                pack_file.seek(self.scanned)
+
+    def read(self, offset: int, length: int) -> memoryview:
+        if self.map is None or offset + length > len(self.map):
+            # The pack file has grown since it was mapped
+            self.close()
+            with self.path.open("rb") as pack_file:
+                self.map = mmap.mmap(pack_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return memoryview(self.map)[offset:offset + length]
+
+    def write_index(self) -> None:
+        """Write the sorted index of this pack file, which seals it"""
+        self.scan()
+        tmp_path = self.index_path.with_suffix(".idx.tmp")
+
+        with tmp_path.open("wb") as index_file:
+            for digest in sorted(self.entries):
+                index_file.write(INDEX_ENTRY.pack(digest, *self.entries[digest]))
+            index_file.flush()
+            os.fsync(index_file.fileno())
+
+        os.replace(tmp_path, self.index_path)
+
+    def close(self) -> None:
+        for current in [self.map, self.index_map]:
+            if current is not None:
+                with contextlib.suppress(BufferError):
+                    # Still in use by a memoryview that was handed out; closed when that is freed
+                    current.close()
+        self.map = None
+        self.index_map = None
+
+
+class PackStore:
+    """A directory of append-only pack files with blobs, addressed by the SHA-256 hash of their content"""
+
+    def __init__(self, directory: Union[str, Path], pack_size: int = PACK_SIZE) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.pack_size = pack_size
+        self.packs: dict[int, _Pack] = {}
+        self.write_fd: Optional[int] = None
+        self.write_number: Optional[int] = None
+        self._refresh()
+
+    def _refresh(self) -> None:
+        for entry in os.scandir(self.directory):
+            match = PACK_NAME.fullmatch(entry.name)
+            if match is not None and int(match.group(1)) not in self.packs:
+                self.packs[int(match.group(1))] = _Pack(Path(entry.path))
+
+    def _pack_path(self, number: int) -> Path:
+        return self.directory / f"pack-{number:06d}.pack"
+
+    def _locate(self, digest: bytes) -> Optional[tuple[_Pack, int, int]]:
+        # The newest pack files first, as they are the ones that are being written
+        for number in sorted(self.packs, reverse=True):
+            found = self.packs[number].find(digest)
+            if found is not None:
+                return self.packs[number], *found
+
+        return None
+
+    def __contains__(self, key: str) -> bool:
+        digest = bytes.fromhex(key)
+        if self._locate(digest) is None:
+            self._refresh()
+            return self._locate(digest) is not None
+        return True
+
+    def get(self, key: str) -> memoryview:
+        """The blob with hash key, as a read-only view on the pack file; raises KeyError if there is none"""
+        digest = bytes.fromhex(key)
+        found = self._locate(digest)
+        if found is None:
+            # Maybe in a pack file that another process started
+            self._refresh()
+            found = self._locate(digest)
+        if found is None:
+            raise KeyError(key)
+
+        pack, offset, length = found
+        return pack.read(offset, length)
+
+    def get_text(self, key: str) -> str:
+        """The blob with hash key, decoded as UTF-8"""
+        return str(self.get(key), "utf-8")
+
+    @contextlib.contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        with (self.directory / "lock").open("ab") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _open_for_writing(self) -> int:
+        if self.write_fd is not None and self.write_number is not None and not self.packs[self.write_number].sealed:
+            return self.write_fd
+
+        self.close_writer()
+        self._refresh()
+
+        number = max(self.packs, default=0)
+        if number == 0 or self.packs[number].sealed:
+            number += 1
+            self.packs[number] = _Pack(self._pack_path(number))
+
+        self.write_fd = os.open(self._pack_path(number), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self.write_number = number
+
+        # Cut off a blob that a crashed writer left incomplete, so the blobs after it can be found
+        pack = self.packs[number]
+        pack.scan()
+        if os.fstat(self.write_fd).st_size > pack.scanned:
+            logger.warning("Removing an incomplete blob from %s", pack.path)
+            os.ftruncate(self.write_fd, pack.scanned)
+
+        return self.write_fd
+
+    def put(self, data: Union[str, bytes]) -> str:
+        """Store data, unless it is already stored; returns its hash"""
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+
+        key = blob_hash(data)
+        digest = bytes.fromhex(key)
+
+        with self._write_lock():
+            if self._locate(digest) is not None:
+                return key
+
+            fd = self._open_for_writing()
+            os.write(fd, BLOB_HEADER.pack(digest, len(data)) + data)
+
+            if os.fstat(fd).st_size >= self.pack_size:
+                self.packs[self.write_number].write_index()
+                logger.info("Sealed pack file %s", self._pack_path(self.write_number))
+                self.close_writer()
+
+        return key
+
+    def flush(self) -> None:
+        """Make sure the blobs stored so far are on disk, e.g. before committing their hashes to the database"""
+        if self.write_fd is not None:
+            os.fsync(self.write_fd)
+
+    def close_writer(self) -> None:
+        if self.write_fd is not None:
+            os.fsync(self.write_fd)
+            os.close(self.write_fd)
+        self.write_fd = None
+        self.write_number = None
+
+    def close(self) -> None:
+        self.close_writer()
+        for pack in self.packs.values():
+            pack.close()
+
+
+_raw_xml_store: Optional[PackStore] = None
+
+
+def raw_xml_store() -> Optional[PackStore]:
+    """The store for raw XML configured with RECHTSPRAAK_RAW_XML_STORE, or None to keep the raw XML in the database"""
+    global _raw_xml_store  # pylint: disable=global-statement
+
+    directory = getattr(settings, "RECHTSPRAAK_RAW_XML_STORE", None)
+    if directory is None:
+        return None
+
+    if _raw_xml_store is None or _raw_xml_store.directory != Path(directory):
+        _raw_xml_store = PackStore(directory)
+
+    return _raw_xml_store
+
+
+def store_raw_xml(raw_xml: str) -> tuple[str, str]:
+    """Store raw XML in the raw XML store, if there is one; returns the values for raw_xml and raw_xml_hash of the uitspraak"""
+    store = raw_xml_store()
+    if store is None:
+        return raw_xml, ""
+
+    return "", store.put(raw_xml)
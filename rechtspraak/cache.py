@@ -0,0 +1,102 @@
+"""
+    rechtspraak/cache.py
+
+    Caching of API responses and reports with the Django cache framework.
+
+    Every cache key contains the current data version, a counter that is kept in the cache itself
+    and bumped (bump_data_version) once a command or batch has changed uitspraken or counts, not for
+    every single change: incr() of the file-based cache is not atomic, and every bump invalidates
+    all cached entries. Entries for an older data version are never read again and simply expire,
+    so nothing has to be deleted to invalidate.
+    For invalidation to reach the web server, the ingest commands and the web server must share the
+    cache, e.g. the file-based or Redis backend; see CACHES in settings.py.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import functools
+import hashlib
+import logging
+import time
+
+from typing import Any, Callable, Iterable, TypeVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse
+
+logger = logging.getLogger(__name__)
+
+DATA_VERSION_KEY = "rechtspraak:data_version"
+
+T = TypeVar("T")
+
+_MISSING = object()
+
+
+def data_version() -> int:
+    """The current data version"""
+    version = cache.get(DATA_VERSION_KEY)
+
+    if version is None:
+        # Start at the current time, so a data version that was evicted from the cache is never reused
+        cache.add(DATA_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(DATA_VERSION_KEY)
+
+    return version
+
+
+def bump_data_version() -> None:
+    """Invalidate all cached responses and reports, because the data has changed"""
+    try:
+        cache.incr(DATA_VERSION_KEY)
+    except ValueError:
+        # Not in the cache, so nothing was cached for the current data version yet
+        data_version()
+
+
+def cache_key(namespace: str, params: Iterable[tuple[str, Any]]) -> str:
+    """The key for namespace and params (in any order) at the current data version"""
+    digest = hashlib.sha256(repr(sorted(params)).encode("utf-8")).hexdigest()
+    return f"rechtspraak:{namespace}:{data_version()}:{digest}"
+
+
+def cached(namespace: str, params: Iterable[tuple[str, Any]], compute: Callable[[], T]) -> T:
+    """The cached result of compute for namespace and params, computing and caching it if needed"""
+    key = cache_key(namespace, params)
+    result = cache.get(key, _MISSING)
+
+    if result is _MISSING:
+        result = compute()
+        cache.set(key, result, timeout=settings.RECHTSPRAAK_CACHE_TIMEOUT)
+
+    return result
+
+
+def cache_response(namespace: str) -> Callable:
+    """Decorator for views that caches successful responses by path and query parameters"""
+
+    def decorator(view: Callable[..., HttpResponse]) -> Callable[..., HttpResponse]:
+
+        @functools.wraps(view)
+        def wrapper(request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+
+            key = cache_key(namespace, [("path", request.path)] + list(request.GET.lists()))
+            response = cache.get(key)
+
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200 and not response.streaming:
+                    cache.set(key, response, timeout=settings.RECHTSPRAAK_CACHE_TIMEOUT)
+
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,141 @@
+"""
+    rechtspraak/citations.py
+
+    Citation extraction from the tekst of uitspraken, using nllegalcit.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import re
+
+from importlib import metadata
+
+from django.db import transaction
+from django.db.models import Count, Q, QuerySet
+
+from rechtspraak.memo import memoize
+from rechtspraak.models import Citation, Uitspraak
+
+# A dossiernummer with an optional suffix, e.g. "35 300-VII", "35300 vii" or "21 501-20"
+DOSSIERNUMMER = re.compile(r"(?P<nummer>\d[\d\s.]*?)\s*(?:[-\u2010-\u2013]\s*(?P<suffix>[A-Za-z0-9]+)|(?P<letters>[A-Za-z]+))?")
+
+
+def nllegalcit_version() -> str:
+    """The installed version of nllegalcit"""
+    try:
+        return metadata.version("nllegalcit")
+    except metadata.PackageNotFoundError:
+        import nllegalcit  # pylint: disable=import-outside-toplevel
+        return getattr(nllegalcit, "__version__", "unknown")
+
+
+@memoize("nllegalcit.parse_citations", nllegalcit_version)
+def parse_citations(tekst: str) -> list[dict]:
+    """Parse all citations in a text, as a list of dicts as returned by nllegalcit"""
+    # Imported on first use, as importing nllegalcit takes a noticeable part of a second
+    import nllegalcit  # pylint: disable=import-outside-toplevel
+
+    return [cit.__dict__ for cit in nllegalcit.parse_citations(tekst)]
+
+
+def normalise_dossiernummer(dossiernummer: str) -> str:
+    """The dossiernummer of a kamerstuk in the form nllegalcit gives, e.g. "35300-VII" for "35 300 vii" """
+    dossiernummer = dossiernummer.strip()
+    match = DOSSIERNUMMER.fullmatch(dossiernummer)
+    if match is None:
+        return re.sub(r"\s+", "", dossiernummer).upper()
+
+    nummer = re.sub(r"[\s.]", "", match["nummer"])
+    suffix = match["suffix"] or match["letters"]
+    return f"{nummer}-{suffix.upper()}" if suffix else nummer
+
+
+def citation_type(citation: dict) -> str:
+    """Determine the Citation.CitationType of a citation as returned by parse_citations"""
+    if "dossiernummer" in citation:
+        return Citation.CitationType.KAMERSTUK
+    if "vergaderingnummer" in citation:
+        return Citation.CitationType.HANDELING
+    if "casenumber" in citation:
+        return Citation.CitationType.ECLI
+    if "code" in citation:
+        return Citation.CitationType.LJN
+    return Citation.CitationType.OTHER
+
+
+def citation_from_dict(uitspraak: Uitspraak, experiment_id: str, citation: dict) -> Citation:
+    """Create a (not yet saved) Citation from a citation as returned by parse_citations"""
+    cit_type = citation_type(citation)
+
+    ecli = ""
+    ljn = ""
+
+    if cit_type == Citation.CitationType.ECLI:
+        ecli = f"ECLI:{citation['country']}:{citation['court']}:{citation['year']}:{citation['casenumber']}"
+    elif cit_type == Citation.CitationType.LJN:
+        ljn = citation["code"]
+
+    return Citation(
+        uitspraak=uitspraak,
+        experiment_id=experiment_id,
+        citation_type=cit_type,
+        kamer=str(citation.get("kamer") or ""),
+        vergaderjaar=citation.get("vergaderjaar") or "",
+        dossiernummer=normalise_dossiernummer(citation.get("dossiernummer") or ""),
+        ondernummer=citation.get("ondernummer") or "",
+        paginaverwijzing=str(citation.get("paginaverwijzing") or ""),
+        ecli=ecli,
+        ljn=ljn,
+        matched_text=citation.get("matched_text") or "",
+        data=citation
+    )
+
+
+def store_citations(uitspraak: Uitspraak, experiment_id: str, citations: list[dict]) -> None:
+    """Replace the citations stored for an uitspraak in an experiment"""
+    with transaction.atomic():
+        Citation.objects.filter(uitspraak=uitspraak, experiment_id=experiment_id).delete()
+        Citation.objects.bulk_create(citation_from_dict(uitspraak, experiment_id, cit) for cit in citations)
+
+
+def uitspraken_citing_kamerstuk(dossiernummer: str, ondernummer: str | None = None) -> QuerySet[Uitspraak]:
+    """All uitspraken citing a kamerstuk, e.g. uitspraken_citing_kamerstuk("35 000 VII", "3")"""
+    citations = Citation.objects.filter(
+        citation_type=Citation.CitationType.KAMERSTUK,
+        dossiernummer=normalise_dossiernummer(dossiernummer)
+    )
+
+    if ondernummer is not None:
+        citations = citations.filter(ondernummer=ondernummer)
+
+    return Uitspraak.objects.filter(id__in=citations.values("uitspraak_id"))
+
+
+def kamerstuk_citation_counts(experiment_id: str) -> dict[str, int]:
+    """Aggregate counts on the citations found in an experiment, computed in a single query
+
+    Memories van toelichting are usually ondernummer 3 of a dossier; the count of those is thus
+    only an estimate.
+    """
+    is_kamerstuk = Q(citation_type=Citation.CitationType.KAMERSTUK)
+
+    return Citation.objects.filter(experiment_id=experiment_id).aggregate(
+        uitspraken_with_citations=Count("uitspraak", distinct=True),
+        uitspraken_with_kamerstuk_citations=Count("uitspraak", distinct=True, filter=is_kamerstuk),
+        kamerstuk_citations=Count("id", filter=is_kamerstuk),
+        kamerstuk_citations_probably_mvt=Count("id", filter=is_kamerstuk & Q(ondernummer="3"))
+    )
+
+
+def kamerstuk_citations_per_dossier(experiment_id: str) -> QuerySet:
+    """The number of citations and citing uitspraken per kamerstuk dossier, most cited first"""
+    return (
+        Citation.objects.filter(experiment_id=experiment_id, citation_type=Citation.CitationType.KAMERSTUK)
+        .values("dossiernummer")
+        .annotate(citations=Count("id"), uitspraken=Count("uitspraak", distinct=True))
+        .order_by("-citations")
+    )
@@ -0,0 +1,535 @@
+"""
+    rechtspraak/corpuspack.py
+
+    A packed copy of the tekst of all uitspraken, for fast scans over the whole corpus.
+
+    Reading the tekst of every uitspraak through the ORM costs more than running a regex over it.
+    Instead, build_corpus_pack writes all texts, encoded as UTF-8, one after the other into a
+    single file (texts.bin), with an index of arrays: per text the id of its uitspraak, its offset
+    and length in texts.bin, the uitspraakdatum (as an ordinal), the instantie and a checksum.
+    CorpusPack maps texts.bin into memory, and scan() runs a regex over the texts in place:
+
+        pack = CorpusPack.open()
+        for uitspraak_id, matches in pack.scan(rb"toeslag", since=datetime.date(2020, 1, 1)):
+            ...
+
+    Bytes patterns are matched on the mapped file without copying the texts; str patterns are
+    matched on the decoded text, as the experiments do.
+
+    The pack is updated incrementally: the uitspraken whose tekst changed since the last build
+    (Uitspraak.tekst_modified) are appended, and the index marks their older texts, and the texts
+    of deleted uitspraken, as no longer live. Once more than half of texts.bin is no longer live, the pack is rebuilt from scratch.
+
+    Optionally (build_corpus_pack --tokens), the pack also has the token streams of the texts: the
+    normalised tokens of every text (see rechtspraak/tokenstreams.py) as token ids in tokens.bin,
+    an array of unsigned 32-bit integers, with the tokens in vocabulary.txt. Counting phrases and
+    co-occurrences on the token streams, with phrase_counts(), cooccurrences() and collocations(),
+    does not need to tokenise or run a regex over the texts again:
+
+        counts = dict(pack.phrase_counts(["sociale grondrechten", "artikel 20 grondwet"]))
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import array
+import bisect
+import collections
+import datetime
+import functools
+import json
+import logging
+import mmap
+import os
+import re
+import zlib
+
+from pathlib import Path
+from typing import Any, BinaryIO, Iterable, Iterator, Optional, Union
+
+from django.conf import settings
+from django.utils import timezone
+
+from rechtspraak.models import Uitspraak
+from rechtspraak.profiling import stage
+from rechtspraak.progress import Progress
+from rechtspraak.tokenstreams import Vocabulary, tokenize
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+# The arrays of the index, and their type codes
+INDEX_COLUMNS = {
+    "ids": "q",
+    "offsets": "Q",
+    "lengths": "I",
+    "dates": "i",
+    "instanties": "q",
+    "checksums": "I",
+}
+
+# The arrays of the index of a pack with token streams: per text its offset and length in tokens.bin, in tokens
+TOKEN_COLUMNS = {
+    "token_offsets": "Q",
+    "token_lengths": "I",
+}
+
+# Written after every text, so a match cannot run from one text into the next
+SEPARATOR = b"\n\x00"
+
+# Rebuild the pack from scratch once more than this part of texts.bin is no longer live
+MAX_DEAD_FRACTION = 0.5
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def corpus_pack_directory() -> Path:
+    """The directory of the corpus pack, configured with RECHTSPRAAK_CORPUS_PACK"""
+    return Path(getattr(settings, "RECHTSPRAAK_CORPUS_PACK", settings.BASE_DIR / "corpuspack"))
+
+
+def _read_array(path: Path, typecode: str) -> array.array:
+    values = array.array(typecode)
+    if path.exists():
+        with path.open("rb") as column_file:
+            values.frombytes(column_file.read())
+    return values
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    if isinstance(value, tuple):
+        return tuple(_decode(item) for item in value)
+    return value
+
+
+class CorpusPack:
+    """A read-only view on a corpus pack"""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+
+        columns = {name: _read_array(directory / f"{name}.bin", typecode) for name, typecode in _columns(self.has_tokens).items()}
+        live = _read_array(directory / "live.bin", "b")
+
+        # The builder may be appending; only use the texts that are in every array
+        count = min(min(len(column) for column in columns.values()), len(live))
+        for name, column in columns.items():
+            del column[count:]
+            setattr(self, name, column)
+
+        self.ids: array.array
+        self.offsets: array.array
+        self.lengths: array.array
+        self.dates: array.array
+        self.instanties: array.array
+        self.checksums: array.array
+        self.token_offsets: array.array
+        self.token_lengths: array.array
+        self.live = live[:count]
+
+        self._file, self.buffer = _map(directory / "texts.bin")
+        if self.has_tokens:
+            self._token_file, self.token_buffer = _map(directory / "tokens.bin")
+
+    @classmethod
+    def open(cls, directory: Optional[Union[str, Path]] = None) -> "CorpusPack":
+        """Open the corpus pack in directory, by default the configured one"""
+        directory = Path(directory) if directory is not None else corpus_pack_directory()
+        if not (directory / "meta.json").exists():
+            raise FileNotFoundError(f"There is no corpus pack in {directory}, run ./manage.py build_corpus_pack first")
+        return cls(directory)
+
+    def __len__(self) -> int:
+        return sum(self.live)
+
+    @property
+    def has_tokens(self) -> bool:
+        """Whether the pack has the token streams of the texts"""
+        return self.meta.get("tokens", False)
+
+    def close(self) -> None:
+        for buffer, open_file in [(self.buffer, self._file)] + ([(self.token_buffer, self._token_file)] if self.has_tokens else []):
+            if isinstance(buffer, mmap.mmap):
+                buffer.close()
+            open_file.close()
+
+    def __enter__(self) -> "CorpusPack":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def positions(
+        self,
+        since: Optional[datetime.date] = None,
+        until: Optional[datetime.date] = None,
+        instantie_ids: Optional[set[int]] = None
+    ) -> Iterator[int]:
+        """The positions in the index of the live texts, optionally only of uitspraken from since up to and including until, or of some instanties"""
+        since_ordinal = since.toordinal() if since is not None else None
+        until_ordinal = until.toordinal() if until is not None else None
+
+        for position, live in enumerate(self.live):
+            if not live:
+                continue
+            if since_ordinal is not None and self.dates[position] < since_ordinal:
+                continue
+            if until_ordinal is not None and self.dates[position] > until_ordinal:
+                continue
+            if instantie_ids is not None and self.instanties[position] not in instantie_ids:
+                continue
+            yield position
+
+    def raw_text(self, position: int) -> memoryview:
+        """The UTF-8 encoded text at position in the index, as a view on the mapped file"""
+        offset = self.offsets[position]
+        return memoryview(self.buffer)[offset:offset + self.lengths[position]]
+
+    def text(self, position: int) -> str:
+        """The text at position in the index"""
+        return str(self.raw_text(position), "utf-8")
+
+    def texts(self, **filters: Any) -> Iterator[tuple[int, str]]:
+        """(uitspraak id, tekst) of every live text; takes the filters of positions()"""
+        for position in self.positions(**filters):
+            yield self.ids[position], self.text(position)
+
+    def scan(self, pattern: Union[str, bytes, re.Pattern], flags: int = 0, **filters: Any) -> Iterator[tuple[int, list]]:
+        """(uitspraak id, all matches as re.findall returns them) of every live text with a match
+
+        A bytes pattern is matched on the mapped file in place, so it is the fastest; note that ^
+        and $ then only match at line boundaries, not at the start and end of a text. Matches of
+        a bytes pattern are decoded. A str pattern is matched on the decoded text. Takes the
+        filters of positions().
+        """
+        if not isinstance(pattern, re.Pattern):
+            pattern = re.compile(pattern, flags)
+
+        in_place = isinstance(pattern.pattern, bytes)
+
+        for position in self.positions(**filters):
+            offset = self.offsets[position]
+            end = offset + self.lengths[position]
+
+            with stage("match"):
+                if in_place:
+                    matches = [_decode(match) for match in pattern.findall(self.buffer, offset, end)]
+                else:
+                    matches = pattern.findall(self.text(position))
+
+            if matches:
+                yield self.ids[position], matches
+
+    @functools.cached_property
+    def vocabulary(self) -> Vocabulary:
+        """The vocabulary of the token streams"""
+        if not self.has_tokens:
+            raise ValueError(f"The corpus pack in {self.directory} has no token streams, build it with --tokens")
+        return Vocabulary.load(self.directory / "vocabulary.txt")
+
+    def tokens(self, position: int) -> array.array:
+        """The token ids of the text at position in the index"""
+        if not self.has_tokens:
+            raise ValueError(f"The corpus pack in {self.directory} has no token streams, build it with --tokens")
+
+        start = self.token_offsets[position] * 4
+        tokens = array.array("I")
+        tokens.frombytes(self.token_buffer[start:start + self.token_lengths[position] * 4])
+        return tokens
+
+    def encode(self, phrase: str) -> Optional[bytes]:
+        """A phrase as it occurs in tokens.bin, or None if one of its tokens does not occur at all"""
+        tokens = self.vocabulary.encode(tokenize(phrase))
+        if not tokens:
+            return None
+        return tokens.tobytes()
+
+    def _occurrences(self, position: int, needle: bytes) -> list[int]:
+        """The indexes in the token stream at position at which the encoded phrase needle starts"""
+        start = self.token_offsets[position] * 4
+        end = start + self.token_lengths[position] * 4
+
+        occurrences = []
+        found = self.token_buffer.find(needle, start, end)
+        while found != -1:
+            # Only where a token starts, not in the middle of one
+            if (found - start) % 4 == 0:
+                occurrences.append((found - start) // 4)
+            found = self.token_buffer.find(needle, found + 1, end)
+
+        return occurrences
+
+    def phrase_counts(self, phrases: Iterable[str], **filters: Any) -> Iterator[tuple[int, dict[str, int]]]:
+        """(uitspraak id, the number of occurrences of every phrase that occurs) of every live text with an occurrence
+
+        Phrases are tokenised and normalised like the texts, so case, punctuation and hyphenation
+        at the end of a line do not matter. Takes the filters of positions().
+        """
+        needles = {phrase: self.encode(phrase) for phrase in phrases}
+        needles = {phrase: needle for phrase, needle in needles.items() if needle is not None}
+        if not needles:
+            return
+
+        for position in self.positions(**filters):
+            with stage("match"):
+                counts = {phrase: len(self._occurrences(position, needle)) for phrase, needle in needles.items()}
+            counts = {phrase: count for phrase, count in counts.items() if count}
+
+            if counts:
+                yield self.ids[position], counts
+
+    def cooccurrences(self, first: str, second: str, window: Optional[int] = None, **filters: Any) -> Iterator[tuple[int, int]]:
+        """(uitspraak id, number of pairs of an occurrence of first and one of second) of every live text with such a pair
+
+        With window, only pairs of which the phrases start at most window tokens apart count;
+        otherwise every pair in the same text counts. Takes the filters of positions().
+        """
+        first_needle, second_needle = self.encode(first), self.encode(second)
+        if first_needle is None or second_needle is None:
+            return
+
+        for position in self.positions(**filters):
+            with stage("match"):
+                first_occurrences = self._occurrences(position, first_needle)
+                second_occurrences = self._occurrences(position, second_needle) if first_occurrences else []
+
+                if window is None:
+                    pairs = len(first_occurrences) * len(second_occurrences)
+                else:
+                    pairs = sum(
+                        bisect.bisect_right(second_occurrences, index + window) - bisect.bisect_left(second_occurrences, index - window)
+                        for index in first_occurrences
+                    )
+
+            if pairs:
+                yield self.ids[position], pairs
+
+    def collocations(self, phrase: str, window: int = 5, **filters: Any) -> collections.Counter[str]:
+        """How often every token occurs within window tokens before or after an occurrence of phrase
+
+        Takes the filters of positions().
+        """
+        counts: collections.Counter[int] = collections.Counter()
+        needle = self.encode(phrase)
+        if needle is None:
+            return collections.Counter()
+
+        length = len(needle) // 4
+        for position in self.positions(**filters):
+            with stage("match"):
+                occurrences = self._occurrences(position, needle)
+                if not occurrences:
+                    continue
+
+                tokens = self.tokens(position)
+                for index in occurrences:
+                    counts.update(tokens[max(index - window, 0):index])
+                    counts.update(tokens[index + length:index + length + window])
+
+        return collections.Counter({self.vocabulary.tokens[token_id]: count for token_id, count in counts.items()})
+
+
+def _columns(with_tokens: bool) -> dict[str, str]:
+    return {**INDEX_COLUMNS, **TOKEN_COLUMNS} if with_tokens else INDEX_COLUMNS
+
+
+def _map(path: Path) -> tuple[BinaryIO, Union[mmap.mmap, bytes]]:
+    open_file = path.open("rb")
+    size = os.fstat(open_file.fileno()).st_size
+    return open_file, mmap.mmap(open_file.fileno(), 0, access=mmap.ACCESS_READ) if size > 0 else b""
+
+
+def _write_meta(directory: Path, meta: dict) -> None:
+    tmp_path = directory / "meta.json.tmp"
+    tmp_path.write_text(json.dumps(meta), encoding="utf-8")
+    os.replace(tmp_path, directory / "meta.json")
+
+
+def _write_live(directory: Path, live: array.array) -> None:
+    tmp_path = directory / "live.bin.tmp"
+    with tmp_path.open("wb") as live_file:
+        live.tofile(live_file)
+    os.replace(tmp_path, directory / "live.bin")
+
+
+def build_corpus_pack(
+    directory: Optional[Union[str, Path]] = None,
+    full: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    tokens: Optional[bool] = None
+) -> int:
+    """Bring the corpus pack up to date with the database; returns the number of texts added
+
+    Only appends the texts of uitspraken whose tekst changed since the last build, unless full is given, there
+    is no pack yet, or too much of the pack is no longer live.
+
+    tokens -- whether the pack has token streams; by default, whether the existing pack has them.
+        The pack is rebuilt if this changes.
+    """
+    directory = Path(directory) if directory is not None else corpus_pack_directory()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    meta: Optional[dict] = None
+    if (directory / "meta.json").exists():
+        meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+        if tokens is None:
+            tokens = meta.get("tokens", False)
+
+        if full:
+            meta = None
+        elif meta.get("version") != FORMAT_VERSION:
+            logger.info("The corpus pack has an old format, rebuilding it")
+            meta = None
+        elif meta["dead_bytes"] > MAX_DEAD_FRACTION * max(meta["total_bytes"], 1):
+            logger.info("More than %s of the corpus pack is no longer live, rebuilding it", MAX_DEAD_FRACTION)
+            meta = None
+        elif tokens != meta.get("tokens", False):
+            logger.info("Rebuilding the corpus pack %s token streams", "with" if tokens else "without")
+            meta = None
+
+    if meta is None:
+        for name in [*INDEX_COLUMNS, *TOKEN_COLUMNS, "texts", "tokens", "live"]:
+            (directory / f"{name}.bin").unlink(missing_ok=True)
+        (directory / "vocabulary.txt").unlink(missing_ok=True)
+        meta = {
+            "version": FORMAT_VERSION,
+            "built_at": None,
+            "total_bytes": 0,
+            "dead_bytes": 0,
+            "tokens": bool(tokens),
+            "total_tokens": 0,
+            "vocabulary_bytes": 0
+        }
+
+    with_tokens = meta.get("tokens", False)
+    columns = {name: _read_array(directory / f"{name}.bin", typecode) for name, typecode in _columns(with_tokens).items()}
+    live = _read_array(directory / "live.bin", "b")
+
+    # Drop what an interrupted build appended after the last completed build
+    for name, column in columns.items():
+        if len(column) > len(live):
+            del column[len(live):]
+            os.truncate(directory / f"{name}.bin", len(live) * column.itemsize)
+    if (directory / "texts.bin").exists() and (directory / "texts.bin").stat().st_size > meta["total_bytes"]:
+        os.truncate(directory / "texts.bin", meta["total_bytes"])
+
+    vocabulary = Vocabulary()
+    if with_tokens:
+        for name, size in [("tokens.bin", meta["total_tokens"] * 4), ("vocabulary.txt", meta["vocabulary_bytes"])]:
+            if (directory / name).exists() and (directory / name).stat().st_size > size:
+                os.truncate(directory / name, size)
+        vocabulary = Vocabulary.load(directory / "vocabulary.txt")
+
+    # The position of the live text of every uitspraak in the pack
+    positions = {uitspraak_id: position for position, uitspraak_id in enumerate(columns["ids"]) if live[position]}
+
+    # Uitspraken saved from now on are picked up by the next build
+    started = timezone.now()
+
+    uitspraken = Uitspraak.objects.all()
+    if meta["built_at"] is not None:
+        # Not last_modified, which experiments also bump when they save their results
+        uitspraken = uitspraken.filter(tekst_modified__gte=datetime.datetime.fromisoformat(meta["built_at"]))
+
+    total = uitspraken.count()
+    logger.info("Found %s new or changed uitspraken", total)
+
+    reporter = Progress(total, "Corpus pack")
+    added = 0
+    last_id = 0
+
+    files = {name: (directory / f"{name}.bin").open("ab") for name in [*_columns(with_tokens), "texts"] + (["tokens"] if with_tokens else [])}
+    try:
+        offset = files["texts"].tell()
+        token_offset = files["tokens"].tell() // 4 if with_tokens else 0
+
+        while True:
+            chunk = list(
+                uitspraken.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", "tekst", "uitspraakdatum", "instantie_id")[:chunk_size]
+            )
+
+            if not chunk:
+                break
+
+            new = {name: array.array(typecode) for name, typecode in _columns(with_tokens).items()}
+            texts = []
+            token_streams = []
+
+            for uitspraak_id, tekst, uitspraakdatum, instantie_id in chunk:
+                data = tekst.encode("utf-8")
+                checksum = zlib.crc32(data)
+
+                old = positions.get(uitspraak_id)
+                if old is not None:
+                    if columns["checksums"][old] == checksum and columns["lengths"][old] == len(data):
+                        # Changed back to the tekst in the pack since the last build
+                        continue
+                    live[old] = 0
+                    meta["dead_bytes"] += columns["lengths"][old] + len(SEPARATOR)
+
+                positions[uitspraak_id] = len(columns["ids"]) + len(new["ids"])
+                new["ids"].append(uitspraak_id)
+                new["offsets"].append(offset)
+                new["lengths"].append(len(data))
+                new["dates"].append(uitspraakdatum.toordinal())
+                new["instanties"].append(instantie_id)
+                new["checksums"].append(checksum)
+                texts.append(data)
+                texts.append(SEPARATOR)
+                offset += len(data) + len(SEPARATOR)
+
+                if with_tokens:
+                    token_ids = vocabulary.encode(tokenize(tekst), add=True)
+                    new["token_offsets"].append(token_offset)
+                    new["token_lengths"].append(len(token_ids))
+                    token_streams.append(token_ids.tobytes())
+                    token_offset += len(token_ids)
+
+            with stage("write"):
+                # The texts and tokens first, so a reader never finds an index entry without its text
+                if with_tokens:
+                    meta["vocabulary_bytes"] = vocabulary.save_added(directory / "vocabulary.txt")
+                    files["tokens"].write(b"".join(token_streams))
+                    files["tokens"].flush()
+                files["texts"].write(b"".join(texts))
+                files["texts"].flush()
+                for name, values in new.items():
+                    values.tofile(files[name])
+                    files[name].flush()
+                    columns[name].extend(values)
+
+            live.extend([1] * len(new["ids"]))
+            added += len(new["ids"])
+            meta["total_bytes"] = offset
+            meta["total_tokens"] = token_offset
+
+            last_id = chunk[-1][0]
+            reporter.update(len(chunk))
+    finally:
+        for open_file in files.values():
+            open_file.close()
+
+    reporter.close()
+
+    # Uitspraken that have been deleted since the last build
+    deleted = set(positions) - set(Uitspraak.objects.values_list("id", flat=True))
+    for uitspraak_id in deleted:
+        position = positions[uitspraak_id]
+        live[position] = 0
+        meta["dead_bytes"] += columns["lengths"][position] + len(SEPARATOR)
+
+    _write_live(directory, live)
+    meta["built_at"] = started.isoformat()
+    _write_meta(directory, meta)
+
+    logger.info("Added %s texts to the corpus pack, removed %s", added, len(deleted))
+    return added
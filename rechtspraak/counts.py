@@ -0,0 +1,201 @@
+"""
+    rechtspraak/counts.py
+
+    Materialised counts of uitspraken per instantie and year, and per rechtsgebied, instantie and
+    year. The counts are computed once with grouped queries (refresh_counts), and then kept up to
+    date incrementally by the ingest and experiment code (update_counts, data_added). The reports
+    on these counts are cached until the data changes.
+
+    Deleting uitspraken, e.g. in the admin, does not update the counts, nor does changing them
+    other than through the ingest and experiment code. Run refresh_counts afterwards, e.g. with
+    uitspraken_counts_per_type --refresh, or call update_counts for every such change.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import logging
+
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import ExtractYear
+
+from rechtspraak.cache import bump_data_version, cached
+from rechtspraak.models import Instantie, RechtsgebiedCounts, Uitspraak, UitspraakCounts
+
+logger = logging.getLogger(__name__)
+
+COUNT_FIELDS = ["total", "with_tekst", "with_data"]
+
+
+@dataclass(frozen=True)
+class Contribution:
+    """What a single uitspraak contributes to the materialised counts"""
+
+    instantie_id: int
+    year: int
+    rechtsgebied_ids: frozenset[int]
+    with_tekst: bool
+    with_data: bool
+
+
+def uitspraak_contribution(uitspraak: Uitspraak, rechtsgebied_ids: Optional[Iterable[int]] = None) -> Contribution:
+    """Determine the contribution of an uitspraak; queries its rechtsgebieden if these are not given"""
+    if rechtsgebied_ids is None:
+        rechtsgebied_ids = uitspraak.rechtsgebieden.values_list("id", flat=True)
+
+    return Contribution(
+        instantie_id=uitspraak.instantie_id,
+        year=uitspraak.uitspraakdatum.year,
+        rechtsgebied_ids=frozenset(rechtsgebied_ids),
+        with_tekst=uitspraak.tekst != "",
+        with_data=uitspraak.data != {}
+    )
+
+
+def _count_keys(instantie_id: int, year: int, rechtsgebied_ids: Iterable[int]) -> list[tuple]:
+    keys: list[tuple] = [(UitspraakCounts, instantie_id, year, None)]
+    keys += [(RechtsgebiedCounts, instantie_id, year, rechtsgebied_id) for rechtsgebied_id in rechtsgebied_ids]
+    return keys
+
+
+def _add(deltas: dict[tuple, dict[str, int]], contribution: Contribution, sign: int) -> None:
+    for key in _count_keys(contribution.instantie_id, contribution.year, contribution.rechtsgebied_ids):
+        deltas[key]["total"] += sign
+        deltas[key]["with_tekst"] += sign if contribution.with_tekst else 0
+        deltas[key]["with_data"] += sign if contribution.with_data else 0
+
+
+def _apply(deltas: dict[tuple, dict[str, int]]) -> None:
+    for (model, instantie_id, year, rechtsgebied_id), fields in deltas.items():
+        fields = {field: delta for field, delta in fields.items() if delta != 0}
+
+        if not fields:
+            continue
+
+        lookup = {"instantie_id": instantie_id, "year": year}
+        if rechtsgebied_id is not None:
+            lookup["rechtsgebied_id"] = rechtsgebied_id
+
+        updates = {field: F(field) + delta for field, delta in fields.items()}
+
+        if model.objects.filter(**lookup).update(**updates) == 0:
+            try:
+                with transaction.atomic():
+                    model.objects.create(**lookup, **fields)
+            except IntegrityError:
+                # Created in the meantime
+                model.objects.filter(**lookup).update(**updates)
+
+
+def update_counts(before: Optional[Contribution], after: Optional[Contribution]) -> None:
+    """Update the counts for an uitspraak that changed from before to after
+
+    before is None for a newly created uitspraak, after is None for an uitspraak that is deleted;
+    determine before with uitspraak_contribution before deleting or changing the uitspraak.
+    """
+    if before == after:
+        return
+
+    deltas: dict[tuple, dict[str, int]] = defaultdict(lambda: dict.fromkeys(COUNT_FIELDS, 0))
+
+    if before is not None:
+        _add(deltas, before, -1)
+    if after is not None:
+        _add(deltas, after, 1)
+
+    _apply(deltas)
+
+
+def data_added(uitspraak: Uitspraak) -> None:
+    """Update the counts for an uitspraak that had no data before, but has now
+
+    Call bump_data_version() once all data has been added.
+    """
+    keys = _count_keys(
+        uitspraak.instantie_id,
+        uitspraak.uitspraakdatum.year,
+        uitspraak.rechtsgebieden.values_list("id", flat=True)
+    )
+    _apply({key: {"with_data": 1} for key in keys})
+
+
+def refresh_counts() -> None:
+    """Recompute all materialised counts from scratch"""
+    aggregates = {
+        "total": Count("id"),
+        "with_tekst": Count("id", filter=~Q(tekst="")),
+        "with_data": Count("id", filter=~Q(data={})),
+    }
+
+    uitspraak_counts = (
+        Uitspraak.objects.values("instantie_id", year=ExtractYear("uitspraakdatum"))
+        .annotate(**aggregates)
+        .order_by()
+    )
+
+    through = Uitspraak.rechtsgebieden.through
+    rechtsgebied_counts = (
+        through.objects.values("rechtsgebied_id", instantie_id=F("uitspraak__instantie_id"), year=ExtractYear("uitspraak__uitspraakdatum"))
+        .annotate(
+            total=Count("uitspraak_id"),
+            with_tekst=Count("uitspraak_id", filter=~Q(uitspraak__tekst="")),
+            with_data=Count("uitspraak_id", filter=~Q(uitspraak__data={}))
+        )
+        .order_by()
+    )
+
+    with transaction.atomic():
+        UitspraakCounts.objects.all().delete()
+        RechtsgebiedCounts.objects.all().delete()
+        UitspraakCounts.objects.bulk_create((UitspraakCounts(**row) for row in uitspraak_counts), batch_size=1000)
+        RechtsgebiedCounts.objects.bulk_create((RechtsgebiedCounts(**row) for row in rechtsgebied_counts), batch_size=1000)
+
+    bump_data_version()
+    logger.info("Refreshed the materialised counts")
+
+
+REPORTS = ["instantie_type", "year", "rechtsgebied"]
+
+_SUMS = {field: Sum(field) for field in COUNT_FIELDS}
+
+
+def _counts_report(report: str) -> list[dict[str, Any]]:
+    if report == "instantie_type":
+        counts = {
+            row["instantie__instantie_type"]: row
+            for row in UitspraakCounts.objects.values("instantie__instantie_type").annotate(**_SUMS).order_by()
+        }
+        instantie_types = Instantie.objects.order_by("instantie_type").values_list("instantie_type", flat=True).distinct()
+        return [
+            {"instantie_type": instantie_type, **{field: counts.get(instantie_type, {}).get(field, 0) for field in COUNT_FIELDS}}
+            for instantie_type in instantie_types
+        ]
+
+    if report == "year":
+        rows = UitspraakCounts.objects.values("instantie__instantie_type", "year").annotate(**_SUMS)
+        return [
+            {"instantie_type": row.pop("instantie__instantie_type"), **row}
+            for row in rows.order_by("instantie__instantie_type", "year")
+        ]
+
+    if report == "rechtsgebied":
+        rows = RechtsgebiedCounts.objects.values("rechtsgebied__naam").annotate(**_SUMS)
+        return [{"rechtsgebied": row.pop("rechtsgebied__naam"), **row} for row in rows.order_by("rechtsgebied__naam")]
+
+    raise ValueError(f"Unknown report {report}, choose one of {REPORTS}")
+
+
+def counts_report(report: str) -> list[dict[str, Any]]:
+    """The counts of uitspraken per instantie type, per instantie type and year, or per rechtsgebied
+
+    Every row has the keys total, with_tekst and with_data, and instantie_type, year or rechtsgebied.
+    """
+    return cached("counts_report", [("report", report)], lambda: _counts_report(report))
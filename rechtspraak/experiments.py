@@ -0,0 +1,78 @@
+"""
+    rechtspraak/experiments.py
+
+    Indexed lookups of experiment results.
+
+    Experiments store their results in Uitspraak.data, which cannot be filtered on without parsing
+    the JSON of every row. Therefore, a summary of every result (presence, number of matches,
+    citations and errors) is also kept in the ExperimentResult table, whose columns are indexed on
+    every database backend.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+from typing import Iterable, Optional
+
+from django.db.models import Q, QuerySet
+
+from rechtspraak.models import ExperimentResult, Uitspraak
+
+
+def _count(results: dict, key: str) -> Optional[int]:
+    value = results.get(key)
+    return len(value) if isinstance(value, list) else None
+
+
+def experiment_result_from_data(uitspraak: Uitspraak, experiment_id: str) -> Optional[ExperimentResult]:
+    """Derive the (not yet saved) ExperimentResult of an experiment from the data of an uitspraak"""
+    try:
+        results = uitspraak.data["experiments"][experiment_id]
+    except (KeyError, TypeError):
+        return None
+
+    return ExperimentResult(
+        uitspraak=uitspraak,
+        experiment_id=experiment_id,
+        experiment=results.get("experiment", ""),
+        match_count=_count(results, "matches"),
+        additional_match_count=_count(results, "additional_matches"),
+        citation_count=_count(results, "citations"),
+        error_count=_count(results, "errors") or 0
+    )
+
+
+def save_experiment_results(results: Iterable[ExperimentResult]) -> None:
+    """Insert or update experiment results"""
+    ExperimentResult.objects.bulk_create(
+        results,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["uitspraak", "experiment_id"],
+        update_fields=["experiment", "match_count", "additional_match_count", "citation_count", "error_count"]
+    )
+
+
+def record_experiment_result(uitspraak: Uitspraak, experiment_id: str) -> None:
+    """Update the ExperimentResult of an experiment after its results were saved in the data of an uitspraak"""
+    result = experiment_result_from_data(uitspraak, experiment_id)
+
+    if result is not None:
+        save_experiment_results([result])
+
+
+def uitspraken_with_experiment(experiment_id: str, with_matches: bool = False) -> QuerySet[Uitspraak]:
+    """All uitspraken with results for an experiment, optionally only those with matches or citations
+
+    Every experiment records an ExperimentResult for every result it saves, and migration 0014
+    added them for the results saved before, so this only looks at the ExperimentResult table.
+    """
+    results = ExperimentResult.objects.filter(experiment_id=experiment_id)
+
+    if with_matches:
+        results = results.filter(Q(match_count__gt=0) | Q(citation_count__gt=0))
+
+    return Uitspraak.objects.filter(id__in=results.values("uitspraak_id"))
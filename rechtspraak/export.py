@@ -0,0 +1,162 @@
+"""
+    rechtspraak/export.py
+
+    Streaming export of uitspraken and experiment results.
+
+    Uitspraken are read in chunks, with the instantie joined in and the rechtsgebieden and procedure
+    soorten prefetched per chunk, so the number of queries per chunk is constant (see tests.py). Records are written
+    to the output file as they are produced, either as newline-delimited JSON (NDJSON) or as a JSON
+    array, so memory use does not grow with the size of the export.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import json
+import logging
+
+from typing import Any, Iterable, Iterator, TextIO
+
+from django.db.models import QuerySet
+
+from rechtspraak.models import Uitspraak
+from rechtspraak.profiling import stage
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ["json", "ndjson"]
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def iterate_uitspraken(uitspraken: QuerySet[Uitspraak], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Uitspraak]:
+    """Iterate over uitspraken for export, with their instantie and labels loaded per chunk
+
+    The large raw_xml and tekst fields are not loaded. The prefetched labels of an uitspraak are
+    dropped once the next uitspraak is requested, so use them before that.
+    """
+    iterator = (
+        uitspraken.select_related("instantie")
+        .prefetch_related("rechtsgebieden", "procedure_soorten")
+        .defer("raw_xml", "tekst")
+        .iterator(chunk_size=chunk_size)
+    )
+
+    for uitspraak in iterator:
+        yield uitspraak
+        # The prefetched querysets and the uitspraak refer to each other, so without this they would
+        # only be freed by the garbage collector, and memory use would grow with the export
+        uitspraak._prefetched_objects_cache = {}
+
+
+def uitspraak_metadata(uitspraak: Uitspraak) -> dict[str, Any]:
+    """The metadata of an uitspraak, as included in every export record"""
+    return {
+        "ecli": uitspraak.ecli,
+        "publicatiedatum": uitspraak.publicatiedatum.strftime("%Y-%m-%d"),
+        "uitspraakdatum": uitspraak.uitspraakdatum.strftime("%Y-%m-%d"),
+        "instantie": uitspraak.instantie.naam,
+        "instantie_type": uitspraak.instantie.instantie_type,
+        "uitspraak_type": uitspraak.uitspraak_type,
+        "rechtsgebieden": [rechtsgebied.naam for rechtsgebied in uitspraak.rechtsgebieden.all()],
+        "procedure_soorten": [proceduresoort.naam for proceduresoort in uitspraak.procedure_soorten.all()],
+        "inhoudsindicatie": uitspraak.inhoudsindicatie,
+    }
+
+
+EXPERIMENT_COUNT_FIELDS = ["matches", "additional_matches", "citations", "errors"]
+
+
+def experiment_counts(uitspraak: Uitspraak, experiment_id: str) -> dict[str, Any]:
+    """The number of matches, citations and errors of an experiment on an uitspraak
+
+    Returns a dict with keys like "<experiment_id>__matches"; values are None if the experiment
+    was not performed on the uitspraak or did not produce that kind of result.
+    """
+    try:
+        results = uitspraak.data["experiments"][experiment_id]
+    except (KeyError, TypeError):
+        results = {}
+
+    return {
+        f"{experiment_id}__{field}": len(results[field]) if isinstance(results.get(field), list) else None
+        for field in EXPERIMENT_COUNT_FIELDS
+    }
+
+
+def write_ndjson(records: Iterable[dict], outfile: TextIO) -> int:
+    """Write records as newline-delimited JSON; returns the number of records written"""
+    written = 0
+
+    for record in records:
+        with stage("write"):
+            outfile.write(json.dumps(record))
+            outfile.write("\n")
+        written += 1
+
+    return written
+
+
+def write_json_array(records: Iterable[dict], outfile: TextIO) -> int:
+    """Write records as a single JSON array, one record at a time; returns the number of records written"""
+    written = 0
+    outfile.write("[")
+
+    for record in records:
+        with stage("write"):
+            if written > 0:
+                outfile.write(", ")
+            outfile.write(json.dumps(record))
+        written += 1
+
+    outfile.write("]")
+    return written
+
+
+def iter_json_records(infile: TextIO, buffer_size: int = 1 << 16) -> Iterator[dict]:
+    """Incrementally read the records of an export, either NDJSON or a JSON array
+
+    Only one record (and one buffer) is held in memory at a time, so this also works for exports
+    that are much larger than the available memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    eof = False
+
+    while True:
+        buffer = buffer.lstrip(" \t\r\n,[]")
+
+        if buffer:
+            try:
+                record, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield record
+                buffer = buffer[end:]
+                continue
+        elif eof:
+            return
+
+        data = infile.read(buffer_size)
+        eof = not data
+        buffer += data
+
+
+def export_results(records: Iterable[dict], filename_base: str, export_format: str = "json") -> str:
+    """Stream records to filename_base with the extension for the export format; returns the filename"""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {export_format}, choose one of {EXPORT_FORMATS}")
+
+    filename = f"{filename_base}.{export_format}"
+    writer = write_ndjson if export_format == "ndjson" else write_json_array
+
+    with open(filename, "wt", encoding="utf-8") as outfile:
+        written = writer(records, outfile)
+
+    logger.info("Exported %s records to %s", written, filename)
+
+    return filename
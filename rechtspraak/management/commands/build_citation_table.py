@@ -0,0 +1,59 @@
+"""
+    rechtspraak/management/commands/build_citation_table.py
+
+    Fill the citation table from the citations stored in the data of uitspraken by an earlier run
+    of experiment_kamerstukcitations.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import logging
+
+from typing import Any
+
+from django.core.management import CommandParser
+
+from rechtspraak.citations import store_citations
+from rechtspraak.experiments import uitspraken_with_experiment
+from rechtspraak.profiling import ProfiledCommand
+from rechtspraak.progress import Progress
+
+logger = logging.getLogger(__name__)
+
+
+class Command(ProfiledCommand):
+    """Fill the citation table from the results of experiment_kamerstukcitations"""
+
+    help = "Fill the citation table from the results of experiment_kamerstukcitations"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--experiment-id", type=str, default="citations_all_1", help="The experiment ID to read the citations from, defaults to citations_all_1")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="The number of uitspraken to read at once, defaults to 1000.")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        experiment_id = options["experiment_id"]
+        uitspraken = uitspraken_with_experiment(experiment_id)
+
+        total = uitspraken.count()
+        logger.info("Found %s uitspraken with results for %s", total, experiment_id)
+
+        reporter = Progress(total, f"Citations of {experiment_id}")
+        last_id = 0
+
+        while True:
+            chunk = list(uitspraken.filter(id__gt=last_id).order_by("id").only("id", "data")[:options["chunk_size"]])
+
+            if not chunk:
+                break
+
+            for uitspraak in chunk:
+                store_citations(uitspraak, experiment_id, uitspraak.data["experiments"][experiment_id]["citations"])
+
+            last_id = chunk[-1].id
+            reporter.update(len(chunk))
+
+        reporter.close()
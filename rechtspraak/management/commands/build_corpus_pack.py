@@ -0,0 +1,46 @@
+"""
+    rechtspraak/management/commands/build_corpus_pack.py
+
+    Build or update the packed copy of the tekst of all uitspraken, for fast scans over the whole
+    corpus (see rechtspraak/corpuspack.py).
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import argparse
+
+from typing import Any
+
+from django.core.management import CommandParser
+
+from rechtspraak.corpuspack import DEFAULT_CHUNK_SIZE, build_corpus_pack, corpus_pack_directory
+from rechtspraak.profiling import ProfiledCommand
+
+
+class Command(ProfiledCommand):
+    """Add the uitspraken changed since the last build to the corpus pack"""
+
+    help = "Add the uitspraken changed since the last build to the corpus pack"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--directory", type=str, help="The directory of the corpus pack, defaults to RECHTSPRAAK_CORPUS_PACK.")
+        parser.add_argument("--full", action="store_true", help="Rebuild the corpus pack from scratch.")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f"The number of uitspraken to read at once, defaults to {DEFAULT_CHUNK_SIZE}."
+        )
+        parser.add_argument(
+            "--tokens",
+            action=argparse.BooleanOptionalAction,
+            help="Whether to add the token streams of the texts, for phrase and co-occurrence counts; defaults to what the existing pack has."
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        directory = options["directory"] or corpus_pack_directory()
+        build_corpus_pack(directory, full=options["full"], chunk_size=options["chunk_size"], tokens=options["tokens"])
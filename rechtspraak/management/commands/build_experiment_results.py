@@ -0,0 +1,68 @@
+"""
+    rechtspraak/management/commands/build_experiment_results.py
+
+    Fill the indexed ExperimentResult table from the experiment results stored in the data of
+    uitspraken.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import logging
+
+from typing import Any
+
+from django.core.management import CommandParser
+
+from rechtspraak.experiments import experiment_result_from_data, save_experiment_results
+from rechtspraak.models import Uitspraak
+from rechtspraak.profiling import ProfiledCommand
+from rechtspraak.progress import Progress
+
+logger = logging.getLogger(__name__)
+
+
+class Command(ProfiledCommand):
+    """Fill the indexed ExperimentResult table from the data of all uitspraken"""
+
+    help = "Fill the indexed ExperimentResult table from the data of all uitspraken"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--experiment-id", type=str, help="Only index the results of this experiment")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="The number of uitspraken to read at once, defaults to 1000.")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        uitspraken = Uitspraak.objects.exclude(data={})
+        total = uitspraken.count()
+        logger.info("Found %s uitspraken with data", total)
+
+        reporter = Progress(total, "Experiment results")
+        last_id = 0
+
+        while True:
+            chunk = list(uitspraken.filter(id__gt=last_id).order_by("id").only("id", "data")[:options["chunk_size"]])
+
+            if not chunk:
+                break
+
+            results = []
+            for uitspraak in chunk:
+                if options["experiment_id"] is not None:
+                    experiment_ids = [options["experiment_id"]]
+                else:
+                    experiment_ids = list(uitspraak.data.get("experiments", {}))
+
+                for experiment_id in experiment_ids:
+                    result = experiment_result_from_data(uitspraak, experiment_id)
+                    if result is not None:
+                        results.append(result)
+
+            save_experiment_results(results)
+
+            last_id = chunk[-1].id
+            reporter.update(len(chunk))
+
+        reporter.close()
@@ -0,0 +1,129 @@
+"""
+    rechtspraak/management/commands/build_trigram_index.py
+
+    Build or update the trigram index over the tekst of all uitspraken.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import array
+import logging
+
+from typing import Any
+
+from django.core.management import CommandParser
+from django.db import transaction
+
+from rechtspraak.models import TrigramPosting, Uitspraak
+from rechtspraak.profiling import ProfiledCommand
+from rechtspraak.progress import Progress
+from rechtspraak.trigrams import decode_postings, encode_postings, extract_trigrams
+
+logger = logging.getLogger(__name__)
+
+
+class Command(ProfiledCommand):
+    """Build or update the trigram index over the tekst of all uitspraken."""
+
+    help = "Build or update the trigram index over the tekst of all uitspraken."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--full", action="store_true", help="Throw away the existing index and rebuild it from scratch.")
+        parser.add_argument("--compact", action="store_true", help="Merge all segments of each posting list into one after indexing.")
+        parser.add_argument("--chunk-size", type=int, default=500, help="The number of uitspraken to read at once, defaults to 500.")
+        parser.add_argument(
+            "--flush-postings",
+            type=int,
+            default=10_000_000,
+            help="Write a new index segment once this many postings have been collected, defaults to 10 million."
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options["full"]:
+            logger.info("Removing the existing trigram index")
+            with transaction.atomic():
+                TrigramPosting.objects.all().delete()
+                Uitspraak.objects.filter(trigram_indexed=True).update(trigram_indexed=False)
+
+        total = Uitspraak.objects.filter(trigram_indexed=False).count()
+        logger.info("Found %s uitspraken to index", total)
+
+        segment: dict[str, array.array] = {}
+        segment_size = 0
+        segment_ids: list[int] = []
+        reporter = Progress(total, "Trigram index")
+        last_id = 0
+
+        while True:
+            chunk = list(
+                Uitspraak.objects.filter(trigram_indexed=False, id__gt=last_id)
+                .order_by("id")
+                .only("id", "tekst")[:options["chunk_size"]]
+            )
+
+            if not chunk:
+                break
+
+            for uitspraak in chunk:
+                for trigram in extract_trigrams(uitspraak.tekst):
+                    segment.setdefault(trigram, array.array("q")).append(uitspraak.id)
+                    segment_size += 1
+                segment_ids.append(uitspraak.id)
+
+            last_id = chunk[-1].id
+            reporter.update(len(chunk))
+
+            if segment_size >= options["flush_postings"]:
+                self.flush(segment, segment_ids)
+                segment, segment_size, segment_ids = {}, 0, []
+
+        self.flush(segment, segment_ids)
+        reporter.close()
+
+        if options["compact"]:
+            self.compact()
+
+    def flush(self, segment: dict[str, array.array], segment_ids: list[int]) -> None:
+        """Write a new segment to the index, and mark its uitspraken as indexed"""
+
+        if not segment_ids:
+            return
+
+        logger.info("Writing segment with %s trigrams for %s uitspraken", len(segment), len(segment_ids))
+
+        with transaction.atomic():
+            TrigramPosting.objects.bulk_create(
+                (TrigramPosting(trigram=trigram, postings=encode_postings(ids)) for trigram, ids in segment.items()),
+                batch_size=1000
+            )
+
+            for start in range(0, len(segment_ids), 500):
+                Uitspraak.objects.filter(id__in=segment_ids[start:start + 500]).update(trigram_indexed=True)
+
+    def compact(self) -> None:
+        """Merge the segments of every posting list into a single segment"""
+
+        trigrams = list(
+            TrigramPosting.objects.values_list("trigram", flat=True)
+            .order_by("trigram").distinct()
+        )
+
+        for trigram in trigrams:
+            segments = list(TrigramPosting.objects.filter(trigram=trigram))
+
+            if len(segments) < 2:
+                continue
+
+            ids: set[int] = set()
+            for posting in segments:
+                ids.update(decode_postings(posting.postings))
+
+            with transaction.atomic():
+                TrigramPosting.objects.filter(id__in=[posting.id for posting in segments]).delete()
+                TrigramPosting.objects.create(trigram=trigram, postings=encode_postings(ids))
+
+        logger.info("Compacted trigram index")
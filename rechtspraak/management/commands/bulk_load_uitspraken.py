@@ -0,0 +1,81 @@
+"""
+    rechtspraak/management/commands/bulk_load_uitspraken.py
+
+    Load many XML files with uitspraken into PostgreSQL at once, e.g. for the initial load of the
+    full archive. The XML files are parsed in parallel, and loaded in batches with COPY.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import logging
+import multiprocessing
+import os
+import xml.etree.ElementTree as ET
+
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from django.core.management import CommandError, CommandParser
+from django.db import connection
+
+from rechtspraak.bulkload import DEFAULT_BATCH_SIZE, bulk_load
+from rechtspraak.profiling import ProfiledCommand
+from rechtspraak.utils import ParsedUitspraak, parse_uitspraak_xml
+
+logger = logging.getLogger(__name__)
+
+
+def xml_paths(paths: list[str]) -> Iterator[Path]:
+    """The XML files given, and the XML files in the directories given"""
+    for path_str in paths:
+        path = Path(path_str)
+
+        if path.is_file():
+            yield path
+        elif path.is_dir():
+            yield from sorted(path.rglob("*.xml"))
+        else:
+            logger.error("%s is neither a file nor a directory", path_str)
+
+
+def parse_file(path: Path) -> Optional[ParsedUitspraak]:
+    """Parse an XML file, or log why it could not be parsed"""
+    try:
+        with path.open("rt", encoding="utf-8") as xmlfile:
+            return parse_uitspraak_xml(xmlfile.read(), str(path))
+    except (ET.ParseError, AttributeError, ValueError, OSError) as exc:
+        logger.error("Could not parse %s: %s", path, exc)
+        return None
+
+
+class Command(ProfiledCommand):
+    """Load XML files with uitspraken into PostgreSQL with COPY"""
+
+    help = "Load XML files with uitspraken into PostgreSQL with COPY"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("xml_file_or_dir", type=str, nargs="+", help="The XML files, or directories with XML files, to load.")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"The number of uitspraken per transaction, defaults to {DEFAULT_BATCH_SIZE}"
+        )
+        parser.add_argument("--workers", type=int, default=os.cpu_count(), help="The number of processes parsing XML, defaults to the number of CPUs")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if connection.vendor != "postgresql":
+            raise CommandError(f"bulk_load_uitspraken requires PostgreSQL, use create_uitspraak_from_xml on {connection.vendor}")
+
+        # The parsing processes do not use the database, and must not share its connection
+        connection.close()
+
+        with multiprocessing.Pool(options["workers"]) as pool:
+            parsed = pool.imap(parse_file, xml_paths(options["xml_file_or_dir"]), chunksize=64)
+            loaded = bulk_load((uitspraak for uitspraak in parsed if uitspraak is not None), options["batch_size"])
+
+        logger.info("Loaded %s uitspraken", loaded)
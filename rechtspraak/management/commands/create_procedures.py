@@ -9,38 +9,20 @@
 """
 
 import logging
-import xml.etree.ElementTree as ET
 
 from typing import Any
 
-import requests
-
-from django.core.management import BaseCommand
-
-from rechtspraak.models import ProcedureSoort
+from rechtspraak.profiling import ProfiledCommand
+from rechtspraak.waardelijsten import sync_waardelijsten
 
 logger = logging.getLogger(__name__)
 
 
-class Command(BaseCommand):
+class Command(ProfiledCommand):
     """Add all procedures"""
 
-    help = "Add all procedures"
+    help = "Add all procedures, see also sync_waardelijsten"
 
     def handle(self, *args: Any, **options: Any) -> None:
-        procedures_url = "https://data.rechtspraak.nl/Waardelijst/Proceduresoorten"
-
-        resp = requests.get(procedures_url, timeout=30)
-
-        xmlroot = ET.fromstring(resp.text)
-
-        for proceduresoort in xmlroot.findall(".//Proceduresoort"):
-            proceduresoort, created = ProcedureSoort.objects.update_or_create(
-                naam=proceduresoort.find("./Naam").text,
-                identifier=proceduresoort.find("./Identifier").text
-            )
-
-            if created:
-                logger.info("Succesfully created %s", proceduresoort)
-            else:
-                logger.info("Succesfully updated %s", proceduresoort)
+        for result in sync_waardelijsten(["procedures"], force=True):
+            logger.info("%s", result)
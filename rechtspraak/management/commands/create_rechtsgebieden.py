@@ -9,38 +9,20 @@
 """
 
 import logging
-import xml.etree.ElementTree as ET
 
 from typing import Any
 
-import requests
-
-from django.core.management import BaseCommand
-
-from rechtspraak.models import Rechtsgebied
+from rechtspraak.profiling import ProfiledCommand
+from rechtspraak.waardelijsten import sync_waardelijsten
 
 logger = logging.getLogger(__name__)
 
 
-class Command(BaseCommand):
+class Command(ProfiledCommand):
     """Add all rechtsgebieden"""
 
-    help = "Add all rechtsgebieden"
+    help = "Add all rechtsgebieden, see also sync_waardelijsten"
 
     def handle(self, *args: Any, **options: Any) -> None:
-        rechtsgebieden_url = "https://data.rechtspraak.nl/Waardelijst/Rechtsgebieden"
-
-        resp = requests.get(rechtsgebieden_url, timeout=30)
-
-        xmlroot = ET.fromstring(resp.text)
-
-        for rechtsgebied in xmlroot.findall(".//Rechtsgebied"):
-            rechtsgebied, created = Rechtsgebied.objects.update_or_create(
-                naam=rechtsgebied.find("./Naam").text,
-                identifier=rechtsgebied.find("./Identifier").text
-            )
-
-            if created:
-                logger.info("Succesfully created %s", rechtsgebied)
-            else:
-                logger.info("Succesfully updated %s", rechtsgebied)
+        for result in sync_waardelijsten(["rechtsgebieden"], force=True):
+            logger.info("%s", result)
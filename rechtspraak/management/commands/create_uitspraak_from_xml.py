@@ -17,14 +17,17 @@ import logging
 from pathlib import Path
 from typing import Any
 
-from django.core.management import BaseCommand, CommandParser
+from django.core.management import CommandParser
 
+from rechtspraak.cache import bump_data_version
+from rechtspraak.profiling import ProfiledCommand
+from rechtspraak.progress import progress
 from rechtspraak.utils import create_uitspraak_from_xmlstring
 
 logger = logging.getLogger(__name__)
 
 
-class Command(BaseCommand):
+class Command(ProfiledCommand):
     """Add all instanties"""
 
     help = "Add all instanties"
@@ -33,8 +36,6 @@ class Command(BaseCommand):
         parser.add_argument("xml_file_or_dir", type=str, nargs="+", help="The XML file (or directory with XML files) to read the uitspraak from.")
 
     def handle(self, *args: Any, **options: Any) -> None:
-        print(options["xml_file_or_dir"])
-
         for xmlpath_str in options["xml_file_or_dir"]:
             path = Path(xmlpath_str)
 
@@ -47,12 +48,14 @@ class Command(BaseCommand):
 
             elif path.exists() and path.is_dir():
                 logger.info("%s is a directory", xmlpath_str)
-                xmlfilepaths = path.glob("./*.xml")
+                xmlfilepaths = list(path.glob("./*.xml"))
 
-                for xmlfilepath in xmlfilepaths:
+                for xmlfilepath in progress(xmlfilepaths, description=f"Import {xmlpath_str}"):
                     if xmlfilepath.exists() and xmlfilepath.is_file():
-                        logger.info("Found %s", xmlfilepath)
+                        logger.debug("Found %s", xmlfilepath)
                         with xmlfilepath.open("rt", encoding="utf-8") as xmlfile:
                             raw_xml = xmlfile.read()
 
                         create_uitspraak_from_xmlstring(raw_xml, str(xmlfilepath))
+
+        bump_data_version()
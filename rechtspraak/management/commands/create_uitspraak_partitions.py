@@ -0,0 +1,57 @@
+"""
+    rechtspraak/management/commands/create_uitspraak_partitions.py
+
+    Create the yearly partitions of the uitspraak table for the coming years, or convert the
+    uitspraak table into a partitioned table first. Only on PostgreSQL; see rechtspraak/partitioning.py.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import datetime
+import logging
+
+from typing import Any
+
+from django.core.management import CommandError, CommandParser
+from django.db import connection
+
+from rechtspraak.partitioning import convert_to_partitioned, create_partitions, is_partitioned
+from rechtspraak.profiling import ProfiledCommand
+
+logger = logging.getLogger(__name__)
+
+
+class Command(ProfiledCommand):
+    """Create yearly partitions of the uitspraak table"""
+
+    help = "Create yearly partitions of the uitspraak table"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--until-year",
+            type=int,
+            default=datetime.date.today().year + 1,
+            help="Create partitions up to and including this year, defaults to next year"
+        )
+        parser.add_argument("--from-year", type=int, help="Create partitions from this year, defaults to the first year with a partition")
+        parser.add_argument(
+            "--convert",
+            action="store_true",
+            help="Convert the uitspraak table into a partitioned table first, if it is not partitioned yet. Locks the table while copying all rows."
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if connection.vendor != "postgresql":
+            raise CommandError(f"Partitioning requires PostgreSQL, not {connection.vendor}")
+
+        if not is_partitioned():
+            if not options["convert"]:
+                raise CommandError("The uitspraak table is not partitioned; use --convert to convert it")
+            convert_to_partitioned(options["until_year"])
+
+        created = create_partitions(options["until_year"], options["from_year"])
+        logger.info("Created %s partitions", len(created))
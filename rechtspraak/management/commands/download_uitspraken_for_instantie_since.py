@@ -16,14 +16,15 @@ import time
 
 from typing import Any
 
-from django.core.management import BaseCommand
-
+from rechtspraak.cache import bump_data_version
 from rechtspraak.models import Instantie, Uitspraak
-from rechtspraak.utils import get_updated_eclis_for_instantie_since, create_uitspraak_from_ecli
+from rechtspraak.profiling import ProfiledCommand
+from rechtspraak.progress import progress
+from rechtspraak.utils import check_instantie_type, get_updated_eclis_for_instantie_since, create_uitspraak_from_ecli
 logger = logging.getLogger(__name__)
 
 
-class Command(BaseCommand):
+class Command(ProfiledCommand):
     """Download all uitspraken for a given instantie type that were updated since a given date."""
 
     help = "Download all uitspraken for a given instantie type that were updated since a given date."
@@ -31,9 +32,7 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         """Add arguments"""
 
-        instanties_types: list[str] = [ x for x in Instantie.objects.order_by("instantie_type").values_list("instantie_type", flat=True).distinct()]
-
-        parser.add_argument("instantie_type", type=str, choices=instanties_types, help="The instantie type to run the experiment on")
+        parser.add_argument("instantie_type", type=str, help="The instantie type to download the uitspraken of, e.g. Rechtbank or HogeRaad")
         parser.add_argument("since_year", type=int, default=datetime.datetime.now().year, help="Since date, year; defaults to the current year.")
         parser.add_argument("since_month", type=int, default=1, choices=[i for i in range(1, 13)], help="Since date, month; defaults to January")
         parser.add_argument("since_day", type=int, default=1, choices=[i for i in range(1, 32)], help="Since date, day; defaults to 1")
@@ -42,6 +41,7 @@ class Command(BaseCommand):
         """Download all uitspraken for a given instantie type that were updated since a given date."""
 
         instantie_type = options["instantie_type"]
+        check_instantie_type(instantie_type)
         logger.info("Performing experiment one on instanties of type %s", instantie_type)
 
         instanties = Instantie.objects.filter(instantie_type=instantie_type)
@@ -60,14 +60,10 @@ class Command(BaseCommand):
 
         logger.info("Found %s updated ecli's", len(all_eclis))
 
-        cur = 1
-        for ecli in all_eclis:
-            print(f"{cur}/{len(all_eclis)} ({cur/len(all_eclis) * 100}%)")
-            cur += 1
-
+        for ecli in progress(all_eclis, description="Download"):
             try:
                 uitspraak = Uitspraak.objects.get(ecli=ecli)
-                logger.info("%s already exists, skipping", uitspraak)
+                logger.debug("%s already exists, skipping", uitspraak)
                 # TODO add update mechanism
             except Uitspraak.DoesNotExist:
                 try:
@@ -76,4 +72,5 @@ class Command(BaseCommand):
                     logger.error("Failed to crawl %s", ecli)
 
                 time.sleep(1)
-            print(ecli)
\ No newline at end of file
+
+        bump_data_version()
@@ -13,15 +13,18 @@ import logging
 
 from typing import Any
 
-import nllegalcit
-
-from django.core.management import BaseCommand
-
-from rechtspraak.models import Instantie, Uitspraak
+from rechtspraak.cache import bump_data_version
+from rechtspraak.citations import parse_citations, store_citations
+from rechtspraak.counts import data_added
+from rechtspraak.experiments import record_experiment_result
+from rechtspraak.models import Uitspraak
+from rechtspraak.profiling import ProfiledCommand, stage
+from rechtspraak.progress import progress
+from rechtspraak.utils import check_instantie_type
 logger = logging.getLogger(__name__)
 
 
-class Command(BaseCommand):
+class Command(ProfiledCommand):
     """Perform experiment 1"""
 
     help = "Perform experiment 1"
@@ -29,15 +32,14 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         """Add arguments"""
 
-        instanties: list[str] = [ x for x in Instantie.objects.order_by("instantie_type").values_list("instantie_type", flat=True).distinct()]
-
-        parser.add_argument("instantie_type", type=str, help=f"The instantie type to run the experiment on, possible options: {instanties}")
+        parser.add_argument("instantie_type", type=str, help="The instantie type to run the experiment on, e.g. Rechtbank or HogeRaad")
         parser.add_argument("--year", type=int, help="Optionally, the year to limit to; otherwise it runs on all available since 1995-1-1")
 
     def handle(self, *args: Any, **options: Any) -> None:
         """Perform experiment 1"""
 
         instantie_type = options["instantie_type"]
+        check_instantie_type(instantie_type)
         logger.info("Performing experiment one on instanties of type %s", instantie_type)
 
         if options["year"] is None:
@@ -56,6 +58,9 @@ class Command(BaseCommand):
                 uitspraakdatum__range=[daterange_start, daterange_end]
             ).exclude(tekst="").order_by("uitspraakdatum")
 
+        # The instantie is part of the str() of an uitspraak, which is logged for every uitspraak
+        uitspraken = uitspraken.select_related("instantie")
+
         total = uitspraken.count()
 
         logger.info("Found %s total uitspraken in set", total)
@@ -69,26 +74,27 @@ class Command(BaseCommand):
 
         SKIP_SAME_EXP_ID = True
 
-        cur = 1
-        for uitspraak in uitspraken.iterator():
-            print(f"{cur}/{total} ({cur/total * 100}%)")
-            cur += 1
+        for uitspraak in progress(uitspraken.iterator(), total, f"Experiment {experiment_id}"):
 
             if SKIP_SAME_EXP_ID:
                 try:
                     uitspraak.data["experiments"][experiment_id]["id"] = experiment_id
-                    logger.info("Have already seen %s, skipping...", uitspraak)
+                    logger.debug("Have already seen %s, skipping...", uitspraak)
+                    # The result may predate the ExperimentResult table
+                    with stage("write"):
+                        record_experiment_result(uitspraak, experiment_id)
                     continue
                 except:
                     pass
             try:
-                citations = nllegalcit.parse_citations(uitspraak.tekst)
+                with stage("match"):
+                    citations = parse_citations(uitspraak.tekst)
 
                 experiment_info = {
                         "experiment": experiment_name,
                         "id": experiment_id,
                         "datetime": experiment_timestamp,
-                        "citations": [cit.__dict__ for cit in citations],
+                        "citations": citations,
                         "errors": []
                     }
             except Exception as e:
@@ -104,10 +110,21 @@ class Command(BaseCommand):
 
             # print(experiment_info)
 
+            had_data = uitspraak.data != {}
+
             if "experiments" not in uitspraak.data:
                 uitspraak.data = {"experiments": {experiment_id: experiment_info}}
             else:
                 uitspraak.data["experiments"][experiment_id] = experiment_info
 
             # print(uitspraak.data)
-            uitspraak.save()
+            with stage("write"):
+                uitspraak.save()
+                record_experiment_result(uitspraak, experiment_id)
+                store_citations(uitspraak, experiment_id, experiment_info["citations"])
+
+                if not had_data:
+                    data_added(uitspraak)
+
+        # Once for all results, as cached responses and reports include them
+        bump_data_version()
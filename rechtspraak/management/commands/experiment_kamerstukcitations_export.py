@@ -9,79 +9,46 @@
 """
 
 import datetime
-import json
 import logging
 
 from typing import Any
 
-from django.core.management import BaseCommand
-from django.core import serializers
+from django.core.management import CommandParser
 
-from rechtspraak.models import Uitspraak
+from rechtspraak.citations import kamerstuk_citation_counts
+from rechtspraak.experiments import uitspraken_with_experiment
+from rechtspraak.export import EXPORT_FORMATS, export_results, iterate_uitspraken, uitspraak_metadata
+from rechtspraak.profiling import ProfiledCommand
 logger = logging.getLogger(__name__)
 
 
-class Command(BaseCommand):
-    """Add all instanties"""
+class Command(ProfiledCommand):
+    """Export the results of experiment_kamerstukcitations"""
 
-    help = "Add all instanties"
+    help = "Export the results of experiment_kamerstukcitations"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--format", type=str, choices=EXPORT_FORMATS, default="json", help="The output format, defaults to json")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="The number of uitspraken to read at once, defaults to 2000.")
 
     def handle(self, *args: Any, **options: Any) -> None:
         experiment_name = "citations"
         experiment_id = f"{experiment_name}_all_1"
-        uitspraken = Uitspraak.objects.filter(data__experiments__citations_all_1__id="citations_all_1")
+        uitspraken = uitspraken_with_experiment(experiment_id).order_by("id")
 
         total = uitspraken.count()
-        with_citations = 0
-        with_kst_citations = 0
-
-        results = []
-
-        kst_citations_per_uitspraak_with_at_least_1 = {}
-        kst_citations_total = 0
-        kst_citations_probably_mvt = 0
-
-        for uitspraak in uitspraken.iterator():
-
-            try:
-                citations_all = uitspraak.data["experiments"][experiment_id]["citations"]
-                citations_kst = [cit for cit in citations_all if "kamer" in cit]
-
-                if len(citations_all) > 0:
-                    with_citations += 1
-
-                if len(citations_kst) > 0:
-                    with_kst_citations += 1
-                    kst_citations_per_uitspraak_with_at_least_1[uitspraak.ecli] = citations_kst
-
-                    for citkst in citations_kst:
-                        kst_citations_total += 1
-                        if citkst["ondernummer"] == "3":
-                            kst_citations_probably_mvt += 1
-
-                # print(f"{uitspraak} {uitspraak.data['experiments']}: has {len(citations_kst)} kstcitations")
-            except Exception as exc:
-                logger.info("%s has no citations: %s", uitspraak, exc)
-                pass
-
-            results.append({
-                "ecli": uitspraak.ecli,
-                "publicatiedatum": uitspraak.publicatiedatum.strftime("%Y-%m-%d"),
-                "uitspraakdatum": uitspraak.uitspraakdatum.strftime("%Y-%m-%d"),
-                "instantie": uitspraak.instantie.naam,
-                "instantie_type": uitspraak.instantie.instantie_type,
-                "uitspraak_type": uitspraak.uitspraak_type,
-                "rechtsgebieden": [rechtsgebied.naam for rechtsgebied in uitspraak.rechtsgebieden.all()],
-                "procedure_soorten": [proceduresoort.naam for proceduresoort in uitspraak.procedure_soorten.all()],
-                "inhoudsindicatie": uitspraak.inhoudsindicatie,
-                "data": uitspraak.data
-            })
-
-        print(f"{with_kst_citations / total} {with_kst_citations} {total}")
-
-        print(kst_citations_total)
-        print(kst_citations_probably_mvt)
-
-        resultsfilename: str = f"results_{datetime.datetime.now().strftime('%Y-%m-%dT%H:%M')}.json"
-        with open(resultsfilename, "wt", encoding="utf-8") as resultsfile:
-            json.dump(results, resultsfile)
+        counts = kamerstuk_citation_counts(experiment_id)
+
+        results = (
+            {**uitspraak_metadata(uitspraak), "data": uitspraak.data}
+            for uitspraak in iterate_uitspraken(uitspraken, options["chunk_size"])
+        )
+
+        resultsfilename_base: str = f"results_{datetime.datetime.now().strftime('%Y-%m-%dT%H:%M')}"
+        export_results(results, resultsfilename_base, options["format"])
+
+        with_kst_citations = counts["uitspraken_with_kamerstuk_citations"]
+        self.stdout.write(f"{with_kst_citations / total if total else 0} {with_kst_citations} {total}")
+
+        self.stdout.write(str(counts["kamerstuk_citations"]))
+        self.stdout.write(str(counts["kamerstuk_citations_probably_mvt"]))
@@ -16,14 +16,19 @@ import re
 
 from typing import Any
 
-from django.core.management import BaseCommand
-
-from rechtspraak.models import Instantie, Uitspraak
+from rechtspraak.cache import bump_data_version
+from rechtspraak.counts import data_added
+from rechtspraak.experiments import record_experiment_result
+from rechtspraak.models import Uitspraak
+from rechtspraak.profiling import ProfiledCommand, stage
+from rechtspraak.progress import progress
+from rechtspraak.trigrams import regexp_candidates, with_candidate_tekst
+from rechtspraak.utils import check_instantie_type
 
 logger = logging.getLogger(__name__)
 
 
-class Command(BaseCommand):
+class Command(ProfiledCommand):
     """A simple variable experiment for keyword searches"""
 
     help = "A simple variable experiment for keyword searches"
@@ -31,18 +36,10 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         """Add arguments"""
 
-        instanties: list[str] = [
-            x
-            for x in Instantie.objects.order_by("instantie_type")
-            .values_list("instantie_type", flat=True)
-            .distinct()
-        ]
-
         parser.add_argument(
             "instantie_type",
             type=str,
-            choices=instanties,
-            help="The instantie type to run the experiment on",
+            help="The instantie type to run the experiment on, e.g. Rechtbank or HogeRaad",
         )
         parser.add_argument(
             "search_pattern", type=str, help="The regex search pattern to use"
@@ -73,6 +70,7 @@ class Command(BaseCommand):
         """A simple variable experiment for keyword searches"""
 
         instantie_type = options["instantie_type"]
+        check_instantie_type(instantie_type)
         logger.info(
             "Performing experiment one on instanties of type %s", instantie_type
         )
@@ -101,6 +99,9 @@ class Command(BaseCommand):
                 .order_by("uitspraakdatum")
             )
 
+        # The instantie is part of the str() of an uitspraak, which is logged for every uitspraak
+        uitspraken = uitspraken.select_related("instantie")
+
         total = uitspraken.count()
 
         logger.info("Found %s total uitspraken in set", total)
@@ -122,6 +123,12 @@ class Command(BaseCommand):
         logger.info("Provided search pattern: %s", options["search_pattern"])
         search_pattern = re.compile(options["search_pattern"])
 
+        candidates = regexp_candidates(search_pattern)
+        if candidates is None:
+            logger.info("Scanning all uitspraken for the search pattern")
+        else:
+            logger.info("Trigram index found %s candidate uitspraken", len(candidates))
+
         conditional_search_pattern_given = False
         try:
             second_search_pattern = re.compile(options["conditional_search_pattern"])
@@ -133,29 +140,32 @@ class Command(BaseCommand):
             second_search_pattern_str = ""
             logger.info("No conditional 2nd search pattern was provided.")
 
-        cur = 1
-        for uitspraak in uitspraken.iterator():
-            print(f"{cur}/{total} ({cur/total * 100}%)")
-            cur += 1
+        for uitspraak, tekst in progress(with_candidate_tekst(uitspraken, candidates), total, f"Experiment {experiment_id}"):
 
             if SKIP_SAME_EXP_ID:
                 try:
                     uitspraak.data["experiments"][experiment_id]["id"] = experiment_id
-                    logger.info("Have already seen %s, skipping...", uitspraak)
+                    logger.debug("Have already seen %s, skipping...", uitspraak)
                     continue
                 except:
                     pass
             try:
-                matches = search_pattern.findall(uitspraak.tekst)
+                if tekst is None:
+                    # The trigram index rules out a match, so there is no need to scan the tekst
+                    matches = []
+                else:
+                    with stage("match"):
+                        matches = search_pattern.findall(tekst)
 
                 if conditional_search_pattern_given:
                     if len(matches) > 0:
                         logger.info(
                             "Found matches on the initial search pattern, and a second pattern is provided; searching for those as well."
                         )
-                        additional_matches = second_search_pattern.findall(
-                            uitspraak.tekst
-                        )
+                        with stage("match"):
+                            additional_matches = second_search_pattern.findall(
+                                tekst
+                            )
                 else:
                     additional_matches = []
 
@@ -183,10 +193,20 @@ class Command(BaseCommand):
 
             logger.debug("%s: %s", uitspraak, experiment_info)
 
+            had_data = uitspraak.data != {}
+
             if "experiments" not in uitspraak.data:
                 uitspraak.data = {"experiments": {experiment_id: experiment_info}}
             else:
                 uitspraak.data["experiments"][experiment_id] = experiment_info
 
             # print(uitspraak.data)
-            uitspraak.save()
+            with stage("write"):
+                uitspraak.save()
+                record_experiment_result(uitspraak, experiment_id)
+
+                if not had_data:
+                    data_added(uitspraak)
+
+        # Once for all results, as cached responses and reports include them
+        bump_data_version()
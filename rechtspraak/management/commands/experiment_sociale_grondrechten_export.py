@@ -9,65 +9,62 @@
 """
 
 import datetime
-import json
 import logging
 
-from typing import Any
+from typing import Any, Iterator
 
-from django.core.management import BaseCommand
-from django.core import serializers
+from django.core.management import CommandParser
 
-from rechtspraak.models import Uitspraak
+from rechtspraak.experiments import uitspraken_with_experiment
+from rechtspraak.export import EXPORT_FORMATS, export_results, iterate_uitspraken, uitspraak_metadata
+from rechtspraak.profiling import ProfiledCommand
 logger = logging.getLogger(__name__)
 
 
-class Command(BaseCommand):
-    """Add all instanties"""
+class Command(ProfiledCommand):
+    """Export the results of experiment_sociale_grondrechten"""
 
-    help = "Add all instanties"
+    help = "Export the results of experiment_sociale_grondrechten"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--format", type=str, choices=EXPORT_FORMATS, default="json", help="The output format, defaults to json")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="The number of uitspraken to read at once, defaults to 2000.")
 
     def handle(self, *args: Any, **options: Any) -> None:
         experiment_name = "socialegrondrechten"
         experiment_id = f"{experiment_name}_all"
-        uitspraken = Uitspraak.objects.filter(data__experiments__socialegrondrechten_all__id="socialegrondrechten_all", uitspraakdatum__gte=datetime.date(2004,1,1), uitspraakdatum__lte=datetime.date(2021,12,31))
+        # In the same order as export_csv, so an export and the CSV made from it list the uitspraken alike
+        uitspraken = uitspraken_with_experiment(experiment_id).filter(uitspraakdatum__gte=datetime.date(2004,1,1), uitspraakdatum__lte=datetime.date(2021,12,31)).order_by("id")
 
         total = uitspraken.count()
-        with_matches = 0
-        with_second_matches = 0
+        self.with_matches = 0
+        self.with_second_matches = 0
+
+        resultsfilename_base: str = f"results_socialegrondrechten_{datetime.datetime.now().strftime('%Y-%m-%dT%H:%M')}"
+        export_results(self.results(uitspraken, experiment_id, options["chunk_size"]), resultsfilename_base, options["format"])
+
+        self.stdout.write(f"{self.with_matches / total if total else 0} {self.with_matches} {total}")
+        self.stdout.write(f"{self.with_second_matches / total if total else 0} {self.with_second_matches} {total}")
 
-        results = []
+    def results(self, uitspraken, experiment_id: str, chunk_size: int) -> Iterator[dict]:
+        """Generate the export records, counting the uitspraken with matches along the way"""
 
-        for uitspraak in uitspraken.iterator():
+        for uitspraak in iterate_uitspraken(uitspraken, chunk_size):
 
             try:
                 matches = uitspraak.data["experiments"][experiment_id]["matches"]
                 additional_matches = uitspraak.data["experiments"][experiment_id]["additional_matches"]
 
                 if len(matches) > 0:
-                    with_matches += 1
+                    self.with_matches += 1
 
                 if (len(additional_matches)) > 0:
-                    with_second_matches += 1
+                    self.with_second_matches += 1
             except Exception as exc:
                 logger.info("%s has no experiment results: %s", uitspraak, exc)
                 pass
 
-            results.append({
-                "ecli": uitspraak.ecli,
-                "publicatiedatum": uitspraak.publicatiedatum.strftime("%Y-%m-%d"),
-                "uitspraakdatum": uitspraak.uitspraakdatum.strftime("%Y-%m-%d"),
-                "instantie": uitspraak.instantie.naam,
-                "instantie_type": uitspraak.instantie.instantie_type,
-                "uitspraak_type": uitspraak.uitspraak_type,
-                "rechtsgebieden": [rechtsgebied.naam for rechtsgebied in uitspraak.rechtsgebieden.all()],
-                "procedure_soorten": [proceduresoort.naam for proceduresoort in uitspraak.procedure_soorten.all()],
-                "inhoudsindicatie": uitspraak.inhoudsindicatie,
+            yield {
+                **uitspraak_metadata(uitspraak),
                 f"data-{experiment_id}": uitspraak.data["experiments"][experiment_id]
-            })
-
-        print(f"{with_matches / total} {with_matches} {total}")
-        print(f"{with_second_matches / total} {with_second_matches} {total}")
-
-        resultsfilename: str = f"results_socialegrondrechten_{datetime.datetime.now().strftime('%Y-%m-%dT%H:%M')}.json"
-        with open(resultsfilename, "wt", encoding="utf-8") as resultsfile:
-            json.dump(results, resultsfile)
+            }
@@ -0,0 +1,167 @@
+"""
+    rechtspraak/management/commands/export_csv.py
+
+    Export the results of an experiment to CSV, streaming from the database or from an earlier
+    JSON or NDJSON export.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import csv
+import datetime
+import logging
+import sys
+
+from typing import Any, Iterator
+
+from django.core.management import CommandError, CommandParser
+
+from rechtspraak.experiments import uitspraken_with_experiment
+from rechtspraak.export import iter_json_records, iterate_uitspraken, uitspraak_metadata
+from rechtspraak.minhash import distinct_uitspraken
+from rechtspraak.profiling import ProfiledCommand, stage
+
+logger = logging.getLogger(__name__)
+
+METADATA_COLUMNS = [
+    "ecli", "publicatiedatum", "uitspraakdatum", "instantie", "instantie_type", "uitspraak_type",
+    "rechtsgebieden", "procedure_soorten", "inhoudsindicatie"
+]
+RESULT_COLUMNS = ["matches", "additional_matches", "citations", "errors"]
+COLUMNS = METADATA_COLUMNS + RESULT_COLUMNS + [f"{column}_count" for column in RESULT_COLUMNS]
+
+DEFAULT_COLUMNS = "ecli,uitspraakdatum,instantie,uitspraak_type,inhoudsindicatie,matches_count,additional_matches_count,matches,additional_matches"
+
+
+def parse_columns(columns: str) -> list[tuple[str, str]]:
+    """Parse a column specification like "ecli:ECLI,matches_count" into (column, label) pairs"""
+    parsed = []
+
+    for spec in columns.split(","):
+        column, _, label = spec.strip().partition(":")
+        if column not in COLUMNS:
+            raise CommandError(f"Unknown column {column}, choose from {', '.join(COLUMNS)}")
+        parsed.append((column, label or column))
+
+    return parsed
+
+
+def column_value(column: str, metadata: dict, results: dict) -> Any:
+    """The value of a column for a single uitspraak"""
+    if column in METADATA_COLUMNS:
+        value = metadata.get(column, "")
+        # Only the inhoudsindicatie was stripped by the former results-sg-naar-csv.py
+        return value.strip() if column == "inhoudsindicatie" else value
+
+    if column.endswith("_count"):
+        return len(results.get(column[:-len("_count")], []))
+
+    return results.get(column, [])
+
+
+class Command(ProfiledCommand):
+    """Export the results of an experiment to CSV"""
+
+    help = "Export the results of an experiment to CSV"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("experiment_id", type=str, help="The ID of the experiment to export, e.g. socialegrondrechten_all")
+        parser.add_argument("output", type=str, help="The CSV file to write to, or - for standard output")
+        parser.add_argument(
+            "--from-export",
+            type=str,
+            help="Read from a JSON or NDJSON file created by one of the export commands, instead of from the database."
+        )
+        parser.add_argument(
+            "--columns",
+            type=str,
+            default=DEFAULT_COLUMNS,
+            help=f"Comma-separated columns to export, optionally with a header label (column:label). Available: {', '.join(COLUMNS)}"
+        )
+        parser.add_argument("--only-with-matches", action="store_true", help="Only export uitspraken with at least one match or citation")
+        parser.add_argument("--instantie-type", type=str, help="Only export uitspraken of this instantie type")
+        parser.add_argument("--year", type=int, help="Only export uitspraken from this year")
+        parser.add_argument(
+            "--skip-near-duplicates",
+            action="store_true",
+            help="Only export the first uitspraak of every cluster of near-duplicates found by find_near_duplicates"
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        columns = parse_columns(options["columns"])
+
+        if options["from_export"] is None:
+            rows = self.rows_from_database(options)
+        else:
+            rows = self.rows_from_export(options)
+
+        if options["output"] == "-":
+            self.write_csv(rows, columns, sys.stdout, options["only_with_matches"])
+        else:
+            with open(options["output"], "wt", encoding="utf-8", newline="") as csvfile:
+                self.write_csv(rows, columns, csvfile, options["only_with_matches"])
+
+    def write_csv(self, rows: Iterator[tuple[dict, dict]], columns: list[tuple[str, str]], csvfile: Any, only_with_matches: bool) -> None:
+        """Write CSV rows as they are produced"""
+
+        # The same dialect as the CSV files created by the former results-sg-naar-csv.py
+        csvwr = csv.writer(csvfile, delimiter=',', quoting=csv.QUOTE_ALL, quotechar='|')
+        csvwr.writerow([label for _column, label in columns])
+
+        written = 0
+        for metadata, results in rows:
+            if only_with_matches and not (results.get("matches") or results.get("citations")):
+                continue
+
+            with stage("write"):
+                csvwr.writerow([column_value(column, metadata, results) for column, _label in columns])
+            written += 1
+
+        logger.info("Wrote %s rows", written)
+
+    def rows_from_database(self, options: dict[str, Any]) -> Iterator[tuple[dict, dict]]:
+        """Yield (metadata, experiment results) for every uitspraak in the database with results"""
+
+        experiment_id = options["experiment_id"]
+        uitspraken = uitspraken_with_experiment(experiment_id, with_matches=options["only_with_matches"]).order_by("id")
+
+        if options["instantie_type"] is not None:
+            uitspraken = uitspraken.filter(instantie__instantie_type=options["instantie_type"])
+
+        if options["year"] is not None:
+            uitspraken = uitspraken.filter(
+                uitspraakdatum__range=[datetime.date(options["year"], 1, 1), datetime.date(options["year"], 12, 31)]
+            )
+
+        if options["skip_near_duplicates"]:
+            uitspraken = distinct_uitspraken(uitspraken)
+
+        for uitspraak in iterate_uitspraken(uitspraken):
+            yield uitspraak_metadata(uitspraak), uitspraak.data["experiments"][experiment_id]
+
+    def rows_from_export(self, options: dict[str, Any]) -> Iterator[tuple[dict, dict]]:
+        """Yield (metadata, experiment results) for every record with results in an export file"""
+
+        experiment_id = options["experiment_id"]
+
+        with open(options["from_export"], "rt", encoding="utf-8") as exportfile:
+            for record in iter_json_records(exportfile):
+                if f"data-{experiment_id}" in record:
+                    results = record[f"data-{experiment_id}"]
+                else:
+                    results = record.get("data", {}).get("experiments", {}).get(experiment_id)
+
+                if results is None:
+                    continue
+
+                if options["instantie_type"] is not None and record["instantie_type"] != options["instantie_type"]:
+                    continue
+
+                if options["year"] is not None and not record["uitspraakdatum"].startswith(f"{options['year']:04d}-"):
+                    continue
+
+                yield record, results
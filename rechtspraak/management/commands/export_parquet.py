@@ -0,0 +1,159 @@
+"""
+    rechtspraak/management/commands/export_parquet.py
+
+    Export the metadata of uitspraken, and the number of matches found by experiments, to a
+    partitioned Parquet dataset.
+
+    Requires pyarrow, which is an optional dependency (see requirements.txt).
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import logging
+
+from pathlib import Path
+from typing import Any
+
+from django.core.management import CommandError, CommandParser
+
+from rechtspraak.export import EXPERIMENT_COUNT_FIELDS, experiment_counts, iterate_uitspraken
+from rechtspraak.minhash import distinct_uitspraken
+from rechtspraak.models import Uitspraak
+from rechtspraak.profiling import ProfiledCommand, stage
+from rechtspraak.progress import progress
+
+logger = logging.getLogger(__name__)
+
+PARTITIONINGS = ["year", "instantie_type", "none"]
+
+
+class Command(ProfiledCommand):
+    """Export the metadata of uitspraken and experiment match counts to a partitioned Parquet dataset"""
+
+    help = "Export the metadata of uitspraken and experiment match counts to a partitioned Parquet dataset"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("output_dir", type=str, help="The directory to write the dataset to.")
+        parser.add_argument("--partition-by", type=str, choices=PARTITIONINGS, default="year", help="How to partition the dataset, defaults to year")
+        parser.add_argument(
+            "--experiment-id",
+            type=str,
+            action="append",
+            default=[],
+            help="Include the match counts of this experiment; may be given multiple times."
+        )
+        parser.add_argument("--instantie-type", type=str, help="Optionally, only export uitspraken of this instantie type.")
+        parser.add_argument("--compression", type=str, default="zstd", help="The Parquet compression codec, defaults to zstd")
+        parser.add_argument("--chunk-size", type=int, default=10000, help="The number of uitspraken per row group, defaults to 10000.")
+        parser.add_argument(
+            "--skip-near-duplicates",
+            action="store_true",
+            help="Only export the first uitspraak of every cluster of near-duplicates found by find_near_duplicates."
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        try:
+            import pyarrow as pa  # pylint: disable=import-outside-toplevel
+            import pyarrow.parquet as pq  # pylint: disable=import-outside-toplevel
+        except ImportError as exc:
+            raise CommandError("export_parquet requires pyarrow, install it with pip install pyarrow") from exc
+
+        output_dir = Path(options["output_dir"])
+        partition_by = options["partition_by"]
+        experiment_ids = options["experiment_id"]
+
+        fields = [
+            pa.field("id", pa.int64()),
+            pa.field("ecli", pa.string()),
+            pa.field("zaaknummer", pa.string()),
+            pa.field("publicatiedatum", pa.date32()),
+            pa.field("uitspraakdatum", pa.date32()),
+            pa.field("year", pa.int16()),
+            pa.field("instantie", pa.string()),
+            pa.field("instantie_type", pa.string()),
+            pa.field("uitspraak_type", pa.string()),
+            pa.field("rechtsgebieden", pa.list_(pa.string())),
+            pa.field("procedure_soorten", pa.list_(pa.string())),
+            pa.field("inhoudsindicatie", pa.string()),
+        ]
+        for experiment_id in experiment_ids:
+            fields += [pa.field(f"{experiment_id}__{field}", pa.int32()) for field in EXPERIMENT_COUNT_FIELDS]
+
+        # The partition column is encoded in the directory names, as in Hive
+        schema = pa.schema([field for field in fields if field.name != partition_by])
+
+        # Order by partition, so that only one partition needs to be open at any time
+        ordering = {"year": ["uitspraakdatum", "id"], "instantie_type": ["instantie__instantie_type", "id"], "none": ["id"]}
+        uitspraken = Uitspraak.objects.order_by(*ordering[partition_by])
+        if options["instantie_type"] is not None:
+            uitspraken = uitspraken.filter(instantie__instantie_type=options["instantie_type"])
+        if options["skip_near_duplicates"]:
+            uitspraken = distinct_uitspraken(uitspraken)
+
+        writer = None
+        partition = None
+        partitions = 0
+        columns: dict[str, list] = {name: [] for name in schema.names}
+        exported = 0
+
+        def flush() -> None:
+            if columns["id"]:
+                with stage("write"):
+                    writer.write_table(pa.table(columns, schema=schema))
+            for values in columns.values():
+                values.clear()
+
+        try:
+            total = uitspraken.count()
+            for uitspraak in progress(iterate_uitspraken(uitspraken, options["chunk_size"]), total, "Parquet export"):
+                row = {
+                    "id": uitspraak.id,
+                    "ecli": uitspraak.ecli,
+                    "zaaknummer": uitspraak.zaaknummer,
+                    "publicatiedatum": uitspraak.publicatiedatum,
+                    "uitspraakdatum": uitspraak.uitspraakdatum,
+                    "year": uitspraak.uitspraakdatum.year,
+                    "instantie": uitspraak.instantie.naam,
+                    "instantie_type": uitspraak.instantie.instantie_type,
+                    "uitspraak_type": uitspraak.uitspraak_type,
+                    "rechtsgebieden": [rechtsgebied.naam for rechtsgebied in uitspraak.rechtsgebieden.all()],
+                    "procedure_soorten": [proceduresoort.naam for proceduresoort in uitspraak.procedure_soorten.all()],
+                    "inhoudsindicatie": uitspraak.inhoudsindicatie,
+                }
+                for experiment_id in experiment_ids:
+                    row.update(experiment_counts(uitspraak, experiment_id))
+
+                row_partition = row.pop(partition_by, None)
+
+                if writer is None or row_partition != partition:
+                    if writer is not None:
+                        flush()
+                        writer.close()
+
+                    partition = row_partition
+                    partitions += 1
+                    if partition_by == "none":
+                        path = output_dir / "part-0.parquet"
+                    else:
+                        path = output_dir / f"{partition_by}={partition}" / "part-0.parquet"
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    writer = pq.ParquetWriter(path, schema, compression=options["compression"])
+
+                for name, value in row.items():
+                    columns[name].append(value)
+
+                exported += 1
+                if len(columns["id"]) >= options["chunk_size"]:
+                    flush()
+
+            if writer is not None:
+                flush()
+        finally:
+            if writer is not None:
+                writer.close()
+
+        logger.info("Exported %s uitspraken in %s partitions to %s", exported, partitions, output_dir)
@@ -0,0 +1,63 @@
+"""
+    rechtspraak/management/commands/find_near_duplicates.py
+
+    Compute the MinHash signatures of new and changed uitspraken, and find the clusters of
+    near-duplicates among all uitspraken (see rechtspraak/minhash.py).
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import logging
+
+from typing import Any
+
+from django.core.management import CommandError, CommandParser
+
+from rechtspraak.minhash import DEFAULT_BANDS, DEFAULT_CHUNK_SIZE, DEFAULT_THRESHOLD, NUM_BINS, cluster_signatures, update_signatures
+from rechtspraak.profiling import ProfiledCommand
+
+logger = logging.getLogger(__name__)
+
+
+class Command(ProfiledCommand):
+    """Find the clusters of near-duplicate uitspraken with MinHash LSH"""
+
+    help = "Find the clusters of near-duplicate uitspraken with MinHash LSH"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--full", action="store_true", help="Compute the signatures of all uitspraken again.")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=DEFAULT_THRESHOLD,
+            help=f"The minimum estimated Jaccard similarity of near-duplicates, defaults to {DEFAULT_THRESHOLD}."
+        )
+        parser.add_argument(
+            "--bands",
+            type=int,
+            default=DEFAULT_BANDS,
+            help=f"The number of LSH bands, a divisor of {NUM_BINS}; more bands find more pairs below the threshold. Defaults to {DEFAULT_BANDS}."
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f"The number of uitspraken to read at once, defaults to {DEFAULT_CHUNK_SIZE}."
+        )
+        parser.add_argument("--signatures-only", action="store_true", help="Only compute the signatures, do not find the clusters.")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if NUM_BINS % options["bands"]:
+            raise CommandError(f"The number of bands must be a divisor of {NUM_BINS}")
+        if not 0 < options["threshold"] <= 1:
+            raise CommandError("The threshold must be between 0 and 1")
+
+        computed = update_signatures(full=options["full"], chunk_size=options["chunk_size"])
+        logger.info("Computed %s signatures", computed)
+
+        if not options["signatures_only"]:
+            logger.info("%s", cluster_signatures(bands=options["bands"], threshold=options["threshold"]))
@@ -0,0 +1,71 @@
+"""
+    rechtspraak/management/commands/generate_synthetic_corpus.py
+
+    Write synthetic uitspraken in the XML format of Open Data van de Rechtspraak, e.g. for benchmarks.
+    See rechtspraak/synthetic.py.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import logging
+
+from pathlib import Path
+from typing import Any
+
+from django.core.management import CommandParser
+
+from rechtspraak.profiling import ProfiledCommand
+from rechtspraak.synthetic import CorpusConfig, create_synthetic_labels, write_corpus
+
+logger = logging.getLogger(__name__)
+
+
+class Command(ProfiledCommand):
+    """Write synthetic uitspraken in the XML format of Open Data van de Rechtspraak"""
+
+    help = "Write synthetic uitspraken in the XML format of Open Data van de Rechtspraak"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        defaults = CorpusConfig()
+
+        parser.add_argument("output_dir", type=str, help="The directory to write the XML files to.")
+        parser.add_argument("count", type=int, help="The number of uitspraken to generate.")
+        parser.add_argument("--seed", type=int, default=defaults.seed, help="The random seed; the same seed gives the same corpus.")
+        parser.add_argument("--first-number", type=int, default=defaults.first_number, help="The number in the ECLI of the first uitspraak.")
+        parser.add_argument("--median-paragraphs", type=int, default=defaults.median_paragraphs, help="The median number of paragraphs per uitspraak.")
+        parser.add_argument(
+            "--paragraph-sigma",
+            type=float,
+            default=defaults.paragraph_sigma,
+            help="The spread of the (log-normal) number of paragraphs; 0 gives uitspraken of the same size."
+        )
+        parser.add_argument("--max-procedures", type=int, default=defaults.max_procedures, help="The maximum number of procedures per uitspraak.")
+        parser.add_argument("--max-rechtsgebieden", type=int, default=defaults.max_rechtsgebieden, help="The maximum number of rechtsgebieden per uitspraak.")
+        parser.add_argument("--conclusie-fraction", type=float, default=defaults.conclusie_fraction, help="The fraction of conclusies.")
+        parser.add_argument("--citation-rate", type=float, default=defaults.citation_rate, help="The probability of a citation per sentence.")
+        parser.add_argument(
+            "--create-labels",
+            action="store_true",
+            help="Also create the instanties, rechtsgebieden and procedures of the synthetic uitspraken in the database."
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        config = CorpusConfig(
+            seed=options["seed"],
+            first_number=options["first_number"],
+            median_paragraphs=options["median_paragraphs"],
+            paragraph_sigma=options["paragraph_sigma"],
+            max_procedures=options["max_procedures"],
+            max_rechtsgebieden=options["max_rechtsgebieden"],
+            conclusie_fraction=options["conclusie_fraction"],
+            citation_rate=options["citation_rate"]
+        )
+
+        if options["create_labels"]:
+            create_synthetic_labels()
+
+        write_corpus(Path(options["output_dir"]), options["count"], config)
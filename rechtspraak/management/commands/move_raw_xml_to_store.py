@@ -0,0 +1,79 @@
+"""
+    rechtspraak/management/commands/move_raw_xml_to_store.py
+
+    Move the raw XML of existing uitspraken from the database to the raw XML store configured with
+    RECHTSPRAAK_RAW_XML_STORE, or back with --restore.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import logging
+
+from typing import Any
+
+from django.core.management import CommandError, CommandParser
+from django.db import transaction
+
+from rechtspraak.blobstore import raw_xml_store
+from rechtspraak.models import Uitspraak
+from rechtspraak.profiling import ProfiledCommand, stage
+from rechtspraak.progress import Progress
+
+logger = logging.getLogger(__name__)
+
+
+class Command(ProfiledCommand):
+    """Move the raw XML of uitspraken from the database to the raw XML store, in chunks"""
+
+    help = "Move the raw XML of uitspraken from the database to the raw XML store, in chunks"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--chunk-size", type=int, default=1000, help="The number of uitspraken to move at once, defaults to 1000.")
+        parser.add_argument("--restore", action="store_true", help="Move the raw XML from the store back into the database instead.")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        store = raw_xml_store()
+        if store is None:
+            raise CommandError("Set RECHTSPRAAK_RAW_XML_STORE to the directory of the raw XML store first")
+
+        if options["restore"]:
+            uitspraken = Uitspraak.objects.exclude(raw_xml_hash="")
+        else:
+            uitspraken = Uitspraak.objects.filter(raw_xml_hash="").exclude(raw_xml="")
+
+        total = uitspraken.count()
+        logger.info("Found %s uitspraken to move", total)
+
+        reporter = Progress(total, "Raw XML")
+        last_id = 0
+
+        while True:
+            chunk = list(uitspraken.filter(id__gt=last_id).order_by("id").only("id", "raw_xml", "raw_xml_hash")[:options["chunk_size"]])
+
+            if not chunk:
+                break
+
+            for uitspraak in chunk:
+                if options["restore"]:
+                    uitspraak.raw_xml, uitspraak.raw_xml_hash = store.get_text(uitspraak.raw_xml_hash), ""
+                else:
+                    uitspraak.raw_xml, uitspraak.raw_xml_hash = "", store.put(uitspraak.raw_xml)
+
+            # The raw XML must be on disk before the hashes referring to it are committed
+            store.flush()
+
+            with stage("write"), transaction.atomic():
+                Uitspraak.objects.bulk_update(chunk, ["raw_xml", "raw_xml_hash"])
+
+            last_id = chunk[-1].id
+            reporter.update(len(chunk))
+
+        reporter.close()
+        store.close_writer()
+
+        if not options["restore"]:
+            logger.info("Run VACUUM on the database to give the space of the moved raw XML back to the file system")
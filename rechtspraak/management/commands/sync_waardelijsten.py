@@ -0,0 +1,45 @@
+"""
+    rechtspraak/management/commands/sync_waardelijsten.py
+
+    Synchronise the instanties, rechtsgebieden and procedures with the waardelijsten of Open Data
+    Rechtspraak (see rechtspraak/waardelijsten.py).
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import logging
+
+from typing import Any
+
+from django.core.management import CommandError, CommandParser
+
+from rechtspraak.profiling import ProfiledCommand
+from rechtspraak.waardelijsten import WAARDELIJSTEN, sync_waardelijsten
+
+logger = logging.getLogger(__name__)
+
+
+class Command(ProfiledCommand):
+    """Add and update the instanties, rechtsgebieden and procedures from the waardelijsten"""
+
+    help = "Add and update the instanties, rechtsgebieden and procedures from the waardelijsten"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "waardelijsten",
+            nargs="*",
+            help=f"The waardelijsten to synchronise, from {', '.join(WAARDELIJSTEN)}; defaults to all."
+        )
+        parser.add_argument("--force", action="store_true", help="Download the waardelijsten even if they have not been modified since the last run.")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        unknown = set(options["waardelijsten"]) - WAARDELIJSTEN.keys()
+        if unknown:
+            raise CommandError(f"Unknown waardelijsten {', '.join(sorted(unknown))}, choose from: {', '.join(WAARDELIJSTEN)}")
+
+        for result in sync_waardelijsten(options["waardelijsten"], force=options["force"]):
+            logger.info("%s", result)
@@ -10,26 +10,44 @@
 
 from typing import Any
 
-from django.core.management import BaseCommand
+from django.core.management import CommandParser
 
-from rechtspraak.models import Instantie, Uitspraak
+from rechtspraak.counts import counts_report, refresh_counts
+from rechtspraak.profiling import ProfiledCommand
 
 
-class Command(BaseCommand):
-    """Add all instanties"""
+class Command(ProfiledCommand):
+    """Print the number of uitspraken per instantie type"""
 
-    help = "Add all instanties"
+    help = "Print the number of uitspraken per instantie type"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--refresh", action="store_true", help="Recompute the materialised counts from scratch first")
+        parser.add_argument("--per-year", action="store_true", help="Also print the counts per instantie type and year")
+        parser.add_argument("--per-rechtsgebied", action="store_true", help="Also print the counts per rechtsgebied")
 
     def handle(self, *args: Any, **options: Any) -> None:
-        instantie_types = Instantie.objects.order_by("instantie_type").values_list("instantie_type", flat=True).distinct()
+        if options["refresh"]:
+            refresh_counts()
+
+        counts = counts_report("instantie_type")
 
         print("instantie\taantal uitspraken, totaal\taantal uitspraken met tekst\taantal uitspraken met data")
-        total = Uitspraak.objects.all().count()
-        total_tekst = Uitspraak.objects.exclude(tekst="").count()
-        total_data = Uitspraak.objects.exclude(data={}).count()
+        total = sum(row["total"] for row in counts)
+        total_tekst = sum(row["with_tekst"] for row in counts)
+        total_data = sum(row["with_data"] for row in counts)
         print(f"[Alle]\t{total}\t{total_tekst}\t{total_data}")
-        for instantie in instantie_types:
-            aantal_uitspraken = Uitspraak.objects.filter(instantie__instantie_type=str(instantie)).count()
-            aantal_uitspraken_tekst = Uitspraak.objects.filter(instantie__instantie_type=str(instantie)).exclude(tekst="").count()
-            aantal_uitspraken_data = Uitspraak.objects.filter(instantie__instantie_type=str(instantie)).exclude(data={}).count()
-            print(f"{instantie}\t{aantal_uitspraken}\t{aantal_uitspraken_tekst}\t{aantal_uitspraken_data}")
+        for row in counts:
+            print(f"{row['instantie_type']}\t{row['total']}\t{row['with_tekst']}\t{row['with_data']}")
+
+        if options["per_year"]:
+            print()
+            print("instantie\tjaar\taantal uitspraken, totaal\taantal uitspraken met tekst\taantal uitspraken met data")
+            for row in counts_report("year"):
+                print(f"{row['instantie_type']}\t{row['year']}\t{row['total']}\t{row['with_tekst']}\t{row['with_data']}")
+
+        if options["per_rechtsgebied"]:
+            print()
+            print("rechtsgebied\taantal uitspraken, totaal\taantal uitspraken met tekst\taantal uitspraken met data")
+            for row in counts_report("rechtsgebied"):
+                print(f"{row['rechtsgebied']}\t{row['total']}\t{row['with_tekst']}\t{row['with_data']}")
@@ -0,0 +1,102 @@
+"""
+    rechtspraak/memo.py
+
+    A persistent memo cache for deterministic text-analysis functions.
+
+    Results are stored in the database, keyed by the name of the function, its version and the
+    SHA-256 hash of the analysed text. As long as neither the text nor the version of the function
+    changes, the analysis is never repeated, regardless of the experiment it is run for.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import hashlib
+import logging
+
+from typing import Any, Callable, Union
+
+from django.db import IntegrityError, transaction
+
+from rechtspraak.models import TextAnalysisMemo
+
+logger = logging.getLogger(__name__)
+
+
+def text_hash(text: str) -> str:
+    """The hash used to identify a text in the memo cache"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class MemoizedTextFunction:
+    """A deterministic function of a text whose results are memoized in the database
+
+    The result of the function must be JSON serializable. Exceptions raised by the function are
+    not memoized.
+    """
+
+    def __init__(self, name: str, func: Callable[[str], Any], version: Union[str, Callable[[], str]]):
+        self.name = name
+        self.func = func
+        self._version = version
+
+    @property
+    def version(self) -> str:
+        """The version of the function; results of other versions are ignored"""
+        if callable(self._version):
+            self._version = self._version()
+        return self._version
+
+    def __call__(self, text: str) -> Any:
+        digest = text_hash(text)
+
+        try:
+            memo = TextAnalysisMemo.objects.get(function=self.name, version=self.version, text_hash=digest)
+            logger.debug("Memo hit for %s on %s", self.name, digest)
+            return memo.result
+        except TextAnalysisMemo.DoesNotExist:
+            pass
+
+        result = self.func(text)
+
+        try:
+            with transaction.atomic():
+                TextAnalysisMemo.objects.create(function=self.name, version=self.version, text_hash=digest, result=result)
+        except IntegrityError:
+            # Someone else analysed the same text in the meantime
+            pass
+
+        return result
+
+    def forget(self) -> int:
+        """Remove all memoized results for this function; returns the number of results removed"""
+        deleted, _ = TextAnalysisMemo.objects.filter(function=self.name).delete()
+        return deleted
+
+    def __repr__(self) -> str:
+        return f"MemoizedTextFunction ({self.name} {self.version})"
+
+
+registry: dict[str, MemoizedTextFunction] = {}
+
+
+def memoize(name: str, version: Union[str, Callable[[], str]]) -> Callable[[Callable[[str], Any]], MemoizedTextFunction]:
+    """Decorator to register a deterministic text-analysis function with the memo cache
+
+    name -- a unique name for the function, used as part of the key in the cache
+    version -- the version of the function, or a callable that returns it; bump it whenever the
+        results of the function may change.
+    """
+
+    def decorator(func: Callable[[str], Any]) -> MemoizedTextFunction:
+        if name in registry:
+            raise ValueError(f"A text-analysis function named {name} has already been registered")
+
+        memoized = MemoizedTextFunction(name, func, version)
+        registry[name] = memoized
+        return memoized
+
+    return decorator
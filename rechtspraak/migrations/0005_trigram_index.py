@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rechtspraak', '0004_remove_uitspraak_rechtspraak_ecli_9cb2c1_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uitspraak',
+            name='trigram_indexed',
+            field=models.BooleanField(default=False, help_text='Whether the current tekst has been added to the trigram index.'),
+        ),
+        migrations.CreateModel(
+            name='TrigramPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('postings', models.BinaryField(help_text='zlib-compressed array of sorted Uitspraak ids.')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['trigram'], name='rechtspraak_trigram_e9a38d_idx')],
+            },
+        ),
+    ]
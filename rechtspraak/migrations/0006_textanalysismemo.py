@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rechtspraak', '0005_trigram_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TextAnalysisMemo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('function', models.CharField(max_length=128)),
+                ('version', models.CharField(max_length=128)),
+                ('text_hash', models.CharField(help_text='SHA-256 hex digest of the analysed text.', max_length=64)),
+                ('result', models.JSONField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('function', 'version', 'text_hash'), name='unique_text_analysis_memo')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rechtspraak', '0006_textanalysismemo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Citation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('experiment_id', models.CharField(help_text='The ID of the experiment in which the citation was found.', max_length=128)),
+                ('citation_type', models.CharField(choices=[('kamerstuk', 'Kamerstuk'), ('handeling', 'Handeling'), ('ecli', 'Ecli'), ('ljn', 'Ljn'), ('other', 'Other')], max_length=16)),
+                ('kamer', models.CharField(blank=True, max_length=16)),
+                ('vergaderjaar', models.CharField(blank=True, max_length=16)),
+                ('dossiernummer', models.CharField(blank=True, max_length=64)),
+                ('ondernummer', models.CharField(blank=True, max_length=64)),
+                ('paginaverwijzing', models.CharField(blank=True, max_length=256)),
+                ('ecli', models.CharField(blank=True, help_text='The cited ECLI, for ECLI citations.', max_length=128)),
+                ('ljn', models.CharField(blank=True, help_text='The cited LJN, for LJN citations.', max_length=16)),
+                ('matched_text', models.TextField(blank=True)),
+                ('data', models.JSONField(default=dict, help_text='The citation as returned by nllegalcit.')),
+                ('uitspraak', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='citations', to='rechtspraak.uitspraak')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['experiment_id', 'citation_type'], name='rechtspraak_experim_80eb99_idx'), models.Index(fields=['citation_type', 'dossiernummer', 'ondernummer'], name='rechtspraak_citatio_9124e7_idx'), models.Index(fields=['citation_type', 'vergaderjaar'], name='rechtspraak_citatio_cc9b7d_idx'), models.Index(fields=['ecli'], name='rechtspraak_ecli_5809de_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Q
+from django.db.models.functions import ExtractYear
+
+
+def fill_counts(apps, schema_editor):
+    """Materialise the counts for the uitspraken that are already in the database"""
+    Uitspraak = apps.get_model("rechtspraak", "Uitspraak")
+    UitspraakCounts = apps.get_model("rechtspraak", "UitspraakCounts")
+    RechtsgebiedCounts = apps.get_model("rechtspraak", "RechtsgebiedCounts")
+
+    uitspraak_counts = (
+        Uitspraak.objects.values("instantie_id", year=ExtractYear("uitspraakdatum"))
+        .annotate(
+            total=Count("id"),
+            with_tekst=Count("id", filter=~Q(tekst="")),
+            with_data=Count("id", filter=~Q(data={}))
+        )
+        .order_by()
+    )
+    UitspraakCounts.objects.bulk_create((UitspraakCounts(**row) for row in uitspraak_counts), batch_size=1000)
+
+    rechtsgebied_counts = (
+        Uitspraak.rechtsgebieden.through.objects
+        .values("rechtsgebied_id", instantie_id=F("uitspraak__instantie_id"), year=ExtractYear("uitspraak__uitspraakdatum"))
+        .annotate(
+            total=Count("uitspraak_id"),
+            with_tekst=Count("uitspraak_id", filter=~Q(uitspraak__tekst="")),
+            with_data=Count("uitspraak_id", filter=~Q(uitspraak__data={}))
+        )
+        .order_by()
+    )
+    RechtsgebiedCounts.objects.bulk_create((RechtsgebiedCounts(**row) for row in rechtsgebied_counts), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rechtspraak', '0007_citation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RechtsgebiedCounts',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField(help_text='The year of the uitspraakdatum.')),
+                ('total', models.IntegerField(default=0)),
+                ('with_tekst', models.IntegerField(default=0)),
+                ('with_data', models.IntegerField(default=0)),
+                ('instantie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rechtspraak.instantie')),
+                ('rechtsgebied', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rechtspraak.rechtsgebied')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('rechtsgebied', 'instantie', 'year'), name='unique_rechtsgebiedcounts')],
+            },
+        ),
+        migrations.CreateModel(
+            name='UitspraakCounts',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField(help_text='The year of the uitspraakdatum.')),
+                ('total', models.IntegerField(default=0)),
+                ('with_tekst', models.IntegerField(default=0)),
+                ('with_data', models.IntegerField(default=0)),
+                ('instantie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rechtspraak.instantie')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('instantie', 'year'), name='unique_uitspraakcounts')],
+            },
+        ),
+        migrations.RunPython(fill_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rechtspraak', '0008_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExperimentResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('experiment_id', models.CharField(max_length=128)),
+                ('experiment', models.CharField(help_text='The name of the experiment.', max_length=128)),
+                ('match_count', models.IntegerField(null=True)),
+                ('additional_match_count', models.IntegerField(null=True)),
+                ('citation_count', models.IntegerField(null=True)),
+                ('error_count', models.IntegerField(default=0)),
+                ('uitspraak', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='experiment_results', to='rechtspraak.uitspraak')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['experiment_id', 'match_count'], name='rechtspraak_experim_a48bad_idx'), models.Index(fields=['experiment_id', 'citation_count'], name='rechtspraak_experim_e3b7a8_idx'), models.Index(fields=['experiment_id', 'error_count'], name='rechtspraak_experim_c57a73_idx')],
+                'constraints': [models.UniqueConstraint(fields=('uitspraak', 'experiment_id'), name='unique_experimentresult')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rechtspraak', '0009_experimentresult'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uitspraak',
+            name='last_modified',
+            field=models.DateTimeField(auto_now=True, help_text='When this uitspraak was last changed in this database.'),
+        ),
+        migrations.AddIndex(
+            model_name='uitspraak',
+            index=models.Index(fields=['uitspraakdatum'], name='rechtspraak_uitspra_cc737a_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:25
+
+import datetime
+
+from django.conf import settings
+from django.db import migrations
+
+
+def partition_uitspraak(apps, schema_editor):
+    """Partition the uitspraak table by year, if enabled with RECHTSPRAAK_PARTITION_BY_YEAR on PostgreSQL"""
+    if schema_editor.connection.vendor != "postgresql" or not getattr(settings, "RECHTSPRAAK_PARTITION_BY_YEAR", False):
+        return
+
+    # pylint: disable=import-outside-toplevel
+    from rechtspraak.partitioning import convert_to_partitioned
+
+    convert_to_partitioned(until_year=datetime.date.today().year + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rechtspraak', '0010_uitspraak_last_modified'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_uitspraak, migrations.RunPython.noop),
+    ]
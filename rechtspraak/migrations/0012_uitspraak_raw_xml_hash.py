@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rechtspraak', '0011_partition_uitspraak'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uitspraak',
+            name='raw_xml_hash',
+            field=models.CharField(blank=True, default='', help_text='The SHA-256 hash of the XML in the raw XML store (see rechtspraak/blobstore.py), if it is kept there.', max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='uitspraak',
+            name='raw_xml',
+            field=models.TextField(help_text='The XML of the uitspraak; empty if it is kept in the raw XML store.'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rechtspraak', '0012_uitspraak_raw_xml_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MinHashSignature',
+            fields=[
+                ('uitspraak', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='minhash', serialize=False, to='rechtspraak.uitspraak')),
+                ('checksum', models.BigIntegerField(help_text='CRC-32 of the tekst the signature was computed from.')),
+                ('signature', models.BinaryField(help_text='Array of the minimum hash per bin, as unsigned 32-bit integers.')),
+                ('computed_at', models.DateTimeField()),
+                ('cluster', models.BigIntegerField(help_text='The lowest id of the uitspraken in the cluster of near-duplicates of this uitspraak; its own id if there are none.', null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['cluster'], name='rechtspraak_cluster_77154e_idx')],
+            },
+        ),
+    ]
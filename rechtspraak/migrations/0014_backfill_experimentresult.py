@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:20
+
+from django.db import migrations
+
+
+def _count(results, key):
+    value = results.get(key)
+    return len(value) if isinstance(value, list) else None
+
+
+def backfill_experiment_results(apps, schema_editor):
+    """Add the ExperimentResults that are missing for the experiment results in the data of uitspraken
+
+    Afterwards, every experiment result in Uitspraak.data has an ExperimentResult, so the
+    experiments and exports can rely on the ExperimentResult table alone.
+    """
+    Uitspraak = apps.get_model("rechtspraak", "Uitspraak")
+    ExperimentResult = apps.get_model("rechtspraak", "ExperimentResult")
+
+    uitspraken = Uitspraak.objects.exclude(data={})
+    last_id = 0
+
+    while True:
+        chunk = list(uitspraken.filter(id__gt=last_id).order_by("id").values_list("id", "data")[:1000])
+        if not chunk:
+            break
+
+        results = []
+        for uitspraak_id, data in chunk:
+            experiments = data.get("experiments", {}) if isinstance(data, dict) else {}
+            for experiment_id, result in experiments.items():
+                if not isinstance(result, dict):
+                    continue
+                results.append(ExperimentResult(
+                    uitspraak_id=uitspraak_id,
+                    experiment_id=experiment_id,
+                    experiment=result.get("experiment", ""),
+                    match_count=_count(result, "matches"),
+                    additional_match_count=_count(result, "additional_matches"),
+                    citation_count=_count(result, "citations"),
+                    error_count=_count(result, "errors") or 0
+                ))
+
+        # Existing ExperimentResults are kept
+        ExperimentResult.objects.bulk_create(results, batch_size=1000, ignore_conflicts=True)
+        last_id = chunk[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rechtspraak', '0013_minhashsignature'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_experiment_results, migrations.RunPython.noop),
+    ]
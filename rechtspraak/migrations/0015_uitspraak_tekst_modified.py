@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:41
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_tekst_modified(apps, schema_editor):
+    """Assume the tekst of existing uitspraken changed when they were last modified
+
+    Signatures and corpus packs that were built after that are then still up to date.
+    """
+    Uitspraak = apps.get_model("rechtspraak", "Uitspraak")
+    Uitspraak.objects.update(tekst_modified=F("last_modified"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rechtspraak', '0014_backfill_experimentresult'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uitspraak',
+            name='tekst_modified',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='When the tekst of this uitspraak was last changed in this database; unlike last_modified, not by experiments.'),
+        ),
+        migrations.RunPython(backfill_tekst_modified, migrations.RunPython.noop),
+    ]
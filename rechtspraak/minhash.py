@@ -0,0 +1,282 @@
+"""
+    rechtspraak/minhash.py
+
+    Near-duplicate detection over the tekst of uitspraken with MinHash and locality-sensitive
+    hashing (LSH), in roughly linear time instead of comparing every pair of uitspraken.
+
+    The tekst is split into shingles of SHINGLE_SIZE consecutive words. The signature of a tekst
+    is computed with one permutation hashing (Li, Owen and Zhang, "One Permutation Hashing",
+    2012): every shingle is hashed once, the hash selects one of NUM_BINS bins, and the signature
+    keeps the smallest hash per bin. Empty bins, of short texts, are filled from the next
+    non-empty bin (Shrivastava and Li, "Densifying One Permutation Hashing via Rotation", 2014).
+    The fraction of bins in which two signatures are equal estimates the Jaccard similarity of the
+    shingles of the two texts. Signatures are stored in MinHashSignature, and only computed again
+    for uitspraken whose tekst changed.
+
+    To find the near-duplicates, the signatures are cut into bands of rows; uitspraken whose
+    signatures are equal in at least one band end up in the same bucket and are candidates. A
+    candidate is compared with the first uitspraak in its bucket only, and joined with it if
+    their estimated similarity is at least the threshold; the clusters of near-duplicates are the
+    connected components of these pairs. The cluster of an uitspraak is stored as the lowest id
+    in it; distinct_uitspraken() selects the first uitspraak of every cluster in a queryset.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import array
+import hashlib
+import logging
+import re
+import zlib
+
+from dataclasses import dataclass
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q, QuerySet
+from django.utils import timezone
+
+from rechtspraak.models import MinHashSignature, Uitspraak
+from rechtspraak.profiling import stage
+from rechtspraak.progress import Progress
+
+logger = logging.getLogger(__name__)
+
+SHINGLE_SIZE = 5
+
+# The number of values in a signature; a power of two, and a multiple of the number of bands
+NUM_BINS = 128
+BIN_BITS = NUM_BINS.bit_length() - 1
+
+# The largest value in a signature; the bin a hash goes to is taken from its other bits
+MAX_VALUE = 0xFFFFFFFF
+
+# Added per bin of distance to a value borrowed from another bin, so borrowed values differ from the original
+ROTATION_OFFSET = 0x9E3779B1
+
+DEFAULT_BANDS = 16
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_CHUNK_SIZE = 1000
+
+WORD = re.compile(r"\w+")
+
+
+def shingle_hashes(text: str) -> set[int]:
+    """The 64-bit hashes of the shingles of SHINGLE_SIZE consecutive words in a text, ignoring case"""
+    words = WORD.findall(text.lower())
+    if not words:
+        return set()
+
+    return {
+        int.from_bytes(hashlib.blake2b(" ".join(words[i:i + SHINGLE_SIZE]).encode("utf-8"), digest_size=8).digest(), "little")
+        for i in range(max(len(words) - SHINGLE_SIZE + 1, 1))
+    }
+
+
+def signature(text: str) -> Optional[array.array]:
+    """The MinHash signature of a text, as NUM_BINS unsigned 32-bit integers; None if it has no words"""
+    hashes = shingle_hashes(text)
+    if not hashes:
+        return None
+
+    empty = MAX_VALUE + 1
+    values = [empty] * NUM_BINS
+    for shingle_hash in hashes:
+        bin_index = shingle_hash >> (64 - BIN_BITS)
+        value = shingle_hash & MAX_VALUE
+        if value < values[bin_index]:
+            values[bin_index] = value
+
+    # Densification: an empty bin borrows the value of the first non-empty bin after it
+    result = array.array("I", bytes(4 * NUM_BINS))
+    for bin_index in range(NUM_BINS):
+        distance = 0
+        while values[(bin_index + distance) % NUM_BINS] == empty:
+            distance += 1
+        result[bin_index] = (values[(bin_index + distance) % NUM_BINS] + distance * ROTATION_OFFSET) & MAX_VALUE
+
+    return result
+
+
+def similarity(first: array.array, second: array.array) -> float:
+    """The estimated Jaccard similarity of the shingles of two texts, from their signatures"""
+    return sum(a == b for a, b in zip(first, second)) / NUM_BINS
+
+
+def update_signatures(full: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Compute the signatures of the uitspraken that are new or changed since their signature was computed
+
+    Returns the number of signatures that were computed.
+    """
+    started = timezone.now()
+
+    if full:
+        MinHashSignature.objects.all().delete()
+
+    # Signatures of uitspraken that lost their tekst
+    MinHashSignature.objects.filter(uitspraak__tekst="").delete()
+
+    # Not last_modified, which experiments also bump when they save their results
+    uitspraken = Uitspraak.objects.exclude(tekst="").filter(Q(minhash__isnull=True) | Q(tekst_modified__gt=F("minhash__computed_at")))
+    total = uitspraken.count()
+    logger.info("Found %s uitspraken to compute the signature of", total)
+
+    computed = 0
+    reporter = Progress(total, "MinHash signatures")
+    last_id = 0
+
+    while True:
+        chunk = list(uitspraken.filter(id__gt=last_id).order_by("id").values_list("id", "tekst", "minhash__checksum")[:chunk_size])
+
+        if not chunk:
+            break
+
+        changed = []
+        unchanged = []
+        removed = []
+        for uitspraak_id, tekst, old_checksum in chunk:
+            checksum = zlib.crc32(tekst.encode("utf-8"))
+            if checksum == old_checksum:
+                # The tekst was changed back to the one the signature was computed for
+                unchanged.append(uitspraak_id)
+                continue
+
+            values = signature(tekst)
+            if values is None:
+                removed.append(uitspraak_id)
+            else:
+                changed.append(MinHashSignature(
+                    uitspraak_id=uitspraak_id, checksum=checksum, signature=values.tobytes(), computed_at=started
+                ))
+
+        with stage("write"), transaction.atomic():
+            MinHashSignature.objects.bulk_create(
+                changed,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=["uitspraak"],
+                update_fields=["checksum", "signature", "computed_at"]
+            )
+            MinHashSignature.objects.filter(uitspraak_id__in=unchanged).update(computed_at=started)
+            MinHashSignature.objects.filter(uitspraak_id__in=removed).delete()
+
+        computed += len(changed)
+        last_id = chunk[-1][0]
+        reporter.update(len(chunk))
+
+    reporter.close()
+    return computed
+
+
+@dataclass
+class ClusterResult:
+    """The outcome of clustering the signatures"""
+
+    signatures: int = 0
+    clusters: int = 0
+    # Uitspraken that are a near-duplicate of at least one other uitspraak
+    clustered: int = 0
+    updated: int = 0
+
+    def __str__(self) -> str:
+        return f"{self.clustered} of {self.signatures} uitspraken are in {self.clusters} clusters of near-duplicates"
+
+
+def cluster_signatures(bands: int = DEFAULT_BANDS, threshold: float = DEFAULT_THRESHOLD) -> ClusterResult:
+    """Find the clusters of near-duplicates among all signatures, and store them in MinHashSignature.cluster
+
+    bands -- the number of bands the signatures are cut into; more bands find more candidates
+    threshold -- the minimum estimated Jaccard similarity of near-duplicates
+    """
+    if NUM_BINS % bands:
+        raise ValueError(f"The number of bands must divide {NUM_BINS}")
+
+    ids = array.array("q")
+    clusters = array.array("q")
+    buffer = bytearray()
+
+    # All signatures are held in memory, NUM_BINS * 4 bytes each, in the order of their uitspraak
+    with stage("read"):
+        rows = MinHashSignature.objects.order_by("uitspraak_id").values_list("uitspraak_id", "signature", "cluster")
+        for uitspraak_id, values, cluster in rows.iterator(chunk_size=10000):
+            ids.append(uitspraak_id)
+            clusters.append(cluster if cluster is not None else -1)
+            buffer += values
+
+    data = bytes(buffer)
+    del buffer
+    values_view = memoryview(data).cast("I")
+
+    count = len(ids)
+    parent = array.array("q", range(count))
+
+    def find(index: int) -> int:
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    band_size = (NUM_BINS // bands) * 4
+    signature_size = NUM_BINS * 4
+
+    reporter = Progress(count * bands, "Near-duplicates")
+    for band in range(bands):
+        buckets: dict[bytes, int] = {}
+        offset = band * band_size
+
+        with stage("lsh"):
+            for index in range(count):
+                start = index * signature_size + offset
+                first = buckets.setdefault(data[start:start + band_size], index)
+                if first == index:
+                    continue
+
+                root, first_root = find(index), find(first)
+                if root == first_root:
+                    continue
+
+                if similarity(values_view[index * NUM_BINS:(index + 1) * NUM_BINS], values_view[first * NUM_BINS:(first + 1) * NUM_BINS]) >= threshold:
+                    # The lowest index, and thus the lowest uitspraak id, becomes the root
+                    parent[max(root, first_root)] = min(root, first_root)
+
+        reporter.update(count)
+    reporter.close()
+
+    result = ClusterResult(signatures=count)
+    sizes: dict[int, int] = {}
+    changed = []
+
+    for index in range(count):
+        root = find(index)
+        sizes[root] = sizes.get(root, 0) + 1
+        if clusters[index] != ids[root]:
+            changed.append(MinHashSignature(uitspraak_id=ids[index], cluster=ids[root]))
+
+    result.clusters = sum(1 for size in sizes.values() if size > 1)
+    result.clustered = sum(size for size in sizes.values() if size > 1)
+    result.updated = len(changed)
+
+    with stage("write"), transaction.atomic():
+        MinHashSignature.objects.bulk_update(changed, ["cluster"], batch_size=1000)
+
+    return result
+
+
+def distinct_uitspraken(uitspraken: QuerySet[Uitspraak]) -> QuerySet[Uitspraak]:
+    """Only the first of the uitspraken in every cluster of near-duplicates, and the uitspraken without a cluster
+
+    The first uitspraak is chosen among the given uitspraken, so a filtered queryset keeps one uitspraak of
+    every cluster in it, also if the lowest id of the cluster is filtered out or lost its signature.
+    """
+    earlier = uitspraken.filter(minhash__cluster=OuterRef("minhash__cluster"), id__lt=OuterRef("id"))
+    return uitspraken.exclude(Exists(earlier))
+
+
+def near_duplicates(uitspraak: Uitspraak) -> QuerySet[Uitspraak]:
+    """The other uitspraken in the cluster of near-duplicates of an uitspraak"""
+    cluster = MinHashSignature.objects.filter(uitspraak_id=uitspraak.id).values("cluster")
+    return Uitspraak.objects.filter(minhash__cluster__in=cluster).exclude(id=uitspraak.id)
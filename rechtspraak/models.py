@@ -11,6 +11,7 @@
 import datetime
 
 from django.db import models
+from django.utils import timezone
 
 
 class Rechtsgebied(models.Model):
@@ -80,6 +81,8 @@ class Instantie(models.Model):
 class Uitspraak(models.Model):
     """A court decision: arrest, uitspraak, beschikking, conclusie, etc."""
 
+    # On a partitioned uitspraak table, the unique constraint is on (ecli, uitspraakdatum), and
+    # ECLIs are kept unique by the key table (see rechtspraak/partitioning.py)
     ecli = models.CharField(
         max_length=128,
         unique=True,
@@ -95,7 +98,13 @@ class Uitspraak(models.Model):
     # TODO: Add support for dcterms:modified so that we can keep track of updates at the
     # authorative API from de Rechtspraak.
 
-    raw_xml = models.TextField()
+    raw_xml = models.TextField(help_text="The XML of the uitspraak; empty if it is kept in the raw XML store.")
+    raw_xml_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        default="",
+        help_text="The SHA-256 hash of the XML in the raw XML store (see rechtspraak/blobstore.py), if it is kept there."
+    )
 
     data = models.JSONField(
         default=dict,
@@ -122,6 +131,21 @@ class Uitspraak(models.Model):
     procedure_soorten = models.ManyToManyField(ProcedureSoort)
     rechtsgebieden = models.ManyToManyField(Rechtsgebied)
 
+    last_modified = models.DateTimeField(
+        auto_now=True,
+        help_text="When this uitspraak was last changed in this database."
+    )
+
+    tekst_modified = models.DateTimeField(
+        default=timezone.now,
+        help_text="When the tekst of this uitspraak was last changed in this database; unlike last_modified, not by experiments."
+    )
+
+    trigram_indexed = models.BooleanField(
+        default=False,
+        help_text="Whether the current tekst has been added to the trigram index."
+    )
+
     class Meta:
         """Meta information for Django"""
 
@@ -130,8 +154,204 @@ class Uitspraak(models.Model):
             models.Index(fields=["zaaknummer"]),
             models.Index(fields=["instantie", "publicatiedatum"]),
             models.Index(fields=["instantie", "uitspraakdatum"]),
-            models.Index(fields=["uitspraak_type"])
+            models.Index(fields=["uitspraak_type"]),
+            models.Index(fields=["uitspraakdatum"])
         ]
 
     def __str__(self) -> str:
         return f"Uitspraak {self.ecli} ({self.instantie.naam})"
+
+    def get_raw_xml(self) -> str:
+        """The XML of the uitspraak, from the database or from the raw XML store"""
+        if not self.raw_xml_hash:
+            return self.raw_xml
+
+        # pylint: disable=import-outside-toplevel
+        from rechtspraak.blobstore import raw_xml_store
+
+        store = raw_xml_store()
+        if store is None:
+            raise ValueError(f"The raw XML of {self.ecli} is in the raw XML store, but RECHTSPRAAK_RAW_XML_STORE is not set")
+
+        return store.get_text(self.raw_xml_hash)
+
+
+class TrigramPosting(models.Model):
+    """A segment of the posting list of a trigram in the trigram index over Uitspraak.tekst
+
+    The posting list of a trigram is the union of all its segments; see rechtspraak/trigrams.py.
+    """
+
+    trigram = models.CharField(max_length=3)
+    postings = models.BinaryField(help_text="zlib-compressed array of sorted Uitspraak ids.")
+
+    class Meta:
+        """Meta information for Django"""
+
+        indexes = [
+            models.Index(fields=["trigram"])
+        ]
+
+    def __str__(self) -> str:
+        return f"TrigramPosting {self.trigram!r}"
+
+
+class MinHashSignature(models.Model):
+    """The MinHash signature of the tekst of an Uitspraak, for near-duplicate detection; see rechtspraak/minhash.py"""
+
+    # Without a foreign key constraint, which cannot refer to a partitioned uitspraak table (see rechtspraak/partitioning.py)
+    uitspraak = models.OneToOneField(Uitspraak, models.CASCADE, primary_key=True, related_name="minhash", db_constraint=False)
+    checksum = models.BigIntegerField(help_text="CRC-32 of the tekst the signature was computed from.")
+    signature = models.BinaryField(help_text="Array of the minimum hash per bin, as unsigned 32-bit integers.")
+    computed_at = models.DateTimeField()
+    cluster = models.BigIntegerField(
+        null=True,
+        help_text="The lowest id of the uitspraken in the cluster of near-duplicates of this uitspraak; its own id if there are none."
+    )
+
+    class Meta:
+        """Meta information for Django"""
+
+        indexes = [
+            models.Index(fields=["cluster"])
+        ]
+
+    def __str__(self) -> str:
+        return f"MinHashSignature for {self.uitspraak_id}"
+
+
+class TextAnalysisMemo(models.Model):
+    """The memoized result of a deterministic text-analysis function, see rechtspraak/memo.py"""
+
+    function = models.CharField(max_length=128)
+    version = models.CharField(max_length=128)
+    text_hash = models.CharField(max_length=64, help_text="SHA-256 hex digest of the analysed text.")
+    result = models.JSONField()
+
+    class Meta:
+        """Meta information for Django"""
+
+        constraints = [
+            models.UniqueConstraint(fields=["function", "version", "text_hash"], name="unique_text_analysis_memo")
+        ]
+
+    def __str__(self) -> str:
+        return f"TextAnalysisMemo {self.function} {self.version} {self.text_hash}"
+
+
+class Citation(models.Model):
+    """A citation found in the tekst of an Uitspraak by nllegalcit, see rechtspraak/citations.py"""
+
+    uitspraak = models.ForeignKey(Uitspraak, models.CASCADE, related_name="citations")
+    experiment_id = models.CharField(
+        max_length=128,
+        help_text="The ID of the experiment in which the citation was found."
+    )
+
+    class CitationType(models.TextChoices):
+        KAMERSTUK = "kamerstuk"
+        HANDELING = "handeling"
+        ECLI = "ecli"
+        LJN = "ljn"
+        OTHER = "other"
+
+    citation_type = models.CharField(max_length=16, choices=CitationType.choices)
+
+    kamer = models.CharField(max_length=16, blank=True)
+    vergaderjaar = models.CharField(max_length=16, blank=True)
+    dossiernummer = models.CharField(max_length=64, blank=True)
+    ondernummer = models.CharField(max_length=64, blank=True)
+    paginaverwijzing = models.CharField(max_length=256, blank=True)
+
+    ecli = models.CharField(max_length=128, blank=True, help_text="The cited ECLI, for ECLI citations.")
+    ljn = models.CharField(max_length=16, blank=True, help_text="The cited LJN, for LJN citations.")
+
+    matched_text = models.TextField(blank=True)
+    data = models.JSONField(default=dict, help_text="The citation as returned by nllegalcit.")
+
+    class Meta:
+        """Meta information for Django"""
+
+        indexes = [
+            models.Index(fields=["experiment_id", "citation_type"]),
+            models.Index(fields=["citation_type", "dossiernummer", "ondernummer"]),
+            models.Index(fields=["citation_type", "vergaderjaar"]),
+            models.Index(fields=["ecli"])
+        ]
+
+    def __str__(self) -> str:
+        return f"Citation {self.citation_type} {self.matched_text!r} in {self.uitspraak_id}"
+
+
+class ExperimentResult(models.Model):
+    """Indexed summary of the results of an experiment on an Uitspraak, derived from Uitspraak.data
+
+    See rechtspraak/experiments.py.
+    """
+
+    uitspraak = models.ForeignKey(Uitspraak, models.CASCADE, related_name="experiment_results")
+    experiment_id = models.CharField(max_length=128)
+    experiment = models.CharField(max_length=128, help_text="The name of the experiment.")
+
+    match_count = models.IntegerField(null=True)
+    additional_match_count = models.IntegerField(null=True)
+    citation_count = models.IntegerField(null=True)
+    error_count = models.IntegerField(default=0)
+
+    class Meta:
+        """Meta information for Django"""
+
+        constraints = [
+            models.UniqueConstraint(fields=["uitspraak", "experiment_id"], name="unique_experimentresult")
+        ]
+        indexes = [
+            models.Index(fields=["experiment_id", "match_count"]),
+            models.Index(fields=["experiment_id", "citation_count"]),
+            models.Index(fields=["experiment_id", "error_count"])
+        ]
+
+    def __str__(self) -> str:
+        return f"ExperimentResult {self.experiment_id} for {self.uitspraak_id}"
+
+
+class UitspraakCounts(models.Model):
+    """Materialised number of uitspraken per instantie and year, see rechtspraak/counts.py"""
+
+    instantie = models.ForeignKey(Instantie, models.CASCADE)
+    year = models.IntegerField(help_text="The year of the uitspraakdatum.")
+
+    total = models.IntegerField(default=0)
+    with_tekst = models.IntegerField(default=0)
+    with_data = models.IntegerField(default=0)
+
+    class Meta:
+        """Meta information for Django"""
+
+        constraints = [
+            models.UniqueConstraint(fields=["instantie", "year"], name="unique_uitspraakcounts")
+        ]
+
+    def __str__(self) -> str:
+        return f"UitspraakCounts {self.instantie_id} {self.year}: {self.total}"
+
+
+class RechtsgebiedCounts(models.Model):
+    """Materialised number of uitspraken per rechtsgebied, instantie and year, see rechtspraak/counts.py"""
+
+    rechtsgebied = models.ForeignKey(Rechtsgebied, models.CASCADE)
+    instantie = models.ForeignKey(Instantie, models.CASCADE)
+    year = models.IntegerField(help_text="The year of the uitspraakdatum.")
+
+    total = models.IntegerField(default=0)
+    with_tekst = models.IntegerField(default=0)
+    with_data = models.IntegerField(default=0)
+
+    class Meta:
+        """Meta information for Django"""
+
+        constraints = [
+            models.UniqueConstraint(fields=["rechtsgebied", "instantie", "year"], name="unique_rechtsgebiedcounts")
+        ]
+
+    def __str__(self) -> str:
+        return f"RechtsgebiedCounts {self.rechtsgebied_id} {self.instantie_id} {self.year}: {self.total}"
@@ -0,0 +1,269 @@
+"""
+    rechtspraak/partitioning.py
+
+    Optional range partitioning of the uitspraak table by year of uitspraakdatum, on PostgreSQL.
+
+    Queries that filter on uitspraakdatum (e.g. --year of the experiments) then only read the
+    partitions of those years, and old years can be vacuumed, detached and archived on their own.
+    Uitspraken outside the yearly partitions, such as those without a date (1000-01-01), are kept
+    in a default partition.
+
+    PostgreSQL requires the partition key to be part of every unique constraint of a partitioned
+    table, and does not allow foreign keys to a partitioned table without a unique constraint on
+    the referenced columns. Therefore, after converting:
+    - the primary key is (id, uitspraakdatum), and the unique constraint on ecli becomes a unique
+      constraint on (ecli, uitspraakdatum);
+    - the id and ecli of every uitspraak are also kept in the key table (KEY_TABLE), by a trigger
+      on the uitspraak table. Both columns are unique in the key table, so ids and ECLIs are
+      still unique over all partitions;
+    - the foreign keys from other tables (labels, citations, experiment results) to uitspraak are
+      recreated as foreign keys to the key table. Django still deletes related rows itself when
+      an uitspraak is deleted; the foreign keys are checked at the end of the transaction.
+    Tables with a foreign key to other columns of uitspraak cannot be kept, so then the table is
+    not converted.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import datetime
+import logging
+import re
+
+from typing import Any, Optional
+
+from django.db import connection, transaction
+
+from rechtspraak.models import Uitspraak
+
+logger = logging.getLogger(__name__)
+
+# Uitspraken from before this year are kept in the default partition
+MIN_PARTITION_YEAR = 1900
+
+KEY_TABLE = f"{Uitspraak._meta.db_table}_key"
+
+# The columns of the key table, which foreign keys to the uitspraak table may refer to
+KEY_COLUMNS = ("id", "ecli")
+
+UNIQUE_CONSTRAINT = re.compile(r"^(?P<prefix>UNIQUE[^(]*)\((?P<columns>[^)]*)\)(?P<suffix>.*)$", re.DOTALL)
+
+# Keeps the key table up to date: after every statement, it has a row with the id and ecli of
+# every uitspraak. An UPDATE that moves an uitspraak to another partition fires the DELETE trigger
+# and then the INSERT trigger instead of the UPDATE trigger, so its key is deleted and inserted
+# again; the foreign keys to the key table are deferred, so the rows referring to it stay valid.
+KEY_TRIGGER_FUNCTION = f"""
+    CREATE FUNCTION {KEY_TABLE}_sync() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            DELETE FROM {KEY_TABLE} WHERE id = OLD.id;
+        ELSIF TG_OP = 'UPDATE' THEN
+            UPDATE {KEY_TABLE} SET id = NEW.id, ecli = NEW.ecli WHERE id = OLD.id;
+        ELSE
+            INSERT INTO {KEY_TABLE} (id, ecli) VALUES (NEW.id, NEW.ecli)
+            ON CONFLICT (id) DO UPDATE SET ecli = EXCLUDED.ecli;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+"""
+
+
+def _table() -> str:
+    return Uitspraak._meta.db_table
+
+
+def partition_name(year: int) -> str:
+    """The name of the partition with the uitspraken of year"""
+    return f"{_table()}_y{year}"
+
+
+def is_partitioned() -> bool:
+    """Whether the uitspraak table is partitioned"""
+    if connection.vendor != "postgresql":
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass)", [_table()])
+        return cursor.fetchone()[0]
+
+
+def partition_years(cursor: Any) -> set[int]:
+    """The years that have a partition"""
+    cursor.execute(
+        "SELECT child.relname FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid WHERE pg_inherits.inhparent = %s::regclass",
+        [_table()]
+    )
+    prefix = f"{_table()}_y"
+    return {int(name[len(prefix):]) for (name,) in cursor.fetchall() if name.startswith(prefix)}
+
+
+def _create_partition(cursor: Any, year: int) -> None:
+    table = _table()
+    name = partition_name(year)
+    start, end = datetime.date(year, 1, 1).isoformat(), datetime.date(year + 1, 1, 1).isoformat()
+
+    # A new partition cannot be added while the default partition has rows that belong in it, so
+    # these rows are moved while the default partition is detached
+    cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {table}_default")
+    cursor.execute(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM ('{start}') TO ('{end}')")
+    cursor.execute(
+        f"WITH moved AS (DELETE FROM {table}_default WHERE uitspraakdatum >= %s AND uitspraakdatum < %s RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved",
+        [start, end]
+    )
+    cursor.execute(f"ALTER TABLE {table} ATTACH PARTITION {table}_default DEFAULT")
+
+    logger.info("Created partition %s", name)
+
+
+def create_partitions(until_year: int, from_year: Optional[int] = None) -> list[int]:
+    """Create the missing yearly partitions up to and including until_year; returns the years created
+
+    Starts at from_year, or else at the first year that has a partition.
+    """
+    created = []
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        if not is_partitioned():
+            raise ValueError("The uitspraak table is not partitioned, convert it first")
+
+        existing = partition_years(cursor)
+        if from_year is None:
+            from_year = min(existing, default=until_year)
+
+        for year in range(max(from_year, MIN_PARTITION_YEAR), until_year + 1):
+            if year not in existing:
+                _create_partition(cursor, year)
+                created.append(year)
+
+    return created
+
+
+def with_partition_key(definition: str) -> str:
+    """The definition of a unique constraint of the uitspraak table, with uitspraakdatum added to its columns"""
+    match = UNIQUE_CONSTRAINT.match(definition)
+    if match is None:
+        raise ValueError(f"Not a unique constraint: {definition}")
+
+    columns = [column.strip() for column in match["columns"].split(",")]
+    if "uitspraakdatum" not in columns:
+        columns.append("uitspraakdatum")
+    return f"{match['prefix']}({', '.join(columns)}){match['suffix']}"
+
+
+def _foreign_keys(cursor: Any, table: str) -> list[tuple[str, str, str, list[str]]]:
+    """The foreign keys to table: the referencing table, name, definition and the referenced columns"""
+    cursor.execute(
+        """
+        SELECT c.conrelid::regclass::text, c.conname, pg_get_constraintdef(c.oid),
+               ARRAY(SELECT attname FROM pg_attribute WHERE attrelid = c.confrelid AND attnum = ANY(c.confkey))
+        FROM pg_constraint c WHERE c.confrelid = %s::regclass AND c.contype = 'f' AND c.conrelid <> c.confrelid
+        """,
+        [table]
+    )
+    return cursor.fetchall()
+
+
+def convert_to_partitioned(until_year: int) -> None:
+    """Convert the uitspraak table into a table partitioned by year, with partitions up to until_year
+
+    Copies all rows, so this takes a while on a large database, during which the table is locked.
+    """
+    if connection.vendor != "postgresql":
+        raise ValueError(f"Partitioning requires PostgreSQL, not {connection.vendor}")
+
+    table = _table()
+    new_table = f"{table}_partitioned"
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        if is_partitioned():
+            logger.info("%s is already partitioned", table)
+            return
+
+        cursor.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+        # Foreign keys cannot be dropped while their checks are deferred
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+        # Remember the indexes and constraints, to create them again on the partitioned table
+        cursor.execute(
+            "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass",
+            [table]
+        )
+        constraints = cursor.fetchall()
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname NOT IN "
+            "(SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass)",
+            [table, table]
+        )
+        indexes = [indexdef for (indexdef,) in cursor.fetchall()]
+        references = _foreign_keys(cursor, table)
+        unsupported = [
+            f"{name} of {referencing_table}" for referencing_table, name, _definition, columns in references
+            if not set(columns) <= set(KEY_COLUMNS)
+        ]
+        if unsupported:
+            raise ValueError(f"Cannot keep the foreign keys {', '.join(unsupported)} on a partitioned {table}")
+
+        cursor.execute(f"CREATE TABLE {new_table} (LIKE {table} INCLUDING DEFAULTS) PARTITION BY RANGE (uitspraakdatum)")
+        cursor.execute(f"CREATE TABLE {table}_default PARTITION OF {new_table} DEFAULT")
+
+        cursor.execute(
+            f"SELECT DISTINCT EXTRACT(YEAR FROM uitspraakdatum)::int FROM {table} WHERE uitspraakdatum >= %s",
+            [datetime.date(MIN_PARTITION_YEAR, 1, 1)]
+        )
+        years = {year for (year,) in cursor.fetchall()} | {until_year}
+        for year in range(min(years), until_year + 1):
+            start, end = datetime.date(year, 1, 1).isoformat(), datetime.date(year + 1, 1, 1).isoformat()
+            cursor.execute(f"CREATE TABLE {partition_name(year)} PARTITION OF {new_table} FOR VALUES FROM ('{start}') TO ('{end}')")
+
+        cursor.execute(f"INSERT INTO {new_table} SELECT * FROM {table}")
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+        max_id = cursor.fetchone()[0]
+
+        cursor.execute(f"CREATE TABLE {KEY_TABLE} (id bigint PRIMARY KEY, ecli varchar(128) NOT NULL UNIQUE)")
+        cursor.execute(f"INSERT INTO {KEY_TABLE} (id, ecli) SELECT id, ecli FROM {table}")
+
+        # The foreign keys are created again on the key table below; without CASCADE, anything
+        # else that depends on the table makes this fail instead of being dropped with it
+        for referencing_table, name, _definition, _columns in references:
+            cursor.execute(f"ALTER TABLE {referencing_table} DROP CONSTRAINT {name}")
+
+        # Also drops the identity sequence of id
+        cursor.execute(f"DROP TABLE {table}")
+
+        cursor.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+        cursor.execute(f"CREATE SEQUENCE {table}_id_seq OWNED BY {table}.id")
+        cursor.execute(f"SELECT setval('{table}_id_seq', %s, %s)", [max(max_id, 1), max_id > 0])
+        cursor.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{table}_id_seq')")
+
+        for name, contype, definition in constraints:
+            if contype == "p":
+                definition = "PRIMARY KEY (id, uitspraakdatum)"
+            elif contype == "u":
+                definition = with_partition_key(definition)
+            elif contype == "n":
+                # NOT NULL constraints are copied by LIKE
+                continue
+            cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}")
+
+        for indexdef in indexes:
+            cursor.execute(indexdef)
+
+        cursor.execute(KEY_TRIGGER_FUNCTION)
+        cursor.execute(
+            f"CREATE TRIGGER {KEY_TABLE}_sync AFTER INSERT OR DELETE OR UPDATE OF id, ecli ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION {KEY_TABLE}_sync()"
+        )
+
+        for referencing_table, name, definition, _columns in references:
+            definition = re.sub(rf"REFERENCES {re.escape(table)}\(", f"REFERENCES {KEY_TABLE}(", definition)
+            cursor.execute(f"ALTER TABLE {referencing_table} ADD CONSTRAINT {name} {definition}")
+            logger.info("Foreign key %s of %s now refers to %s", name, referencing_table, KEY_TABLE)
+
+        cursor.execute("SET CONSTRAINTS ALL DEFERRED")
+
+    logger.info("Partitioned %s by year, up to %s", table, until_year)
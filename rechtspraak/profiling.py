@@ -0,0 +1,186 @@
+"""
+    rechtspraak/profiling.py
+
+    Find out where the time of a crawl, import or experiment goes.
+
+    The hot paths time themselves in named stages (fetch, parse, lookup, write, match) with
+    stage(); this is cheap enough to be always on, and the management commands report the totals
+    at the end of a run. Optionally, the time spent in SQL is added per kind of statement (these
+    overlap the other stages), and a run can be profiled with cProfile. All management commands of rechtspraak support this through
+    ProfiledCommand:
+
+        ./manage.py experiment_keyword_search Rechtbank toeslag --profile
+        ./manage.py create_uitspraak_from_xml data/ --profile import.prof --sql-timing
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import contextlib
+import cProfile
+import functools
+import logging
+import pstats
+import sys
+import time
+
+from typing import Any, Callable, Iterator, Optional, TextIO, TypeVar
+
+from django.core.management import BaseCommand, CommandParser
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# The number of functions shown when a profile is printed instead of saved
+PROFILE_PRINT_LIMIT = 40
+
+
+class StageTimer:
+    """The wall time and number of calls per named stage of a run"""
+
+    def __init__(self) -> None:
+        self.stages: dict[str, list[float]] = {}
+        self.started = time.perf_counter()
+
+    def reset(self) -> None:
+        """Forget all stages, and start a new run"""
+        self.stages.clear()
+        self.started = time.perf_counter()
+
+    def add(self, name: str, seconds: float, count: int = 1) -> None:
+        """Add the time of count calls to a stage"""
+        totals = self.stages.setdefault(name, [0.0, 0])
+        totals[0] += seconds
+        totals[1] += count
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the code in the with block as a call of stage name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def report(self) -> str:
+        """A table of the stages, the most time-consuming first"""
+        wall = time.perf_counter() - self.started
+        lines = [f"{'stage':<16} {'seconds':>10} {'%':>6} {'count':>9} {'ms/call':>9}"]
+
+        for name, (seconds, count) in sorted(self.stages.items(), key=lambda item: item[1][0], reverse=True):
+            lines.append(f"{name:<16} {seconds:>10.3f} {seconds / wall * 100 if wall else 0:>6.1f} {count:>9} {seconds / count * 1000 if count else 0:>9.3f}")
+
+        lines.append(f"{'wall time':<16} {wall:>10.3f}")
+        return "\n".join(lines)
+
+
+timer = StageTimer()
+
+
+def stage(name: str) -> contextlib.AbstractContextManager[None]:
+    """Time the code in the with block as a call of stage name of the current run"""
+    return timer.stage(name)
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Decorator that times every call of the function as a call of stage name"""
+
+    def decorator(function: F) -> F:
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with timer.stage(name):
+                return function(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def _sql_timer(execute: Callable, sql: str, params: Any, many: bool, context: dict) -> Any:
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        kind = sql.lstrip().split(None, 1)[0].lower() if sql.strip() else "other"
+        timer.add(f"sql {kind}", time.perf_counter() - start)
+
+
+@contextlib.contextmanager
+def sql_timing() -> Iterator[None]:
+    """Add the time of every SQL statement in the with block to a stage per kind of statement (sql select, sql insert, ...)"""
+    with connection.execute_wrapper(_sql_timer):
+        yield
+
+
+@contextlib.contextmanager
+def profiled(output: Optional[str], stream: TextIO = sys.stderr) -> Iterator[None]:
+    """Profile the with block with cProfile
+
+    Saves the statistics to output, for e.g. snakeviz or pstats; if output is empty, prints the
+    most time-consuming functions to stream instead.
+    """
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+
+        if output:
+            profile.dump_stats(output)
+            logger.info("Saved profile to %s", output)
+        else:
+            stats = pstats.Stats(profile, stream=stream)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_PRINT_LIMIT)
+
+
+def add_profiling_arguments(parser: Any) -> None:
+    """Add --profile and --sql-timing to an argparse parser"""
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="FILE",
+        help="Profile the run with cProfile; saves the statistics to FILE, or prints the slowest functions if no FILE is given."
+    )
+    parser.add_argument("--sql-timing", action="store_true", help="Also report the time spent in SQL, per kind of statement.")
+
+
+@contextlib.contextmanager
+def profiling(profile: Optional[str], with_sql_timing: bool, stream: TextIO = sys.stderr) -> Iterator[None]:
+    """Time the stages of a run and report them at the end, optionally with SQL timing and cProfile"""
+    timer.reset()
+
+    # The table of stages after the profile, so that it is not lost above a long listing of functions
+    try:
+        with contextlib.ExitStack() as stack:
+            if profile is not None:
+                stack.enter_context(profiled(profile, stream))
+            if with_sql_timing:
+                stack.enter_context(sql_timing())
+
+            yield
+    finally:
+        if timer.stages:
+            stream.write(timer.report() + "\n")
+
+
+class ProfiledCommand(BaseCommand):
+    """A management command that reports the time per stage at the end, and supports --profile and --sql-timing"""
+
+    def create_parser(self, prog_name: str, subcommand: str, **kwargs: Any) -> CommandParser:
+        parser = super().create_parser(prog_name, subcommand, **kwargs)
+        add_profiling_arguments(parser)
+        return parser
+
+    def execute(self, *args: Any, **options: Any) -> Any:
+        # The stream itself rather than self.stderr: BaseCommand.execute only wraps the stream given to
+        # call_command later, and its OutputWrapper would end every write of pstats with a newline
+        with profiling(options.get("profile"), options.get("sql_timing", False), options.get("stderr") or sys.stderr):
+            return super().execute(*args, **options)
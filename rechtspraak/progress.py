@@ -0,0 +1,165 @@
+"""
+    rechtspraak/progress.py
+
+    Progress reporting for long-running commands.
+
+    Instead of printing a line for every uitspraak, which for millions of uitspraken takes a
+    noticeable share of the run time and floods the logs, progress is reported at a fixed time
+    interval: the number done, the rate over the whole run and a moving average of the recent
+    rate, and the estimated time remaining. On a terminal a single status line is updated in
+    place; otherwise (e.g. when the output is redirected to a file) progress is logged.
+
+        for uitspraak in progress(uitspraken.iterator(), total, "Keyword search"):
+            ...
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import datetime
+import logging
+import sys
+import time
+
+from types import TracebackType
+from typing import Iterable, Iterator, Optional, TextIO, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Seconds between updates of the status line on a terminal, and between log messages otherwise
+TTY_INTERVAL = 0.5
+LOG_INTERVAL = 10.0
+
+# Weight of the most recent interval in the moving average of the rate
+RATE_SMOOTHING = 0.3
+
+
+class Progress:
+    """Reports the progress of a run through total items, at most once per interval seconds
+
+    Use update() for every item (or batch of items) done, and close() at the end; or use it as a
+    context manager, or wrap an iterable with progress().
+    """
+
+    def __init__(
+        self,
+        total: Optional[int],
+        description: str = "Progress",
+        interval: Optional[float] = None,
+        stream: Optional[TextIO] = None
+    ) -> None:
+        self.total = total
+        self.description = description
+        self.stream = stream if stream is not None else sys.stderr
+        self.tty = self.stream.isatty()
+
+        if interval is None:
+            interval = TTY_INTERVAL if self.tty else LOG_INTERVAL
+        self.interval = interval
+
+        self.done = 0
+        self.started = time.monotonic()
+        self.reported_at = self.started
+        self.reported_done = 0
+        self.average_rate: Optional[float] = None
+        self.closed = False
+        self.line_length = 0
+
+    def update(self, count: int = 1) -> None:
+        """Mark count more items as done"""
+        self.done += count
+
+        now = time.monotonic()
+        if now - self.reported_at >= self.interval:
+            self._report(now)
+
+    def _report(self, now: float) -> None:
+        rate = (self.done - self.reported_done) / (now - self.reported_at) if now > self.reported_at else 0.0
+
+        if self.average_rate is None:
+            self.average_rate = rate
+        else:
+            self.average_rate = RATE_SMOOTHING * rate + (1 - RATE_SMOOTHING) * self.average_rate
+
+        self.reported_at = now
+        self.reported_done = self.done
+        self._write(self.status(now))
+
+    def status(self, now: Optional[float] = None) -> str:
+        """The current progress, as a line of text"""
+        if now is None:
+            now = time.monotonic()
+
+        elapsed = now - self.started
+        overall_rate = self.done / elapsed if elapsed > 0 else 0.0
+
+        if self.total:
+            line = f"{self.description}: {self.done}/{self.total} ({self.done / self.total * 100:.1f}%)"
+        else:
+            line = f"{self.description}: {self.done}"
+
+        line += f", {overall_rate:.1f}/s"
+
+        if self.closed:
+            return line + f", took {_duration(elapsed)}"
+
+        if self.average_rate is not None:
+            line += f" (recently {self.average_rate:.1f}/s)"
+
+            if self.total and self.average_rate > 0:
+                line += f", ETA {_duration(max(self.total - self.done, 0) / self.average_rate)}"
+
+        return line
+
+    def _write(self, line: str) -> None:
+        if self.tty:
+            # Overwrite the previous status line, also where it was longer
+            self.stream.write("\r" + line.ljust(self.line_length))
+            self.stream.flush()
+            self.line_length = len(line)
+        else:
+            logger.info("%s", line)
+
+    def close(self) -> None:
+        """Report the final progress"""
+        if self.closed:
+            return
+
+        self.closed = True
+        self._write(self.status())
+
+        if self.tty:
+            self.stream.write("\n")
+            self.stream.flush()
+
+    def __enter__(self) -> "Progress":
+        return self
+
+    def __exit__(self, exc_type: Optional[type[BaseException]], exc: Optional[BaseException], traceback: Optional[TracebackType]) -> None:
+        self.close()
+
+
+def _duration(seconds: float) -> str:
+    return str(datetime.timedelta(seconds=round(seconds)))
+
+
+def progress(
+    iterable: Iterable[T],
+    total: Optional[int] = None,
+    description: str = "Progress",
+    interval: Optional[float] = None,
+    stream: Optional[TextIO] = None
+) -> Iterator[T]:
+    """Iterate over iterable, reporting the progress; an item counts as done when the next one is requested"""
+    if total is None and hasattr(iterable, "__len__"):
+        total = len(iterable)  # type: ignore[arg-type]
+
+    with Progress(total, description, interval, stream) as reporter:
+        for item in iterable:
+            yield item
+            reporter.update()
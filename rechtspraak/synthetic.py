@@ -0,0 +1,250 @@
+"""
+    rechtspraak/synthetic.py
+
+    Generate synthetic uitspraken in the XML format of Open Data van de Rechtspraak, e.g. to
+    benchmark the import, experiments and exports at scales for which no real data is at hand.
+
+    The documents have the structure of real documents (metadata, inhoudsindicatie, sections with
+    paragraphs), a configurable size distribution, and a configurable share of conclusies. The
+    text contains the keywords of experiment_sociale_grondrechten and citations of kamerstukken,
+    ECLIs and articles at configurable rates, so the experiments have something to find.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import datetime
+import logging
+import math
+import random
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+from xml.sax.saxutils import escape
+
+from rechtspraak.models import Instantie, ProcedureSoort, Rechtsgebied
+
+logger = logging.getLogger(__name__)
+
+# (naam, afkorting, instantie_type) of the instanties used in synthetic uitspraken
+INSTANTIES = [
+    ("Hoge Raad", "HR", "HogeRaad"),
+    ("Parket bij de Hoge Raad", "PHR", "HogeRaad"),
+    ("Raad van State", "RVS", "RaadvanState"),
+    ("Centrale Raad van Beroep", "CRVB", "CentraleRaadvanBeroep"),
+    ("Gerechtshof Amsterdam", "GHAMS", "Gerechtshof"),
+    ("Gerechtshof Den Haag", "GHDHA", "Gerechtshof"),
+    ("Rechtbank Amsterdam", "RBAMS", "Rechtbank"),
+    ("Rechtbank Den Haag", "RBDHA", "Rechtbank"),
+    ("Rechtbank Rotterdam", "RBROT", "Rechtbank"),
+    ("Rechtbank Limburg", "RBLIM", "Rechtbank"),
+]
+
+RECHTSGEBIEDEN = [
+    ("Civiel recht", "http://psi.rechtspraak.nl/rechtsgebied#civielRecht"),
+    ("Bestuursrecht", "http://psi.rechtspraak.nl/rechtsgebied#bestuursrecht"),
+    ("Strafrecht", "http://psi.rechtspraak.nl/rechtsgebied#strafRecht"),
+    ("Socialezekerheidsrecht", "http://psi.rechtspraak.nl/rechtsgebied#bestuursrecht_socialezekerheidsrecht"),
+    ("Belastingrecht", "http://psi.rechtspraak.nl/rechtsgebied#bestuursrecht_belastingrecht"),
+    ("Arbeidsrecht", "http://psi.rechtspraak.nl/rechtsgebied#civielRecht_arbeidsrecht"),
+    ("Personen- en familierecht", "http://psi.rechtspraak.nl/rechtsgebied#civielRecht_personenEnFamilierecht"),
+    ("Vreemdelingenrecht", "http://psi.rechtspraak.nl/rechtsgebied#bestuursrecht_vreemdelingenrecht"),
+]
+
+PROCEDURES = [
+    ("Eerste aanleg - enkelvoudig", "http://psi.rechtspraak.nl/procedure#eersteAanlegEnkelvoudig"),
+    ("Eerste aanleg - meervoudig", "http://psi.rechtspraak.nl/procedure#eersteAanlegMeervoudig"),
+    ("Hoger beroep", "http://psi.rechtspraak.nl/procedure#hogerBeroep"),
+    ("Cassatie", "http://psi.rechtspraak.nl/procedure#cassatie"),
+    ("Kort geding", "http://psi.rechtspraak.nl/procedure#kortGeding"),
+    ("Voorlopige voorziening", "http://psi.rechtspraak.nl/procedure#voorlopigeVoorziening"),
+]
+
+WORDS = (
+    "de het een van en in op te dat is voor met niet aan door bij als zijn wordt heeft naar ook om "
+    "rechtbank hof eiser eiseres verweerder verweerster appellant belanghebbende partijen verzoek "
+    "beroep vordering besluit beschikking oordeel overweging grond grief geschil schade "
+    "overeenkomst termijn kosten proceskosten betaling bedrag uitkering aanvraag bezwaar zitting "
+    "standpunt feiten omstandigheden beoordeling conclusie motivering bewijs getuige deskundige "
+    "redelijkheid billijkheid aansprakelijkheid verplichting bevoegdheid toepassing wettelijke "
+    "bepaling artikel lid onder sub gemeente college minister staatssecretaris inspecteur "
+    "belasting aanslag boete sanctie straf verdachte officier justitie raadsman advocaat "
+    "gemachtigde uitspraak vonnis arrest hoger cassatie middel klacht faalt slaagt gegrond "
+    "ongegrond vernietigt bevestigt verklaart veroordeelt bepaalt wijst af toe"
+).split()
+
+# Matched by the search pattern of experiment_sociale_grondrechten, and its conditional pattern
+KEYWORDS = ["kinderopvangtoeslag", "toeslag", "Wet kinderopvang", "Algemene wet inkomensafhankelijke regelingen"]
+CONDITIONAL_KEYWORDS = ["artikel 20 Grondwet", "sociale grondrechten", "bestaanszekerheid", "gelijke behandeling", "menselijke waardigheid"]
+
+SECTION_TITLES = ["Het procesverloop", "De feiten", "Het geschil", "De beoordeling", "De beslissing"]
+
+
+@dataclass
+class CorpusConfig:
+    """Configuration of a synthetic corpus"""
+
+    seed: int = 0
+    first_number: int = 1
+    first_year: int = 1995
+    last_year: int = 2024
+    # The number of paragraphs of the text is log-normally distributed
+    median_paragraphs: int = 25
+    paragraph_sigma: float = 1.0
+    max_paragraphs: int = 2000
+    sentences_per_paragraph: int = 4
+    max_procedures: int = 2
+    max_rechtsgebieden: int = 3
+    conclusie_fraction: float = 0.05
+    # Probabilities per sentence
+    citation_rate: float = 0.05
+    keyword_rate: float = 0.01
+    # Fraction of documents that contain keywords at all
+    keyword_document_fraction: float = 0.2
+
+
+def create_synthetic_labels() -> None:
+    """Create the instanties, rechtsgebieden and procedures used in synthetic uitspraken, and Onbekend"""
+    for naam, afkorting, instantie_type in INSTANTIES + [("Onbekend", "XX", "Onbekend")]:
+        Instantie.objects.get_or_create(
+            naam=naam,
+            defaults={
+                "afkorting": afkorting,
+                "instantie_type": instantie_type,
+                "identifier": f"http://standaarden.overheid.nl/owms/terms/{naam.replace(' ', '_')}",
+                "begin_date": datetime.date(1838, 10, 1)
+            }
+        )
+
+    for naam, identifier in RECHTSGEBIEDEN:
+        Rechtsgebied.objects.get_or_create(identifier=identifier, defaults={"naam": naam})
+
+    for naam, identifier in PROCEDURES:
+        ProcedureSoort.objects.get_or_create(identifier=identifier, defaults={"naam": naam})
+
+
+def _citation(rng: random.Random) -> str:
+    kind = rng.randrange(4)
+
+    if kind == 0:
+        year = rng.randrange(1995, 2024)
+        return f"Kamerstukken II {year}/{(year + 1) % 100:02d}, {rng.randrange(20000, 36500)}, nr. {rng.randrange(1, 12)}, p. {rng.randrange(1, 80)}"
+    if kind == 1:
+        naam, afkorting, _instantie_type = rng.choice(INSTANTIES)
+        return f"{naam} {rng.randrange(1, 28)} maart {rng.randrange(1995, 2024)}, ECLI:NL:{afkorting}:{rng.randrange(1995, 2024)}:{rng.randrange(1, 9999)}"
+    if kind == 2:
+        return f"artikel {rng.randrange(1, 8)}:{rng.randrange(1, 300)} BW"
+    return f"artikel {rng.randrange(1, 120)} van de Grondwet"
+
+
+def _sentence(rng: random.Random, config: CorpusConfig, with_keywords: bool) -> str:
+    words = rng.choices(WORDS, k=rng.randrange(8, 30))
+
+    if rng.random() < config.citation_rate:
+        words.insert(rng.randrange(len(words)), f"({_citation(rng)})")
+
+    if with_keywords and rng.random() < config.keyword_rate * 10:
+        words.insert(rng.randrange(len(words)), rng.choice(KEYWORDS))
+        if rng.random() < 0.5:
+            words.insert(rng.randrange(len(words)), rng.choice(CONDITIONAL_KEYWORDS))
+
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraph(rng: random.Random, config: CorpusConfig, with_keywords: bool) -> str:
+    sentences = max(1, int(rng.gauss(config.sentences_per_paragraph, 1.5)))
+    return escape(" ".join(_sentence(rng, config, with_keywords) for _ in range(sentences)))
+
+
+def generate_document(rng: random.Random, number: int, config: CorpusConfig) -> tuple[str, str]:
+    """Generate a single document; returns its ECLI and XML"""
+    conclusie = rng.random() < config.conclusie_fraction
+    if conclusie:
+        naam, afkorting, _instantie_type = INSTANTIES[1]
+    else:
+        naam, afkorting, _instantie_type = rng.choice([instantie for instantie in INSTANTIES if instantie[1] != "PHR"])
+
+    year = rng.randrange(config.first_year, config.last_year + 1)
+    uitspraakdatum = datetime.date(year, 1, 1) + datetime.timedelta(days=rng.randrange(365))
+    publicatiedatum = uitspraakdatum + datetime.timedelta(days=rng.randrange(1, 60))
+    ecli = f"ECLI:NL:{afkorting}:{year}:{number}"
+    uitspraak_type = "Conclusie" if conclusie else "Uitspraak"
+
+    procedures = rng.sample(PROCEDURES, rng.randrange(0, config.max_procedures + 1))
+    rechtsgebieden = rng.sample(RECHTSGEBIEDEN, rng.randrange(1, config.max_rechtsgebieden + 1))
+    labels = "".join(
+        f'      <psi:procedure rdfs:label="Procedure" resourceIdentifier="{identifier}">{naam}</psi:procedure>\n'
+        for naam, identifier in procedures
+    ) + "".join(
+        f'      <dcterms:subject rdfs:label="Rechtsgebied" resourceIdentifier="{identifier}">{naam}</dcterms:subject>\n'
+        for naam, identifier in rechtsgebieden
+    )
+
+    paragraphs = min(
+        config.max_paragraphs,
+        max(1, int(rng.lognormvariate(math.log(config.median_paragraphs), config.paragraph_sigma)))
+    )
+    with_keywords = rng.random() < config.keyword_document_fraction
+
+    sections = []
+    per_section = max(1, math.ceil(paragraphs / len(SECTION_TITLES)))
+    for section_number, title in enumerate(SECTION_TITLES, start=1):
+        count = min(per_section, paragraphs - (section_number - 1) * per_section)
+        if count <= 0:
+            break
+        paras = "".join(
+            f"<parablock><nr>{section_number}.{n}</nr><para>{_paragraph(rng, config, with_keywords)}</para></parablock>\n"
+            for n in range(1, count + 1)
+        )
+        sections.append(f"<section><title><nr>{section_number}</nr>{title}</title>\n{paras}</section>\n")
+
+    body_element = "conclusie" if conclusie else "uitspraak"
+    xml = f"""<?xml version="1.0" encoding="utf-8"?>
+<open-rechtspraak>
+  <rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" xmlns:dcterms="http://purl.org/dc/terms/" xmlns:psi="http://psi.rechtspraak.nl/" xmlns:rdfs="http://www.w3.org/2000/01/rdf-schema#">
+    <rdf:Description>
+      <dcterms:identifier>{ecli}</dcterms:identifier>
+      <dcterms:format>text/xml</dcterms:format>
+      <dcterms:accessRights>public</dcterms:accessRights>
+      <dcterms:modified>{publicatiedatum.isoformat()}T09:00:00</dcterms:modified>
+      <dcterms:issued rdfs:label="Publicatiedatum">{publicatiedatum.isoformat()}</dcterms:issued>
+      <dcterms:publisher rdfs:label="Uitgevende instantie">Raad voor de Rechtspraak</dcterms:publisher>
+      <dcterms:language>nl</dcterms:language>
+      <dcterms:creator rdfs:label="Instantie">{naam}</dcterms:creator>
+      <dcterms:date rdfs:label="Uitspraakdatum">{uitspraakdatum.isoformat()}</dcterms:date>
+      <psi:zaaknummer rdfs:label="Zaaknr">{year % 100:02d}/{number:06d}</psi:zaaknummer>
+      <dcterms:type rdfs:label="Type">{uitspraak_type}</dcterms:type>
+{labels}    </rdf:Description>
+  </rdf:RDF>
+  <inhoudsindicatie xmlns="http://www.rechtspraak.nl/schema/rechtspraak-1.0" id="{ecli}:INH"><para>{_paragraph(rng, config, with_keywords)}</para></inhoudsindicatie>
+  <{body_element} xmlns="http://www.rechtspraak.nl/schema/rechtspraak-1.0" id="{ecli}:DOC">
+{"".join(sections)}  </{body_element}>
+</open-rechtspraak>
+"""
+    return ecli, xml
+
+
+def generate_corpus(count: int, config: CorpusConfig) -> Iterator[tuple[str, str]]:
+    """Generate count documents, deterministically for the seed of config; yields (ECLI, XML)"""
+    rng = random.Random(config.seed)
+
+    for number in range(config.first_number, config.first_number + count):
+        yield generate_document(rng, number, config)
+
+
+def write_corpus(output_dir: Path, count: int, config: CorpusConfig) -> int:
+    """Write count documents to output_dir, named like the files of the Open Data dumps; returns the number of bytes written"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    written = 0
+
+    for ecli, xml in generate_corpus(count, config):
+        data = xml.encode("utf-8")
+        (output_dir / f"{ecli.replace(':', '_')}.xml").write_bytes(data)
+        written += len(data)
+
+    logger.info("Wrote %s synthetic uitspraken (%s bytes) to %s", count, written, output_dir)
+    return written
@@ -8,6 +8,1471 @@
     SPDX-License-Identifier: EUPL-1.2
 """
 
-from django.test import TestCase
+import contextlib
+import csv
+import datetime
+import importlib
+import io
+import json
+import math
+import os
+import pstats
+import re
+import tempfile
+import tracemalloc
+import unittest
 
-# Create your tests here.
+from pathlib import Path
+from unittest import mock
+
+from django.apps import apps as django_apps
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command, get_commands, load_command_class
+from django.db import IntegrityError, connection, transaction
+from django.http import HttpRequest, HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from rechtspraak.admin import EstimatedCountPaginator, UitspraakAdmin, estimated_count
+from rechtspraak.api import DEFAULT_LIST_FIELDS, decode_cursor, encode_cursor
+from rechtspraak.blobstore import PackStore
+from rechtspraak.bulkload import bulk_load
+from rechtspraak.cache import bump_data_version, cache_response, cached, data_version
+from rechtspraak.citations import citation_type, store_citations, uitspraken_citing_kamerstuk
+from rechtspraak.corpuspack import CorpusPack, build_corpus_pack
+from rechtspraak.counts import refresh_counts, uitspraak_contribution, update_counts
+from rechtspraak.export import experiment_counts, export_results, iter_json_records, iterate_uitspraken, uitspraak_metadata, write_json_array, write_ndjson
+from rechtspraak.memo import MemoizedTextFunction, memoize, registry, text_hash
+from rechtspraak.minhash import cluster_signatures, distinct_uitspraken, near_duplicates, update_signatures
+from rechtspraak.models import Citation, ExperimentResult, Instantie, RechtsgebiedCounts, TextAnalysisMemo, Uitspraak, UitspraakCounts
+from rechtspraak.partitioning import KEY_TABLE, convert_to_partitioned, create_partitions, is_partitioned, partition_name, with_partition_key
+from rechtspraak.profiling import StageTimer
+from rechtspraak.progress import progress
+from rechtspraak.synthetic import RECHTSGEBIEDEN, CorpusConfig, create_synthetic_labels, generate_corpus
+from rechtspraak.tokenstreams import tokenize
+from rechtspraak.trigrams import regexp_candidates, with_candidate_tekst
+from rechtspraak.utils import create_uitspraak_from_xmlstring, instantie_types, parse_uitspraak_xml
+from rechtspraak.waardelijsten import WAARDELIJSTEN, apply_waardelijst, sync_waardelijsten
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+# The number of queries of the hot paths, per document for the import, per chunk for the exports and
+# per uitspraak for the experiments, pinned so that a change that makes one of these scale worse,
+# e.g. by introducing N+1 queries, makes the tests fail. These are the numbers on SQLite, the default
+# database.
+
+# Queries to create a new uitspraak, once there are counts for its instantie, year and rechtsgebieden:
+# the instantie, update_or_create, saving it and updating the counts; plus a lookup and an insert
+# per label, and a count update per rechtsgebied
+CREATE_QUERIES = 9
+CREATE_QUERIES_PER_PROCEDURE = 2
+CREATE_QUERIES_PER_RECHTSGEBIED = 3
+
+# Queries to update an existing uitspraak with the same labels
+UPDATE_QUERIES = 7
+UPDATE_QUERIES_PER_LABEL = 2
+
+# Queries of an export before the first chunk, and per chunk: the uitspraken and two prefetches
+EXPORT_ITERATE_QUERIES = 1
+EXPORT_QUERIES_PER_CHUNK = 2
+
+# Queries of an experiment before the first uitspraak, with the instantie types cached: the count, the trigram index and the uitspraken
+EXPERIMENT_QUERIES = 3
+# Queries per uitspraak: saving it and its ExperimentResult; the first time an uitspraak gets data,
+# also the counts of uitspraken with data, per instantie and per rechtsgebied
+EXPERIMENT_QUERIES_PER_UITSPRAAK = 2
+EXPERIMENT_QUERIES_PER_NEW_DATA = 2
+EXPERIMENT_QUERIES_PER_NEW_DATA_RECHTSGEBIED = 1
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+KEYWORD_SEARCH_ARGS = ["experiment_keyword_search", "Rechtbank", "toeslag"]
+KEYWORD_SEARCH_OPTIONS = {"conditional_search_pattern": "grondwet", "experiment_name": "test"}
+
+
+def small_corpus(count: int, first_number: int = 1) -> list[tuple[str, str]]:
+    """A synthetic corpus of small uitspraken from one year"""
+    return list(generate_corpus(count, CorpusConfig(seed=first_number, first_number=first_number, median_paragraphs=3, first_year=2020, last_year=2020)))
+
+
+def load(documents: list[tuple[str, str]]) -> None:
+    for ecli, xml in documents:
+        create_uitspraak_from_xmlstring(xml, ecli)
+
+
+def republished(xml: str) -> str:
+    """A new version of a document, with another tekst and an extra rechtsgebied"""
+    naam, identifier = RECHTSGEBIEDEN[-1]
+    return xml.replace("</title>", " (herzien)</title>").replace(
+        "    </rdf:Description>",
+        f'      <dcterms:subject rdfs:label="Rechtsgebied" resourceIdentifier="{identifier}">{naam}</dcterms:subject>\n    </rdf:Description>'
+    )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class IngestQueryTests(TestCase):
+    """The number of queries of create_uitspraak_from_xmlstring does not grow with the database"""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        create_synthetic_labels()
+
+    def test_create(self) -> None:
+        documents = small_corpus(20)
+        load(documents)
+
+        for ecli, xml in documents:
+            # The same uitspraak under another ECLI
+            ecli, xml = f"{ecli}0", xml.replace(ecli, f"{ecli}0")
+            parsed = parse_uitspraak_xml(xml, ecli)
+            expected = (
+                CREATE_QUERIES
+                + CREATE_QUERIES_PER_PROCEDURE * len(parsed.procedure_identifiers)
+                + CREATE_QUERIES_PER_RECHTSGEBIED * len(parsed.rechtsgebied_identifiers)
+            )
+
+            with self.assertNumQueries(expected):
+                create_uitspraak_from_xmlstring(xml, ecli)
+
+    def test_update(self) -> None:
+        documents = small_corpus(20)
+        load(documents)
+
+        for ecli, xml in documents:
+            parsed = parse_uitspraak_xml(xml, ecli)
+            labels = len(parsed.procedure_identifiers) + len(parsed.rechtsgebied_identifiers)
+
+            with self.assertNumQueries(UPDATE_QUERIES + UPDATE_QUERIES_PER_LABEL * labels):
+                create_uitspraak_from_xmlstring(xml, ecli)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ExportQueryTests(TestCase):
+    """Exports make a constant number of queries per chunk"""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        create_synthetic_labels()
+        load(small_corpus(50))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            call_command("experiment_sociale_grondrechten", "Rechtbank", experiment_name="socialegrondrechten")
+            call_command("experiment_sociale_grondrechten", "HogeRaad", experiment_name="socialegrondrechten")
+
+    def test_iterate_uitspraken(self) -> None:
+        total = Uitspraak.objects.count()
+
+        for chunk_size in [10, 25, 100]:
+            chunks = math.ceil(total / chunk_size)
+            with self.assertNumQueries(EXPORT_ITERATE_QUERIES + EXPORT_QUERIES_PER_CHUNK * chunks):
+                for uitspraak in iterate_uitspraken(Uitspraak.objects.order_by("id"), chunk_size):
+                    uitspraak_metadata(uitspraak)
+
+    def test_export_commands(self) -> None:
+        # Besides the chunks, only a query to count the uitspraken
+        with tempfile.TemporaryDirectory() as tmpdir, contextlib.chdir(tmpdir), contextlib.redirect_stdout(io.StringIO()):
+            for export_format in ["json", "ndjson"]:
+                with self.assertNumQueries(1 + EXPORT_ITERATE_QUERIES + EXPORT_QUERIES_PER_CHUNK):
+                    call_command("experiment_sociale_grondrechten_export", format=export_format)
+
+            with self.assertNumQueries(EXPORT_ITERATE_QUERIES + EXPORT_QUERIES_PER_CHUNK):
+                call_command("export_csv", "socialegrondrechten_all", os.path.join(tmpdir, "export.csv"))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ExperimentQueryTests(TestCase):
+    """Experiments make a constant number of queries per uitspraak"""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        create_synthetic_labels()
+        load(small_corpus(50))
+
+    def setUp(self) -> None:
+        instantie_types(refresh=True)
+
+    def test_keyword_search(self) -> None:
+        uitspraken = Uitspraak.objects.filter(instantie__instantie_type="Rechtbank").exclude(tekst="")
+        count = uitspraken.count()
+        rechtsgebieden = Uitspraak.rechtsgebieden.through.objects.filter(uitspraak__in=uitspraken).count()
+
+        expected = (
+            EXPERIMENT_QUERIES
+            + EXPERIMENT_QUERIES_PER_UITSPRAAK * count
+            + EXPERIMENT_QUERIES_PER_NEW_DATA * count
+            + EXPERIMENT_QUERIES_PER_NEW_DATA_RECHTSGEBIED * rechtsgebieden
+        )
+        with self.assertNumQueries(expected), contextlib.redirect_stdout(io.StringIO()):
+            call_command(*KEYWORD_SEARCH_ARGS, **KEYWORD_SEARCH_OPTIONS)
+
+        # Once the uitspraken have data, the counts do not change anymore
+        with self.assertNumQueries(EXPERIMENT_QUERIES + EXPERIMENT_QUERIES_PER_UITSPRAAK * count), contextlib.redirect_stdout(io.StringIO()):
+            call_command(*KEYWORD_SEARCH_ARGS, **KEYWORD_SEARCH_OPTIONS)
+
+
+class ExportFormatTests(SimpleTestCase):
+    """Both export formats are valid and are read back record by record"""
+
+    RECORDS = [
+        {"ecli": "ECLI:NL:HR:2020:1", "rechtsgebieden": ["Bestuursrecht", "Civiel recht"], "inhoudsindicatie": "Art. 1 [oud], \"lid 2\"\n"},
+        {"ecli": "ECLI:NL:RBAMS:2020:2", "rechtsgebieden": [], "inhoudsindicatie": "Één ]}, ["},
+        {"ecli": "ECLI:NL:CRVB:2020:3", "test__matches": None, "data": {"experiments": {"test": {"matches": [[1, 2], []]}}}},
+    ]
+
+    def test_round_trip(self) -> None:
+        for records in [self.RECORDS, self.RECORDS[:1], []]:
+            for writer in [write_json_array, write_ndjson]:
+                with self.subTest(writer=writer.__name__, records=len(records)):
+                    outfile = io.StringIO()
+                    self.assertEqual(writer(records, outfile), len(records))
+
+                    content = outfile.getvalue()
+                    if writer is write_json_array:
+                        self.assertEqual(json.loads(content), records)
+                    else:
+                        self.assertEqual([json.loads(line) for line in content.splitlines()], records)
+
+                    # Records are split across reads of the buffer
+                    for buffer_size in [1, 7, 1 << 16]:
+                        self.assertEqual(list(iter_json_records(io.StringIO(content), buffer_size)), records)
+
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_json_records(io.StringIO('[{"ecli": "ECLI:NL:HR:2020:1"}, {"ecli": '), 7))
+
+    def test_export_results(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for export_format in ["json", "ndjson"]:
+                filename = export_results(iter(self.RECORDS), os.path.join(tmpdir, "export"), export_format)
+                self.assertTrue(filename.endswith(f".{export_format}"))
+                with open(filename, "rt", encoding="utf-8") as infile:
+                    self.assertEqual(list(iter_json_records(infile)), self.RECORDS)
+
+            with self.assertRaises(ValueError):
+                export_results(iter(self.RECORDS), os.path.join(tmpdir, "export"), "xml")
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ExportMemoryTests(TestCase):
+    """The peak memory use of an export does not grow with the number of uitspraken exported"""
+
+    CHUNK_SIZE = 20
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        create_synthetic_labels()
+        load(small_corpus(200))
+
+    def export_peak(self, count: int) -> int:
+        """The peak memory use, in bytes, of exporting count uitspraken"""
+        uitspraken = Uitspraak.objects.order_by("id")[:count]
+
+        with tempfile.TemporaryFile("w+t", encoding="utf-8") as outfile:
+            tracemalloc.start()
+            try:
+                written = write_ndjson((uitspraak_metadata(uitspraak) for uitspraak in iterate_uitspraken(uitspraken, self.CHUNK_SIZE)), outfile)
+                _current, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+        self.assertEqual(written, count)
+        return peak
+
+    def test_export_peak_memory(self) -> None:
+        # Warm up caches of Django and the database driver, which would otherwise count for the first export
+        self.export_peak(self.CHUNK_SIZE)
+
+        small = self.export_peak(2 * self.CHUNK_SIZE)
+        large = self.export_peak(10 * self.CHUNK_SIZE)
+
+        # Five times as many uitspraken take (almost) no more memory, as only a chunk is held at a time
+        self.assertLess(large, 1.5 * small)
+
+
+INSTANTIES_XML = b"""<?xml version="1.0" encoding="utf-8"?>
+<Instanties>
+  <Instantie>
+    <Naam>Hoge Raad</Naam>
+    <Afkorting>HR</Afkorting>
+    <Type>HogeRaad</Type>
+    <BeginDate>1838-10-01</BeginDate>
+    <Identifier>http://standaarden.overheid.nl/owms/terms/Hoge_Raad_der_Nederlanden</Identifier>
+  </Instantie>
+  <Instantie>
+    <Naam>Rechtbank Oost-Brabant</Naam>
+    <Afkorting>RBOBR</Afkorting>
+    <Type>Rechtbank</Type>
+    <BeginDate>2013-01-01</BeginDate>
+    <Identifier>http://standaarden.overheid.nl/owms/terms/Rechtbank_Oost-Brabant</Identifier>
+  </Instantie>
+</Instanties>
+"""
+
+
+def results_sg_naar_csv(filename: str) -> None:
+    """The former results-sg-naar-csv.py, with the filename as a parameter"""
+    with open(filename, "rt", encoding="utf-8") as resultsfile:
+        results = json.load(resultsfile)
+
+    export_filename = filename.replace(".json", ".csv")
+
+    with open(export_filename, "wt", encoding="utf-8") as csvfile:
+        csvwr = csv.writer(csvfile, delimiter=',', quoting=csv.QUOTE_ALL, quotechar='|')
+
+        csvwr.writerow([
+            "ECLI",
+            "Uitspraakdatum",
+            "Instantie",
+            "Uitspraak type",
+            "Inhoudsindicatie",
+            "Aantal matches voor 'toeslagen'",
+            "Aantal matches voor 'sociale grondrechten'",
+            "Gevonden matches voor 'toeslagen'",
+            "Gevonden matches voor 'sociale grondrechten'"
+        ])
+
+        for result in results:
+            if len(result["data-socialegrondrechten_all"]["matches"]) > 0:
+                csvwr.writerow([
+                    result["ecli"],
+                    result["uitspraakdatum"],
+                    result["instantie"],
+                    result["uitspraak_type"],
+                    result["inhoudsindicatie"].strip(),
+                    len(result["data-socialegrondrechten_all"]["matches"]),
+                    len(result["data-socialegrondrechten_all"]["additional_matches"]),
+                    result["data-socialegrondrechten_all"]["matches"],
+                    result["data-socialegrondrechten_all"]["additional_matches"],
+                ])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ExportCsvTests(TestCase):
+    """export_csv, with the columns given in the README, writes the same file as results-sg-naar-csv.py did"""
+
+    # As in the README
+    SG_COLUMNS = (
+        "ecli:ECLI,uitspraakdatum:Uitspraakdatum,instantie:Instantie,uitspraak_type:Uitspraak type,inhoudsindicatie:Inhoudsindicatie,"
+        "matches_count:Aantal matches voor 'toeslagen',additional_matches_count:Aantal matches voor 'sociale grondrechten',"
+        "matches:Gevonden matches voor 'toeslagen',additional_matches:Gevonden matches voor 'sociale grondrechten'"
+    )
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        create_synthetic_labels()
+        instantie_types(refresh=True)
+        load(list(generate_corpus(40, CorpusConfig(seed=11, median_paragraphs=3, first_year=2018, last_year=2021, keyword_document_fraction=0.5))))
+        with contextlib.redirect_stdout(io.StringIO()):
+            call_command("experiment_sociale_grondrechten", "Rechtbank", experiment_name="socialegrondrechten")
+
+    def test_same_as_script(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir, contextlib.chdir(tmpdir):
+            with contextlib.redirect_stdout(io.StringIO()):
+                call_command("experiment_sociale_grondrechten_export")
+            [export] = Path(tmpdir).glob("results_socialegrondrechten_*.json")
+            results_sg_naar_csv(str(export))
+            expected = export.with_suffix(".csv").read_bytes()
+
+            with open(export, "rt", encoding="utf-8") as exportfile:
+                with_matches = sum(1 for record in json.load(exportfile) if record["data-socialegrondrechten_all"]["matches"])
+            self.assertGreater(with_matches, 0)
+            self.assertEqual(expected.count(b"\r\n"), with_matches + 1)
+
+            for source in [[], ["--from-export", str(export)]]:
+                with self.subTest(source=source):
+                    call_command("export_csv", "socialegrondrechten_all", "export.csv", "--only-with-matches", "--columns", self.SG_COLUMNS, *source)
+                    self.assertEqual(Path("export.csv").read_bytes(), expected)
+
+
+@unittest.skipIf(pq is None, "The Parquet export requires pyarrow")
+@override_settings(CACHES=LOCMEM_CACHES)
+class ParquetExportTests(TestCase):
+    """export_parquet writes one partition per year or instantie type, with every uitspraak in it once"""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        create_synthetic_labels()
+        instantie_types(refresh=True)
+        load(list(generate_corpus(30, CorpusConfig(seed=5, median_paragraphs=3, first_year=2018, last_year=2021))))
+        with contextlib.redirect_stdout(io.StringIO()):
+            call_command(*KEYWORD_SEARCH_ARGS, **KEYWORD_SEARCH_OPTIONS)
+
+    def export(self, output_dir: str, partition_by: str) -> dict[str, list[dict]]:
+        call_command("export_parquet", output_dir, "--partition-by", partition_by, "--experiment-id", "test_all", "--chunk-size", "4")
+        return {
+            path.parent.name: pq.read_table(path).to_pylist()
+            for path in sorted(Path(output_dir).glob("*/*.parquet"))
+        }
+
+    def test_partition_by_year(self) -> None:
+        years = sorted({uitspraak.uitspraakdatum.year for uitspraak in Uitspraak.objects.all()})
+        self.assertGreater(len(years), 1)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            partitions = self.export(tmpdir, "year")
+            self.assertEqual(list(partitions), [f"year={year}" for year in years])
+
+            for year in years:
+                rows = partitions[f"year={year}"]
+                uitspraken = Uitspraak.objects.filter(uitspraakdatum__year=year).order_by("uitspraakdatum", "id")
+                self.assertEqual([row["ecli"] for row in rows], [uitspraak.ecli for uitspraak in uitspraken])
+                # The partition column is only in the directory name
+                self.assertNotIn("year", rows[0])
+
+                for row, uitspraak in zip(rows, uitspraken):
+                    self.assertEqual(row["uitspraakdatum"], uitspraak.uitspraakdatum)
+                    self.assertEqual(row["rechtsgebieden"], [rechtsgebied.naam for rechtsgebied in uitspraak.rechtsgebieden.all()])
+                    self.assertEqual(row["test_all__matches"], experiment_counts(uitspraak, "test_all")["test_all__matches"])
+
+            # The dataset as a whole, with the year read back from the directory names
+            dataset = pq.read_table(tmpdir, partitioning="hive")
+            self.assertEqual(dataset.num_rows, Uitspraak.objects.count())
+            self.assertEqual(sorted(set(dataset.column("year").to_pylist())), years)
+            self.assertTrue(any(value is not None for value in dataset.column("test_all__matches").to_pylist()))
+
+    def test_partition_by_instantie_type(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir, self.assertLogs("rechtspraak.progress", "INFO") as logs:
+            partitions = self.export(tmpdir, "instantie_type")
+
+        total = Uitspraak.objects.count()
+        self.assertIn(f"Parquet export: {total}/{total} (100.0%)", logs.output[-1])
+
+        expected = Uitspraak.objects.values_list("instantie__instantie_type", flat=True).distinct()
+        self.assertEqual(set(partitions), {f"instantie_type={instantie_type}" for instantie_type in expected})
+        for name, rows in partitions.items():
+            instantie_type = name.split("=", 1)[1]
+            self.assertEqual(len(rows), Uitspraak.objects.filter(instantie__instantie_type=instantie_type).count())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class WaardelijstenTests(TestCase):
+    """A waardelijst is compared with the database, and only new and changed rows are written"""
+
+    def test_apply(self) -> None:
+        waardelijst = WAARDELIJSTEN["instanties"]
+        rows = waardelijst.parse(INSTANTIES_XML)
+
+        # The existing rows, and an upsert of the new ones
+        with self.assertNumQueries(2):
+            result = apply_waardelijst(waardelijst, rows)
+        self.assertEqual((result.created, result.updated, result.unchanged), (2, 0, 0))
+        self.assertEqual(Instantie.objects.get(afkorting="HR").begin_date, datetime.date(1838, 10, 1))
+
+        with self.assertNumQueries(1):
+            result = apply_waardelijst(waardelijst, rows)
+        self.assertEqual((result.created, result.updated, result.unchanged), (0, 0, 2))
+
+        rows[1]["end_date"] = datetime.date(2030, 1, 1)
+        with self.assertNumQueries(2):
+            result = apply_waardelijst(waardelijst, rows[1:])
+        self.assertEqual((result.created, result.updated, result.unchanged, result.missing), (0, 1, 0, 1))
+        self.assertEqual(Instantie.objects.get(afkorting="RBOBR").end_date, datetime.date(2030, 1, 1))
+        self.assertEqual(Instantie.objects.count(), 2)
+
+    def test_sync(self) -> None:
+        requested = []
+
+        def get(url: str, headers: dict[str, str], timeout: int) -> mock.Mock:
+            requested.append(headers)
+            if headers.get("If-None-Match") == '"v1"':
+                return mock.Mock(status_code=304)
+            return mock.Mock(status_code=200, content=INSTANTIES_XML, headers={"ETag": '"v1"'})
+
+        with mock.patch("requests.get", side_effect=get):
+            [result] = sync_waardelijsten(["instanties"])
+            self.assertEqual((result.created, requested[-1]), (2, {}))
+
+            [result] = sync_waardelijsten(["instanties"])
+            self.assertTrue(result.not_modified)
+            self.assertEqual(requested[-1], {"If-None-Match": '"v1"'})
+
+            # The validators are still in the cache, but the database was emptied
+            Instantie.objects.all().delete()
+            [result] = sync_waardelijsten(["instanties"])
+            self.assertEqual((result.created, requested[-1]), (2, {}))
+
+            [result] = sync_waardelijsten(["instanties"], force=True)
+            self.assertEqual((result.unchanged, requested[-1]), (2, {}))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CommandStartupTests(TestCase):
+    """Constructing a command, e.g. for --help, does not query the database"""
+
+    def test_no_queries(self) -> None:
+        names = [name for name, app in get_commands().items() if app == "rechtspraak"]
+        self.assertIn("experiment_keyword_search", names)
+
+        for name in names:
+            with self.subTest(name), self.assertNumQueries(0):
+                load_command_class("rechtspraak", name).create_parser("manage.py", name)
+
+    def test_unknown_instantie_type(self) -> None:
+        with self.assertRaisesMessage(CommandError, "Unknown instantie type"):
+            call_command("experiment_keyword_search", "Nergens", "toeslag")
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProfilingTests(TestCase):
+    """Commands report the time per stage, and optionally the time in SQL and a cProfile profile"""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        create_synthetic_labels()
+
+    def test_stage_timer(self) -> None:
+        stage_timer = StageTimer()
+        for _ in range(3):
+            with stage_timer.stage("parse"):
+                pass
+        stage_timer.add("write", 0.5, count=2)
+
+        self.assertEqual(stage_timer.stages["parse"][1], 3)
+        self.assertEqual(stage_timer.stages["write"], [0.5, 2])
+        # The most time-consuming stage first
+        lines = stage_timer.report().splitlines()
+        self.assertEqual([line.split()[0] for line in lines], ["stage", "write", "parse", "wall"])
+        self.assertEqual(lines[1].split()[4], "250.000")
+
+    def stage_counts(self, report: str) -> dict[str, int]:
+        """The number of calls per stage in the table at the end of report"""
+        report = "\n" + report
+        table = report[report.rindex("\nstage ") + 1:].splitlines()
+        self.assertTrue(table[-1].startswith("wall time"))
+        return {
+            match[1]: int(match[2])
+            for match in (re.fullmatch(r"(.+?) +[0-9.]+ +[0-9.]+ +([0-9]+) +[0-9.]+", line) for line in table[1:-1])
+        }
+
+    def test_profile(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for ecli, xml in small_corpus(3):
+                with open(os.path.join(tmpdir, f"{ecli.replace(':', '_')}.xml"), "wt", encoding="utf-8") as xmlfile:
+                    xmlfile.write(xml)
+
+            output = io.StringIO()
+            call_command("create_uitspraak_from_xml", tmpdir, "--profile", "--sql-timing", stderr=output)
+            report = output.getvalue()
+
+            # The slowest functions, followed by the table of stages
+            self.assertIn("function calls", report)
+            self.assertLess(report.index("cumulative"), report.rindex("\nstage "))
+            self.assertIn("\n   ncalls  tottime  percall  cumtime  percall filename:lineno(function)\n", report)
+            counts = self.stage_counts(report)
+            self.assertEqual({name: counts[name] for name in ["parse", "lookup", "write"]}, {"parse": 3, "lookup": 3, "write": 3})
+            self.assertGreater(counts["sql select"], 0)
+            self.assertGreater(counts["sql insert"], 0)
+
+            # Saved to a file instead, and without SQL timing
+            output = io.StringIO()
+            call_command("create_uitspraak_from_xml", tmpdir, "--profile", os.path.join(tmpdir, "import.prof"), stderr=output)
+            self.assertNotIn("function calls", output.getvalue())
+            counts = self.stage_counts(output.getvalue())
+            self.assertEqual(counts["parse"], 3)
+            self.assertFalse(any(name.startswith("sql") for name in counts))
+            self.assertGreater(pstats.Stats(os.path.join(tmpdir, "import.prof")).total_calls, 0)
+
+
+class ProgressTests(SimpleTestCase):
+    """Progress is reported at a fixed interval, not for every item"""
+
+    def test_throttled(self) -> None:
+        with self.assertLogs("rechtspraak.progress", "INFO") as logs:
+            for _item in progress(range(100_000), description="Test", interval=60, stream=io.StringIO()):
+                pass
+
+        # Only the final progress, as the loop takes far less than a minute
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn("100000/100000 (100.0%)", logs.records[0].getMessage())
+
+
+class PackStoreTests(SimpleTestCase):
+    """Blobs are stored once, found again across pack files and processes, and read without copying"""
+
+    def test_pack_store(self) -> None:
+        blobs = [f"<uitspraak>{number}</uitspraak>" * 100 for number in range(50)]
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = PackStore(tmpdir, pack_size=10_000)
+            keys = [store.put(blob) for blob in blobs]
+
+            # Storing a blob again does not store it twice
+            size = sum(os.path.getsize(os.path.join(tmpdir, name)) for name in os.listdir(tmpdir))
+            self.assertEqual(store.put(blobs[0]), keys[0])
+            self.assertEqual(size, sum(os.path.getsize(os.path.join(tmpdir, name)) for name in os.listdir(tmpdir)))
+
+            # Full pack files are sealed with an index, and a new pack file is started
+            self.assertGreater(len([name for name in os.listdir(tmpdir) if name.endswith(".idx")]), 1)
+            store.close()
+
+            # Another process that opens the store finds all blobs
+            reopened = PackStore(tmpdir, pack_size=10_000)
+            for key, blob in zip(keys, blobs):
+                self.assertIsInstance(reopened.get(key), memoryview)
+                self.assertEqual(reopened.get_text(key), blob)
+
+            with self.assertRaises(KeyError):
+                reopened.get("00" * 32)
+            reopened.close()
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class MoveRawXmlTests(TestCase):
+    """move_raw_xml_to_store moves the raw XML out of the database, and back"""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        create_synthetic_labels()
+        load(small_corpus(20))
+
+    def test_move_and_restore(self) -> None:
+        raw_xml = dict(Uitspraak.objects.values_list("ecli", "raw_xml"))
+
+        with tempfile.TemporaryDirectory() as tmpdir, override_settings(RECHTSPRAAK_RAW_XML_STORE=tmpdir):
+            call_command("move_raw_xml_to_store", chunk_size=7)
+            self.assertFalse(Uitspraak.objects.exclude(raw_xml="").exists())
+
+            for uitspraak in Uitspraak.objects.all():
+                self.assertEqual(uitspraak.get_raw_xml(), raw_xml[uitspraak.ecli])
+
+            call_command("move_raw_xml_to_store", restore=True)
+            self.assertEqual(dict(Uitspraak.objects.filter(raw_xml_hash="").values_list("ecli", "raw_xml")), raw_xml)
+
+    def test_import_into_store(self) -> None:
+        ecli, xml = small_corpus(1)[0]
+        xml = republished(xml)
+        saved_hashes = []
+
+        def flush(store: PackStore) -> None:
+            saved_hashes.append(Uitspraak.objects.get(ecli=ecli).raw_xml_hash)
+            os.fsync(store.write_fd)
+
+        with tempfile.TemporaryDirectory() as tmpdir, override_settings(RECHTSPRAAK_RAW_XML_STORE=tmpdir):
+            with mock.patch.object(PackStore, "flush", autospec=True, side_effect=flush):
+                uitspraak = create_uitspraak_from_xmlstring(xml, ecli)
+
+            # The store was flushed before the hash of the new XML was saved
+            self.assertEqual(saved_hashes, [""])
+            uitspraak.refresh_from_db()
+            self.assertEqual((uitspraak.raw_xml, uitspraak.get_raw_xml()), ("", xml))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CorpusPackTests(TestCase):
+    """The corpus pack has the same texts as the database, and only grows with changed texts"""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        create_synthetic_labels()
+        load(small_corpus(30))
+
+    def assert_same_matches(self, pack: CorpusPack, pattern: str) -> None:
+        expected = {}
+        for uitspraak_id, tekst in Uitspraak.objects.values_list("id", "tekst"):
+            matches = re.findall(pattern, tekst)
+            if matches:
+                expected[uitspraak_id] = matches
+
+        self.assertEqual(dict(pack.scan(pattern)), expected)
+        self.assertEqual(dict(pack.scan(pattern.encode("utf-8"))), expected)
+
+    def test_incremental_build(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.assertEqual(build_corpus_pack(tmpdir), Uitspraak.objects.count())
+            with CorpusPack.open(tmpdir) as pack:
+                self.assert_same_matches(pack, r"(toeslag\w*)")
+
+            # Experiments, and loading the same documents again, save uitspraken without changing their
+            # tekst; these are not even read again
+            instantie_types(refresh=True)
+            with contextlib.redirect_stdout(io.StringIO()):
+                call_command(*KEYWORD_SEARCH_ARGS, **KEYWORD_SEARCH_OPTIONS)
+            self.assertTrue(Uitspraak.objects.exclude(data={}).exists())
+            load(small_corpus(3))
+
+            with self.assertLogs("rechtspraak.corpuspack", "INFO") as logs:
+                self.assertEqual(build_corpus_pack(tmpdir), 0)
+            self.assertIn("Found 0 new or changed uitspraken", "\n".join(logs.output))
+
+            changed = Uitspraak.objects.order_by("id").first()
+            changed.tekst = "Een gewijzigde uitspraak over de kinderopvangtoeslag"
+            changed.tekst_modified = timezone.now()
+            changed.save()
+            Uitspraak.objects.order_by("id").last().delete()
+
+            self.assertEqual(build_corpus_pack(tmpdir), 1)
+            with CorpusPack.open(tmpdir) as pack:
+                self.assertEqual(len(pack), Uitspraak.objects.count())
+                self.assert_same_matches(pack, r"(toeslag\w*)")
+
+    def test_token_streams(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            build_corpus_pack(tmpdir, tokens=True)
+
+            changed = Uitspraak.objects.order_by("id").first()
+            changed.tekst = "De Kinderopvang-\ntoeslag en de kinderopvangtoeslag; opnieuw de KINDEROPVANGTOESLAG."
+            changed.tekst_modified = timezone.now()
+            changed.save()
+            self.assertEqual(build_corpus_pack(tmpdir), 1)
+
+            with CorpusPack.open(tmpdir) as pack:
+                expected = {}
+                for position in pack.positions():
+                    tokens = tokenize(pack.text(position))
+                    self.assertEqual([pack.vocabulary.tokens[token_id] for token_id in pack.tokens(position)], tokens)
+
+                    count = sum(1 for i in range(len(tokens) - 1) if tokens[i:i + 2] == ["artikel", "20"])
+                    if count:
+                        expected[pack.ids[position]] = {"Artikel 20": count}
+
+                self.assertEqual(dict(pack.phrase_counts(["Artikel 20", "onbekendewoord"])), expected)
+                self.assertEqual(dict(pack.phrase_counts(["kinderopvangtoeslag"]))[changed.id], {"kinderopvangtoeslag": 3})
+                self.assertEqual(dict(pack.cooccurrences("de", "kinderopvangtoeslag", window=1))[changed.id], 3)
+                self.assertEqual(dict(pack.cooccurrences("de", "kinderopvangtoeslag"))[changed.id], 9)
+
+            # A full rebuild keeps the token streams
+            self.assertEqual(build_corpus_pack(tmpdir, full=True), Uitspraak.objects.count())
+            with CorpusPack.open(tmpdir) as pack:
+                self.assertTrue(pack.has_tokens)
+                self.assertEqual(dict(pack.phrase_counts(["kinderopvangtoeslag"]))[changed.id], {"kinderopvangtoeslag": 3})
+
+            # Without token streams, the pack is rebuilt
+            self.assertEqual(build_corpus_pack(tmpdir, tokens=False), Uitspraak.objects.count())
+            with CorpusPack.open(tmpdir) as pack:
+                self.assertFalse(pack.has_tokens)
+
+
+class NearDuplicateTests(TestCase):
+    """Near-duplicates end up in one cluster, and signatures are only computed for changed texts"""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        create_synthetic_labels()
+        load(small_corpus(30))
+
+    def test_clusters(self) -> None:
+        original, copy = Uitspraak.objects.order_by("id")[:2]
+        # A republished version, with one word changed
+        copy.tekst = original.tekst.replace(" de ", " het ", 1)
+        copy.save()
+
+        self.assertEqual(update_signatures(), Uitspraak.objects.exclude(tekst="").count())
+        result = cluster_signatures()
+        self.assertEqual((result.clusters, result.clustered), (1, 2))
+
+        self.assertEqual(list(near_duplicates(copy)), [original])
+        self.assertEqual(distinct_uitspraken(Uitspraak.objects.all()).count(), Uitspraak.objects.count() - 1)
+
+        # Experiments, and loading the same documents again, save uitspraken without changing their
+        # tekst; these are not even read again
+        instantie_types(refresh=True)
+        with override_settings(CACHES=LOCMEM_CACHES), contextlib.redirect_stdout(io.StringIO()):
+            call_command(*KEYWORD_SEARCH_ARGS, **KEYWORD_SEARCH_OPTIONS)
+        self.assertTrue(Uitspraak.objects.exclude(data={}).exists())
+        load(small_corpus(3)[2:])
+
+        with self.assertLogs("rechtspraak.minhash", "INFO") as logs:
+            self.assertEqual(update_signatures(), 0)
+        self.assertIn("Found 0 uitspraken to compute the signature of", "\n".join(logs.output))
+
+        copy.tekst = "Een geheel andere uitspraak over de kinderopvangtoeslag"
+        copy.tekst_modified = timezone.now()
+        copy.save()
+        self.assertEqual(update_signatures(), 1)
+        self.assertEqual(cluster_signatures().clusters, 0)
+        self.assertEqual(distinct_uitspraken(Uitspraak.objects.all()).count(), Uitspraak.objects.count())
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_filtered_export(self) -> None:
+        instantie_types(refresh=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            call_command(*KEYWORD_SEARCH_ARGS, **KEYWORD_SEARCH_OPTIONS)
+
+        # The first uitspraak of the cluster is of another year than its near-duplicates, and has no matches
+        first, *copies = Uitspraak.objects.filter(experiment_results__experiment_id="test_all").order_by("id")[:3]
+        year = copies[0].uitspraakdatum.year
+        first.uitspraakdatum = first.uitspraakdatum.replace(year=year - 1)
+        first.save()
+        for copy in copies:
+            copy.tekst = first.tekst.replace(" de ", " het ", 1)
+            copy.uitspraakdatum = copy.uitspraakdatum.replace(year=year)
+            copy.save()
+            copy.experiment_results.update(match_count=1)
+        first.experiment_results.update(match_count=0)
+
+        update_signatures()
+        cluster_signatures()
+
+        def exported(*args: str) -> list[str]:
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                call_command("export_csv", "test_all", "-", "--columns", "ecli", "--skip-near-duplicates", *args)
+            return [line.strip("|") for line in output.getvalue().split()[1:]]
+
+        for args in [["--year", str(year)], ["--instantie-type", "Rechtbank", "--only-with-matches"]]:
+            with self.subTest(args=args):
+                ecli = exported(*args)
+                self.assertIn(copies[0].ecli, ecli)
+                self.assertNotIn(copies[1].ecli, ecli)
+
+        # Also when the first uitspraak of the cluster lost its signature
+        first.tekst = ""
+        first.save()
+        update_signatures()
+        ecli = exported()
+        self.assertIn(copies[0].ecli, ecli)
+        self.assertNotIn(copies[1].ecli, ecli)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ExperimentResultTests(TestCase):
+    """Exports find both the uitspraken whose results were indexed and those with older results"""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        create_synthetic_labels()
+        load(small_corpus(30))
+
+    def setUp(self) -> None:
+        instantie_types(refresh=True)
+
+    def legacy_result(self, uitspraak: Uitspraak, experiment_id: str, experiment: str) -> None:
+        """Save a result in the data of an uitspraak as experiments did before ExperimentResult existed"""
+        uitspraak.data = {"experiments": {experiment_id: {"experiment": experiment, "id": experiment_id, "citations": [], "errors": []}}}
+        uitspraak.save()
+
+    def test_export_mixed(self) -> None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            call_command(*KEYWORD_SEARCH_ARGS, **KEYWORD_SEARCH_OPTIONS)
+        indexed = set(ExperimentResult.objects.filter(experiment_id="test_all").values_list("uitspraak_id", flat=True))
+        self.assertTrue(indexed)
+
+        legacy = list(Uitspraak.objects.exclude(id__in=indexed)[:5])
+        for uitspraak in legacy:
+            uitspraak.data = {"experiments": {"test_all": {"experiment": "keyword_search", "id": "test_all", "matches": ["toeslag"]}}}
+            uitspraak.save()
+
+        migration = importlib.import_module("rechtspraak.migrations.0014_backfill_experimentresult")
+        migration.backfill_experiment_results(django_apps, None)
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            call_command("export_csv", "test_all", "-", columns="ecli")
+        exported = set(output.getvalue().split()[1:])
+
+        expected = {f"|{ecli}|" for ecli in Uitspraak.objects.filter(id__in=indexed | {uitspraak.id for uitspraak in legacy}).values_list("ecli", flat=True)}
+        self.assertEqual(exported, expected)
+
+    def test_skipped_results_are_recorded(self) -> None:
+        uitspraken = Uitspraak.objects.filter(instantie__instantie_type="Rechtbank").exclude(tekst="")
+        for uitspraak in uitspraken:
+            self.legacy_result(uitspraak, "citations_all_1", "citations")
+
+        # All uitspraken already have results, which are skipped, but still recorded
+        call_command("experiment_kamerstukcitations", "Rechtbank")
+        self.assertEqual(
+            set(ExperimentResult.objects.filter(experiment_id="citations_all_1").values_list("uitspraak_id", flat=True)),
+            set(uitspraken.values_list("id", flat=True))
+        )
+
+
+class PartitioningTests(TestCase):
+    """Converting the uitspraak table into a partitioned table keeps its unique ECLIs and the foreign keys to it"""
+
+    def test_with_partition_key(self) -> None:
+        self.assertEqual(with_partition_key("UNIQUE (ecli)"), "UNIQUE (ecli, uitspraakdatum)")
+        self.assertEqual(with_partition_key("UNIQUE NULLS NOT DISTINCT (ecli, zaaknummer) INCLUDE (id)"), "UNIQUE NULLS NOT DISTINCT (ecli, zaaknummer, uitspraakdatum) INCLUDE (id)")
+        self.assertEqual(with_partition_key("UNIQUE (uitspraakdatum, ecli)"), "UNIQUE (uitspraakdatum, ecli)")
+
+    def foreign_keys(self, table: str) -> set[tuple[str, str]]:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT conrelid::regclass::text, conname FROM pg_constraint WHERE confrelid = %s::regclass AND contype = 'f'", [table])
+            return set(cursor.fetchall())
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "Partitioning requires PostgreSQL")
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_convert(self) -> None:
+        if is_partitioned():
+            self.skipTest("The uitspraak table is already partitioned")
+
+        create_synthetic_labels()
+        load(small_corpus(30))
+        instantie_types(refresh=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            call_command(*KEYWORD_SEARCH_ARGS, **KEYWORD_SEARCH_OPTIONS)
+
+        foreign_keys = self.foreign_keys(Uitspraak._meta.db_table)
+        self.assertTrue(foreign_keys)
+        count, results = Uitspraak.objects.count(), ExperimentResult.objects.count()
+
+        until_year = datetime.date.today().year + 1
+        convert_to_partitioned(until_year)
+
+        self.assertTrue(is_partitioned())
+        self.assertEqual(self.foreign_keys(KEY_TABLE), foreign_keys)
+        self.assertEqual((Uitspraak.objects.count(), ExperimentResult.objects.count()), (count, results))
+
+        uitspraak = Uitspraak.objects.filter(experiment_results__isnull=False).first()
+        with connection.cursor() as cursor:
+            # ECLIs are unique over all partitions
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                cursor.execute(
+                    f"INSERT INTO {Uitspraak._meta.db_table} (ecli, zaaknummer, publicatiedatum, uitspraakdatum, raw_xml, raw_xml_hash, data, "
+                    "inhoudsindicatie, tekst, uitspraak_type, instantie_id, last_modified, trigram_indexed) "
+                    f"SELECT ecli, zaaknummer, publicatiedatum, '1999-01-01', raw_xml, raw_xml_hash, data, inhoudsindicatie, tekst, uitspraak_type, "
+                    f"instantie_id, last_modified, trigram_indexed FROM {Uitspraak._meta.db_table} WHERE id = %s",
+                    [uitspraak.id]
+                )
+
+            # Uitspraken with experiment results cannot be deleted without them
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                cursor.execute(f"DELETE FROM {Uitspraak._meta.db_table} WHERE id = %s", [uitspraak.id])
+                cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+        # Moving an uitspraak to the default partition, and from there to a new partition, keeps its key
+        uitspraak.uitspraakdatum = datetime.date(until_year + 2, 5, 1)
+        uitspraak.save()
+        self.assertEqual(create_partitions(until_year + 2), [until_year + 1, until_year + 2])
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT ecli FROM {partition_name(until_year + 2)} WHERE id = %s", [uitspraak.id])
+            self.assertEqual(cursor.fetchall(), [(uitspraak.ecli,)])
+            cursor.execute(f"SELECT ecli FROM {KEY_TABLE} WHERE id = %s", [uitspraak.id])
+            self.assertEqual(cursor.fetchall(), [(uitspraak.ecli,)])
+
+        # Deleting an uitspraak with Django deletes its related rows and key
+        uitspraak.delete()
+        with connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+            cursor.execute(f"SELECT COUNT(*) FROM {KEY_TABLE}")
+            self.assertEqual(cursor.fetchone()[0], count - 1)
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "Partitioning requires PostgreSQL")
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_move_between_partitions(self) -> None:
+        create_synthetic_labels()
+        load(small_corpus(30))
+        instantie_types(refresh=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            call_command(*KEYWORD_SEARCH_ARGS, **KEYWORD_SEARCH_OPTIONS)
+
+        if not is_partitioned():
+            convert_to_partitioned(datetime.date.today().year + 1)
+        create_partitions(2021, from_year=2020)
+
+        uitspraak = Uitspraak.objects.filter(experiment_results__isnull=False).first()
+        results = uitspraak.experiment_results.count()
+        ecli = uitspraak.ecli.replace(":2020:", ":2021:")
+
+        # An update that moves an uitspraak from the 2020 to the 2021 partition, and changes its ECLI
+        Uitspraak.objects.filter(id=uitspraak.id).update(uitspraakdatum=datetime.date(2021, 3, 1), ecli=ecli)
+
+        with connection.cursor() as cursor:
+            # The experiment results still refer to an existing key
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+            cursor.execute(f"SELECT ecli FROM {partition_name(2021)} WHERE id = %s", [uitspraak.id])
+            self.assertEqual(cursor.fetchall(), [(ecli,)])
+            cursor.execute(f"SELECT ecli FROM {KEY_TABLE} WHERE id = %s", [uitspraak.id])
+            self.assertEqual(cursor.fetchall(), [(ecli,)])
+            cursor.execute(f"SELECT COUNT(*) FROM {KEY_TABLE}")
+            self.assertEqual(cursor.fetchone()[0], Uitspraak.objects.count())
+
+        self.assertEqual(uitspraak.experiment_results.count(), results)
+
+
+class TrigramTests(TestCase):
+    """Scanning only the candidates of the trigram index finds the same matches as scanning all uitspraken"""
+
+    VARIANTS = [
+        "De huurtoeslagen en de zorgtoeslag zijn geen kinderopvangtoeslag.",
+        "Zie art. 20 Gw en artikel 10 Grondwet over de KINDEROPVANG-TOESLAG.",
+        "Op grond van artikel 20 Grondwet en de Kinderopvangtoeslag.",
+        "Een uitspraak zonder enig trefwoord.",
+    ]
+
+    PATTERNS = {
+        "alternation": re.compile(r"(huur|zorg)toeslag"),
+        "class": re.compile(r"artikel [12]0 (?:Gw|Grondwet)"),
+        "class repeated": re.compile(r"toeslag[a-z]+"),
+        "optional group": re.compile(r"art(\.|ikel)? 20 (gw|grondwet)", re.IGNORECASE),
+        "optional": re.compile(r"kinderopvang-?toeslag"),
+        "case insensitive": re.compile(r"kinderopvang-?toeslag", re.IGNORECASE),
+        "inline flag": re.compile(r"(?i)ARTIKEL 20 grondwet"),
+    }
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        create_synthetic_labels()
+        load(small_corpus(20))
+
+        for uitspraak, variant in zip(Uitspraak.objects.order_by("id"), cls.VARIANTS):
+            uitspraak.tekst = f"{uitspraak.tekst}\n{variant}"
+            uitspraak.save()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            call_command("build_trigram_index")
+
+        # Changed after the index was built, so it can only be found by scanning
+        Uitspraak.objects.filter(id=Uitspraak.objects.order_by("id").last().id).update(tekst="De zorgtoeslag van artikel 20 Grondwet", trigram_indexed=False)
+
+    def test_candidates(self) -> None:
+        uitspraken = Uitspraak.objects.order_by("id")
+        for name, pattern in self.PATTERNS.items():
+            with self.subTest(name):
+                expected = {uitspraak.id: pattern.findall(uitspraak.tekst) for uitspraak in uitspraken}
+
+                candidates = regexp_candidates(pattern)
+                self.assertIsNotNone(candidates)
+                self.assertLess(len(candidates), uitspraken.count())
+
+                # The tekst is loaded with one query for all candidates
+                with self.assertNumQueries(2):
+                    found = {
+                        uitspraak.id: pattern.findall(tekst) if tekst is not None else []
+                        for uitspraak, tekst in with_candidate_tekst(uitspraken, candidates)
+                    }
+
+                self.assertEqual(found, expected)
+                self.assertTrue(any(expected.values()))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CacheTests(TestCase):
+    """Cached results and responses are computed again once a command has changed the data"""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        create_synthetic_labels()
+
+    def setUp(self) -> None:
+        instantie_types(refresh=True)
+        self.computed = 0
+
+    def compute(self) -> int:
+        self.computed += 1
+        return self.computed
+
+    def test_cached(self) -> None:
+        self.assertEqual(cached("test", [("b", 2), ("a", 1)], self.compute), 1)
+        self.assertEqual(cached("test", [("a", 1), ("b", 2)], self.compute), 1)
+        self.assertEqual(cached("test", [("a", 2)], self.compute), 2)
+
+        # Creating uitspraken does not invalidate by itself, only the command that creates them once it is done
+        version = data_version()
+        documents = small_corpus(3)
+        load(documents[:2])
+        self.assertEqual(data_version(), version)
+        self.assertEqual(cached("test", [("a", 1), ("b", 2)], self.compute), 1)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ecli, xml = documents[2]
+            path = os.path.join(tmpdir, f"{ecli.replace(':', '_')}.xml")
+            with open(path, "wt", encoding="utf-8") as xmlfile:
+                xmlfile.write(xml)
+            call_command("create_uitspraak_from_xml", path)
+
+        self.assertEqual(data_version(), version + 1)
+        self.assertEqual(cached("test", [("a", 1), ("b", 2)], self.compute), 3)
+
+    def test_cache_response(self) -> None:
+        @cache_response("test")
+        def view(request: HttpRequest) -> HttpResponse:
+            return HttpResponse(str(self.compute()), status=200 if request.GET.get("status") != "error" else 500)
+
+        factory = RequestFactory()
+        self.assertEqual(view(factory.get("/test/", {"a": "1"})).content, b"1")
+        self.assertEqual(view(factory.get("/test/", {"a": "1"})).content, b"1")
+        self.assertEqual(view(factory.get("/test/", {"a": "2"})).content, b"2")
+        self.assertEqual(view(factory.post("/test/", {"a": "1"})).content, b"3")
+        # Errors are not cached
+        self.assertEqual(view(factory.get("/test/", {"status": "error"})).content, b"4")
+        self.assertEqual(view(factory.get("/test/", {"status": "error"})).content, b"5")
+
+        load(small_corpus(10))
+        with contextlib.redirect_stdout(io.StringIO()):
+            call_command(*KEYWORD_SEARCH_ARGS, **KEYWORD_SEARCH_OPTIONS)
+        self.assertEqual(view(factory.get("/test/", {"a": "1"})).content, b"6")
+        self.assertEqual(view(factory.get("/test/", {"a": "1"})).content, b"6")
+
+
+class MemoTests(TestCase):
+    """A memoized text function runs once per text and version"""
+
+    def test_memoized(self) -> None:
+        calls: list[str] = []
+
+        def words(text: str) -> list[str]:
+            calls.append(text)
+            if not text:
+                raise ValueError("No text")
+            return text.split()
+
+        first = MemoizedTextFunction("test.words", words, "1")
+        self.assertEqual(first("een twee"), ["een", "twee"])
+        self.assertEqual(first("een twee"), ["een", "twee"])
+        self.assertEqual(first("drie"), ["drie"])
+        self.assertEqual(calls, ["een twee", "drie"])
+        self.assertTrue(TextAnalysisMemo.objects.filter(function="test.words", text_hash=text_hash("drie")).exists())
+
+        # Exceptions are not memoized
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                first("")
+        self.assertEqual(calls.count(""), 2)
+
+        # Another version does not see the results of the first, and its version is determined once
+        versions: list[str] = []
+        second = MemoizedTextFunction("test.words", words, lambda: versions.append("2") or "2")
+        self.assertEqual(second("een twee"), ["een", "twee"])
+        self.assertEqual(second("een twee"), ["een", "twee"])
+        self.assertEqual(calls[-1:], ["een twee"])
+        self.assertEqual(versions, ["2"])
+
+        self.assertEqual(first.forget(), 3)
+        first("drie")
+        self.assertEqual(calls.count("drie"), 2)
+
+    def test_registry(self) -> None:
+        self.assertIn("nllegalcit.parse_citations", registry)
+        with self.assertRaises(ValueError):
+            memoize("nllegalcit.parse_citations", "1")(str)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CountsTests(TestCase):
+    """The counts kept up to date incrementally equal the counts computed from scratch"""
+
+    def counts(self) -> list[list[tuple]]:
+        # Counts that dropped to zero are kept by update_counts, but not created by refresh_counts
+        return [
+            sorted(tuple(sorted((name, value) for name, value in row.items() if name != "id")) for row in model.objects.filter(total__gt=0).values())
+            for model in [UitspraakCounts, RechtsgebiedCounts]
+        ]
+
+    def test_incremental(self) -> None:
+        create_synthetic_labels()
+        instantie_types(refresh=True)
+
+        documents = list(generate_corpus(40, CorpusConfig(seed=3, median_paragraphs=3, first_year=2018, last_year=2021)))
+        load(documents)
+        # New versions of existing uitspraken, with an extra rechtsgebied
+        load([(ecli, republished(xml)) for ecli, xml in documents[:10]])
+        # Uitspraken that get data
+        with contextlib.redirect_stdout(io.StringIO()):
+            call_command(*KEYWORD_SEARCH_ARGS, **KEYWORD_SEARCH_OPTIONS)
+        self.assertTrue(Uitspraak.objects.exclude(data={}).exists())
+
+        # Uitspraken that lose their tekst or move to another year
+        for uitspraak in Uitspraak.objects.order_by("id")[10:16]:
+            before = uitspraak_contribution(uitspraak)
+            if uitspraak.id % 2:
+                uitspraak.tekst = ""
+            else:
+                uitspraak.uitspraakdatum = uitspraak.uitspraakdatum.replace(year=2022)
+            uitspraak.save()
+            update_counts(before, uitspraak_contribution(uitspraak))
+
+        # Deletions only update the counts if update_counts is called for them
+        for uitspraak in Uitspraak.objects.order_by("id")[20:25]:
+            update_counts(uitspraak_contribution(uitspraak), None)
+            uitspraak.delete()
+
+        incremental = self.counts()
+        self.assertTrue(all(incremental))
+
+        refresh_counts()
+        self.assertEqual(self.counts(), incremental)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AdminTests(TestCase):
+    """The changelist of uitspraken estimates large counts, caps filtered counts, and searches exactly"""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        create_synthetic_labels()
+        instantie_types(refresh=True)
+        load(small_corpus(20))
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "admin")
+
+    def setUp(self) -> None:
+        self.client.force_login(self.user)
+
+    def changelist(self, **params: str) -> list[str]:
+        response = self.client.get("/admin/rechtspraak/uitspraak/", params)
+        self.assertEqual(response.status_code, 200)
+        return [uitspraak.ecli for uitspraak in response.context["cl"].result_list]
+
+    def test_estimated_count(self) -> None:
+        uitspraken = Uitspraak.objects.all()
+        # Without statistics, the largest id is an upper bound
+        self.assertGreaterEqual(estimated_count(uitspraken), uitspraken.count())
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        self.assertEqual(estimated_count(uitspraken), uitspraken.count())
+
+    def test_count(self) -> None:
+        uitspraken = Uitspraak.objects.order_by("id")
+        filtered = uitspraken.filter(uitspraak_type=Uitspraak.UitspraakType.UITSPRAAK)
+        self.assertGreater(filtered.count(), 6)
+
+        with mock.patch("rechtspraak.admin.EXACT_COUNT_LIMIT", 5):
+            # Unfiltered lists are estimated once they are larger than the limit
+            with mock.patch("rechtspraak.admin.estimated_count", return_value=1000):
+                self.assertEqual(EstimatedCountPaginator(uitspraken, 2).count, 1000)
+
+            # Filtered lists are counted up to the limit, and exactly from the page that reaches it
+            self.assertEqual(EstimatedCountPaginator(filtered, 2).count, 5)
+            self.assertEqual(EstimatedCountPaginator(filtered, 2, requested_page=2).count, 5)
+            self.assertEqual(EstimatedCountPaginator(filtered, 2, requested_page=3).count, filtered.count())
+
+            # Through the changelist, every page of a filtered list can be reached
+            with mock.patch.object(UitspraakAdmin, "list_per_page", 2):
+                last_page = math.ceil(filtered.count() / 2)
+                self.assertEqual(
+                    self.changelist(uitspraak_type__exact="Uitspraak", p=str(last_page)),
+                    list(filtered.order_by("-pk").values_list("ecli", flat=True)[(last_page - 1) * 2:])
+                )
+
+    def test_search(self) -> None:
+        uitspraak = Uitspraak.objects.order_by("id")[3]
+        self.assertEqual(self.changelist(q=f"  {uitspraak.ecli.lower()} "), [uitspraak.ecli])
+        self.assertEqual(
+            self.changelist(q=uitspraak.zaaknummer),
+            list(Uitspraak.objects.filter(zaaknummer=uitspraak.zaaknummer).order_by("-pk").values_list("ecli", flat=True))
+        )
+        # Only exact matches
+        self.assertEqual(self.changelist(q=uitspraak.ecli[:-1]), [])
+        self.assertEqual(len(self.changelist(q="")), Uitspraak.objects.count())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ApiTests(TestCase):
+    """Paging through the JSON API visits every uitspraak once, and conditional requests get 304 Not Modified"""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        create_synthetic_labels()
+        instantie_types(refresh=True)
+        load(small_corpus(20))
+
+        # Uitspraken on the same day are ordered by id, also across pages
+        cls.same_day = list(Uitspraak.objects.order_by("id").values_list("id", flat=True)[:8])
+        Uitspraak.objects.filter(id__in=cls.same_day).update(uitspraakdatum=datetime.date(2020, 6, 1))
+
+    def pages(self, **params: str) -> list[list[str]]:
+        pages = []
+        url = "/api/uitspraken/"
+        while url is not None:
+            response = self.client.get(url, params if not pages else None)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            pages.append([result["ecli"] for result in data["results"]])
+            url = data["next"]
+        return pages
+
+    def test_cursor(self) -> None:
+        uitspraak = Uitspraak.objects.get(id=self.same_day[3])
+        self.assertEqual(decode_cursor(encode_cursor(uitspraak)), (uitspraak.uitspraakdatum, uitspraak.id))
+
+        expected = list(Uitspraak.objects.order_by("uitspraakdatum", "id").values_list("ecli", flat=True))
+        for limit in ["1", "3", "7", "100"]:
+            with self.subTest(limit=limit):
+                pages = self.pages(limit=limit, fields="ecli")
+                self.assertEqual([ecli for page in pages for ecli in page], expected)
+                self.assertTrue(all(len(page) == int(limit) for page in pages[:-1]))
+
+        self.assertEqual(self.client.get("/api/uitspraken/", {"cursor": "not a cursor"}).status_code, 400)
+
+    def test_not_modified(self) -> None:
+        response = self.client.get("/api/uitspraken/", {"limit": "5"})
+        etag = response["ETag"]
+        self.assertFalse(response.has_header("Last-Modified"))
+        self.assertEqual(self.client.get("/api/uitspraken/", {"limit": "5"}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # A change to an uitspraak on the page changes its ETag
+        first = Uitspraak.objects.get(ecli=response.json()["results"][0]["ecli"])
+        Uitspraak.objects.filter(id=first.id).update(zaaknummer=f"{first.zaaknummer}-herzien")
+        bump_data_version()
+
+        response = self.client.get("/api/uitspraken/", {"limit": "5"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+        detail = self.client.get(f"/api/uitspraken/{first.ecli}/")
+        self.assertEqual(self.client.get(f"/api/uitspraken/{first.ecli}/", HTTP_IF_MODIFIED_SINCE=detail["Last-Modified"]).status_code, 304)
+
+    async def stream(self, path: str, **params: str) -> tuple[HttpResponse, str]:
+        response = await self.async_client.get(path, params)
+        if not response.streaming:
+            return response, response.content.decode("utf-8")
+        return response, b"".join([chunk async for chunk in response.streaming_content]).decode("utf-8")
+
+    async def test_stream(self) -> None:
+        expected = [ecli async for ecli in Uitspraak.objects.order_by("id").values_list("ecli", flat=True)]
+
+        response, content = await self.stream("/api/uitspraken.ndjson")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson; charset=utf-8")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="uitspraken.ndjson"')
+        records = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([record["ecli"] for record in records], expected)
+        self.assertEqual(list(records[0]), DEFAULT_LIST_FIELDS)
+
+        # The same rows as CSV, with a header and lists joined with "; "
+        response, content = await self.stream("/api/uitspraken.csv")
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0], DEFAULT_LIST_FIELDS)
+        self.assertEqual(len(rows), len(records) + 1)
+        column = DEFAULT_LIST_FIELDS.index("rechtsgebieden")
+        self.assertTrue(any(len(record["rechtsgebieden"]) > 1 for record in records))
+        for row, record in zip(rows[1:], records):
+            self.assertEqual(row[0], record["ecli"])
+            self.assertEqual(row[column], "; ".join(record["rechtsgebieden"]))
+
+        # Only the requested fields, of the uitspraken matching the filters
+        instantie_type = await Uitspraak.objects.values_list("instantie__instantie_type", flat=True).afirst()
+        matching = [
+            ecli async for ecli in Uitspraak.objects.filter(instantie__instantie_type=instantie_type, uitspraakdatum__gte=datetime.date(2020, 6, 1))
+            .order_by("id").values_list("ecli", flat=True)
+        ]
+        self.assertTrue(0 < len(matching) < len(expected))
+        _response, content = await self.stream(
+            "/api/uitspraken.csv", fields="uitspraakdatum,procedure_soorten", instantie_type=instantie_type, uitspraakdatum_from="2020-06-01"
+        )
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0], ["ecli", "uitspraakdatum", "procedure_soorten"])
+        self.assertEqual([row[0] for row in rows[1:]], matching)
+        self.assertTrue(all(row[1] >= "2020-06-01" for row in rows[1:]))
+
+        self.assertEqual((await self.stream("/api/uitspraken.xml"))[0].status_code, 404)
+        for params in [{"uitspraakdatum_from": "1 juni 2020"}, {"fields": "onbekend"}, {"uitspraak_type": "Vonnis"}]:
+            response, content = await self.stream("/api/uitspraken.ndjson", **params)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("error", json.loads(content))
+
+    @override_settings(API_MAX_BATCH_SIZE=3)
+    def test_batch(self) -> None:
+        def batch(eclis: list[str]) -> HttpResponse:
+            return self.client.post("/api/uitspraken/batch/?fields=ecli,uitspraakdatum", {"eclis": eclis}, content_type="application/json")
+
+        first, second = Uitspraak.objects.order_by("-id").values_list("ecli", flat=True)[:2]
+        response = batch([first, "ECLI:NL:XX:2020:1", second])
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(b"".join(response.streaming_content))
+        self.assertEqual([result["ecli"] for result in data["results"]], [first, second])
+        self.assertEqual(data["missing"], ["ECLI:NL:XX:2020:1"])
+
+        self.assertEqual(batch([first, second, first, second]).status_code, 400)
+        self.assertEqual(self.client.post("/api/uitspraken/batch/", "[]", content_type="application/json").status_code, 400)
+
+
+class CitationTests(TestCase):
+    """Citations found by nllegalcit are stored per experiment, with the dossiernummer in one form"""
+
+    KAMERSTUK = {
+        "kamer": "II", "vergaderjaar": "2019-2020", "dossiernummer": "35300-VII", "ondernummer": "2", "paginaverwijzing": None,
+        "rijksdossiernummer": None, "matched_text": "Kamerstukken II 2019/20, 35 300-VII, nr. 2"
+    }
+    HANDELING = {
+        "kamer": "II", "vergaderjaar": "2019-2020", "vergaderingnummer": 5, "itemnummer": 3, "paginaverwijzing": None,
+        "matched_text": "Handelingen II 2019/20, nr. 5, item 3"
+    }
+    ECLI = {"country": "NL", "court": "HR", "year": 2019, "casenumber": "123", "matched_text": "ECLI:NL:HR:2019:123"}
+    LJN = {"code": "BA1234", "matched_text": "LJN BA1234"}
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        create_synthetic_labels()
+        load(small_corpus(2))
+
+    def test_citation_type(self) -> None:
+        self.assertEqual(citation_type(self.KAMERSTUK), Citation.CitationType.KAMERSTUK)
+        self.assertEqual(citation_type(self.HANDELING), Citation.CitationType.HANDELING)
+        self.assertEqual(citation_type(self.ECLI), Citation.CitationType.ECLI)
+        self.assertEqual(citation_type(self.LJN), Citation.CitationType.LJN)
+        self.assertEqual(citation_type({"matched_text": "artikel 6:162 BW"}), Citation.CitationType.OTHER)
+
+    def test_store_citations(self) -> None:
+        uitspraak, other = Uitspraak.objects.order_by("id")
+        store_citations(uitspraak, "a", [self.KAMERSTUK, self.ECLI, self.LJN])
+        store_citations(uitspraak, "b", [self.HANDELING])
+        store_citations(other, "a", [{**self.KAMERSTUK, "dossiernummer": "35 300 vii", "ondernummer": "3"}])
+
+        self.assertEqual(Citation.objects.get(uitspraak=uitspraak, citation_type=Citation.CitationType.ECLI).ecli, "ECLI:NL:HR:2019:123")
+        self.assertEqual(Citation.objects.get(citation_type=Citation.CitationType.LJN).ljn, "BA1234")
+        self.assertEqual(Citation.objects.get(uitspraak=other).dossiernummer, "35300-VII")
+
+        # However the dossiernummer is written
+        for dossiernummer in ["35300-VII", "35 300 VII", "35.300 - vii", "35300VII"]:
+            with self.subTest(dossiernummer):
+                self.assertEqual(set(uitspraken_citing_kamerstuk(dossiernummer)), {uitspraak, other})
+        self.assertEqual(list(uitspraken_citing_kamerstuk("35 300-VII", "3")), [other])
+        self.assertFalse(uitspraken_citing_kamerstuk("35 300"))
+
+        # Storing again replaces the citations of the experiment, and only those
+        store_citations(uitspraak, "a", [self.ECLI])
+        self.assertEqual(
+            sorted(Citation.objects.filter(uitspraak=uitspraak).values_list("experiment_id", "citation_type")),
+            [("a", Citation.CitationType.ECLI), ("b", Citation.CitationType.HANDELING)]
+        )
+        self.assertEqual(list(uitspraken_citing_kamerstuk("35300-VII")), [other])
+
+    def test_export_without_results(self) -> None:
+        for command in ["experiment_kamerstukcitations_export", "experiment_sociale_grondrechten_export"]:
+            with self.subTest(command=command):
+                output = io.StringIO()
+                with tempfile.TemporaryDirectory() as tmpdir, contextlib.chdir(tmpdir):
+                    call_command(command, stdout=output)
+                    [export] = Path(tmpdir).glob("results_*.json")
+                    self.assertEqual(json.loads(export.read_text(encoding="utf-8")), [])
+                self.assertTrue(output.getvalue().startswith("0 0 0\n"))
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "Bulk loading requires PostgreSQL")
+@override_settings(CACHES=LOCMEM_CACHES)
+class BulkLoadTests(TransactionTestCase):
+    """Bulk loading gives the same uitspraken, labels and counts as creating the uitspraken one by one"""
+
+    def snapshot(self) -> tuple:
+        rows = {
+            uitspraak.ecli: (
+                uitspraak.instantie.naam, uitspraak.zaaknummer, uitspraak.publicatiedatum, uitspraak.uitspraakdatum, uitspraak.uitspraak_type,
+                uitspraak.inhoudsindicatie, uitspraak.tekst, uitspraak.raw_xml, uitspraak.raw_xml_hash, uitspraak.data, uitspraak.trigram_indexed,
+                sorted(uitspraak.rechtsgebieden.values_list("identifier", flat=True)),
+                sorted(uitspraak.procedure_soorten.values_list("identifier", flat=True))
+            )
+            for uitspraak in Uitspraak.objects.select_related("instantie")
+        }
+        counts = [
+            sorted(tuple(sorted((name, value) for name, value in row.items() if name != "id")) for row in model.objects.values())
+            for model in [UitspraakCounts, RechtsgebiedCounts]
+        ]
+        return rows, counts
+
+    def reset(self) -> None:
+        Uitspraak.objects.all().delete()
+        UitspraakCounts.objects.all().delete()
+        RechtsgebiedCounts.objects.all().delete()
+
+    def test_same_as_create(self) -> None:
+        create_synthetic_labels()
+
+        documents = small_corpus(30)
+        # Republished versions of some uitspraken, and a second copy of one, later in the same batch
+        documents += [(ecli, republished(xml)) for ecli, xml in documents[:5]] + documents[5:6]
+
+        for ecli, xml in documents:
+            create_uitspraak_from_xmlstring(xml, ecli)
+        expected = self.snapshot()
+        self.assertEqual(len(expected[0]), 30)
+
+        for batch_size in [1000, 7]:
+            with self.subTest(batch_size=batch_size):
+                self.reset()
+                bulk_load((parse_uitspraak_xml(xml, ecli) for ecli, xml in documents), batch_size)
+                self.assertEqual(self.snapshot(), expected)
@@ -0,0 +1,94 @@
+"""
+    rechtspraak/tokenstreams.py
+
+    Normalisation of the tekst of uitspraken into tokens, and the vocabulary that maps tokens to
+    ids, for the token streams of the corpus pack (see rechtspraak/corpuspack.py).
+
+    Texts are normalised before they are split into tokens: soft hyphens are removed, words that
+    are hyphenated at the end of a line are joined, other dashes between words become hyphens,
+    and the text is case folded. A token is a word, or words joined by hyphens, such as
+    "sociaal-economisch". Whitespace and punctuation only separate tokens. Phrases that are
+    searched for are normalised in the same way.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import array
+import os
+import re
+
+from pathlib import Path
+from typing import Iterable, Optional
+
+SOFT_HYPHEN = "\u00ad"
+
+# A word broken off with a hyphen at the end of a line, e.g. "kinder-\nopvang"
+LINE_HYPHENATION = re.compile(r"(\w)-[ \t]*\r?\n\s*(\w)")
+
+# Hyphens, non-breaking hyphens, figure dashes and en dashes between words
+DASHES = re.compile(r"(?<=\w)[\u2010\u2011\u2012\u2013](?=\w)")
+
+TOKEN = re.compile(r"\w+(?:-\w+)*")
+
+
+def normalize(text: str) -> str:
+    """Normalise the hyphenation and case of a text"""
+    text = text.replace(SOFT_HYPHEN, "")
+    text = LINE_HYPHENATION.sub(r"\1\2", text)
+    text = DASHES.sub("-", text)
+    return text.casefold()
+
+
+def tokenize(text: str) -> list[str]:
+    """The tokens of a text, after normalising it"""
+    return TOKEN.findall(normalize(text))
+
+
+class Vocabulary:
+    """The ids of tokens: the position of their first appearance, stored one token per line"""
+
+    def __init__(self, tokens: Optional[list[str]] = None) -> None:
+        self.tokens = tokens if tokens is not None else []
+        self.ids = {token: token_id for token_id, token in enumerate(self.tokens)}
+        # Tokens added since the vocabulary was loaded or last saved
+        self.added: list[str] = []
+
+    @classmethod
+    def load(cls, path: Path) -> "Vocabulary":
+        if not path.exists():
+            return cls()
+        return cls(path.read_text(encoding="utf-8").split("\n")[:-1])
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def encode(self, tokens: Iterable[str], add: bool = False) -> Optional[array.array]:
+        """The ids of tokens; new tokens are added if add is given, otherwise returns None if there is one"""
+        ids = array.array("I")
+
+        for token in tokens:
+            token_id = self.ids.get(token)
+            if token_id is None:
+                if not add:
+                    return None
+                token_id = len(self.tokens)
+                self.tokens.append(token)
+                self.ids[token] = token_id
+                self.added.append(token)
+            ids.append(token_id)
+
+        return ids
+
+    def save_added(self, path: Path) -> int:
+        """Append the added tokens to the file at path; returns the size of the file"""
+        with path.open("ab") as vocabulary_file:
+            vocabulary_file.write("".join(f"{token}\n" for token in self.added).encode("utf-8"))
+            vocabulary_file.flush()
+            size = os.fstat(vocabulary_file.fileno()).st_size
+
+        self.added = []
+        return size
@@ -0,0 +1,529 @@
+"""
+    rechtspraak/trigrams.py
+
+    A trigram index over the tekst of uitspraken, and a regex query planner that uses it to narrow
+    down regex experiments to candidate uitspraken.
+
+    The approach follows Russ Cox, "Regular Expression Matching with a Trigram Index or How Google
+    Code Search Worked" (https://swtch.com/~rsc/regexp/regexp4.html): every regex is translated into
+    a boolean query over trigrams which every matching text must satisfy. Only uitspraken whose
+    trigrams satisfy the query are scanned with the real regex. Patterns that do not require any
+    trigram (e.g. `\\d+`) cannot be indexed and fall back to a full scan.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+from __future__ import annotations
+
+import array
+import itertools
+import logging
+import re
+import zlib
+
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Optional
+
+try:
+    import re._parser as sre_parse  # type: ignore[import-not-found]
+    import re._constants as sre_constants  # type: ignore[import-not-found]
+except ImportError:  # Python < 3.11
+    import sre_parse  # type: ignore[no-redef]
+    import sre_constants  # type: ignore[no-redef]
+
+from django.db.models import QuerySet
+
+from rechtspraak.models import TrigramPosting, Uitspraak
+
+logger = logging.getLogger(__name__)
+
+# Both the indexed text and the strings in a query are folded with this table. It maps every
+# character that Python's re module considers equal to an ASCII letter under re.IGNORECASE onto
+# that letter, so case insensitive patterns can use the index as well. The folding is done per
+# character, so a literal that occurs in a text always occurs in the folded text as well.
+FOLD_TABLE = {ord(c): c.lower() for c in "ABCDEFGHIJKLMNOPQRSTUVWXYZ"}
+FOLD_TABLE.update({0x130: "i", 0x131: "i", 0x17f: "s", 0x212a: "k"})
+
+# Above this number of strings an exact, prefix or suffix set is collapsed into trigram queries.
+MAX_SET_SIZE = 16
+
+# Character classes with more members than this are treated as "any character".
+MAX_CLASS_SIZE = 8
+
+
+def fold(text: str) -> str:
+    """Fold the case of a text in the same way as the trigram index does"""
+    return text.translate(FOLD_TABLE)
+
+
+def extract_trigrams(text: str) -> set[str]:
+    """Return the set of all (folded) trigrams in a text"""
+    folded = fold(text)
+    return {folded[i:i + 3] for i in range(len(folded) - 2)}
+
+
+def encode_postings(ids: Iterable[int]) -> bytes:
+    """Encode a posting list (uitspraak ids) for storage in a TrigramPosting"""
+    return zlib.compress(array.array("q", sorted(ids)).tobytes())
+
+
+def decode_postings(data: bytes) -> array.array:
+    """Decode a posting list as stored in a TrigramPosting"""
+    postings = array.array("q")
+    postings.frombytes(zlib.decompress(data))
+    return postings
+
+
+# Trigram queries
+
+@dataclass(frozen=True)
+class TrigramQuery:
+    """A boolean query over trigrams
+
+    op is one of "all" (matches every text), "none" (matches no text), "and" or "or". For "and"
+    queries, trigrams lists the trigrams that must all be present and subqueries the queries
+    that must all hold; for "or" queries, it suffices for one of them to hold.
+    """
+
+    op: str
+    trigrams: frozenset[str] = frozenset()
+    subqueries: tuple[TrigramQuery, ...] = ()
+
+    def __str__(self) -> str:
+        if self.op in ("all", "none"):
+            return f"+{self.op}"
+        parts = sorted(repr(t) for t in self.trigrams) + [f"({q})" for q in self.subqueries]
+        return f" {self.op.upper()} ".join(parts)
+
+
+ALL = TrigramQuery("all")
+NONE = TrigramQuery("none")
+
+
+def query_and(*queries: TrigramQuery) -> TrigramQuery:
+    """Combine queries so that all of them must hold"""
+    trigrams: set[str] = set()
+    subqueries: list[TrigramQuery] = []
+
+    for query in queries:
+        if query.op == "none":
+            return NONE
+        if query.op == "all":
+            continue
+        if query.op == "and":
+            trigrams.update(query.trigrams)
+            subqueries.extend(q for q in query.subqueries if q not in subqueries)
+        elif len(query.trigrams) == 1 and not query.subqueries:
+            trigrams.update(query.trigrams)
+        elif query not in subqueries:
+            subqueries.append(query)
+
+    if not trigrams and not subqueries:
+        return ALL
+    if not trigrams and len(subqueries) == 1:
+        return subqueries[0]
+    return TrigramQuery("and", frozenset(trigrams), tuple(subqueries))
+
+
+def query_or(*queries: TrigramQuery) -> TrigramQuery:
+    """Combine queries so that at least one of them must hold"""
+    trigrams: set[str] = set()
+    subqueries: list[TrigramQuery] = []
+
+    for query in queries:
+        if query.op == "all":
+            return ALL
+        if query.op == "none":
+            continue
+        if query.op == "or":
+            trigrams.update(query.trigrams)
+            subqueries.extend(q for q in query.subqueries if q not in subqueries)
+        elif len(query.trigrams) == 1 and not query.subqueries:
+            trigrams.update(query.trigrams)
+        elif query not in subqueries:
+            subqueries.append(query)
+
+    if not trigrams and not subqueries:
+        return NONE
+    if not trigrams and len(subqueries) == 1:
+        return subqueries[0]
+    return TrigramQuery("or", frozenset(trigrams), tuple(subqueries))
+
+
+def query_for_strings(strings: Iterable[str]) -> TrigramQuery:
+    """A query which holds for texts that contain at least one of the given strings"""
+    alternatives = []
+
+    for string in strings:
+        if len(string) < 3:
+            # A string shorter than three characters does not contain a trigram
+            return ALL
+        alternatives.append(TrigramQuery(
+            "and",
+            frozenset(string[i:i + 3] for i in range(len(string) - 2))
+        ))
+
+    return query_or(*alternatives)
+
+
+# Regex analysis
+
+@dataclass
+class RegexInfo:
+    """What is known about the strings matched by a (sub)regex
+
+    emptyable -- whether the empty string may be matched
+    exact -- the set of all strings matched, if that is known and small; otherwise None
+    prefix -- if exact is None: every match starts with one of these strings
+    suffix -- if exact is None: every match ends with one of these strings
+    match -- a query which holds for every text that contains a match
+    """
+
+    emptyable: bool
+    exact: Optional[set[str]]
+    prefix: set[str] = field(default_factory=set)
+    suffix: set[str] = field(default_factory=set)
+    match: TrigramQuery = ALL
+
+
+def _any_string() -> RegexInfo:
+    return RegexInfo(emptyable=True, exact=None, prefix={""}, suffix={""})
+
+
+def _any_char() -> RegexInfo:
+    return RegexInfo(emptyable=False, exact=None, prefix={""}, suffix={""})
+
+
+def _empty_string() -> RegexInfo:
+    return RegexInfo(emptyable=True, exact={""})
+
+
+def _cross(left: set[str], right: set[str]) -> set[str]:
+    return {a + b for a, b in itertools.product(left, right)}
+
+
+def _simplify(info: RegexInfo, force: bool = False) -> RegexInfo:
+    """Keep the sets in info small, moving the information they hold into the match query"""
+    if info.exact is not None and (force or len(info.exact) > MAX_SET_SIZE):
+        info = RegexInfo(
+            emptyable=info.emptyable,
+            exact=None,
+            prefix=set(info.exact),
+            suffix=set(info.exact),
+            match=query_and(info.match, query_for_strings(info.exact))
+        )
+
+    if info.exact is None:
+        if len(info.prefix) > MAX_SET_SIZE or any(len(p) > 2 for p in info.prefix):
+            info.match = query_and(info.match, query_for_strings(info.prefix))
+            info.prefix = {p[:2] for p in info.prefix}
+            if len(info.prefix) > MAX_SET_SIZE:
+                info.prefix = {p[:1] for p in info.prefix}
+            if len(info.prefix) > MAX_SET_SIZE:
+                info.prefix = {""}
+        if len(info.suffix) > MAX_SET_SIZE or any(len(s) > 2 for s in info.suffix):
+            info.match = query_and(info.match, query_for_strings(info.suffix))
+            info.suffix = {s[-2:] for s in info.suffix}
+            if len(info.suffix) > MAX_SET_SIZE:
+                info.suffix = {s[-1:] for s in info.suffix}
+            if len(info.suffix) > MAX_SET_SIZE:
+                info.suffix = {""}
+
+    return info
+
+
+def _chars(chars: set[str]) -> RegexInfo:
+    return RegexInfo(emptyable=False, exact={fold(c) for c in chars})
+
+
+def _char_variants(codepoint: int, flags: int) -> Optional[set[str]]:
+    """The characters matched by a literal, or None if these are not known"""
+    char = chr(codepoint)
+
+    if flags & re.IGNORECASE and char.lower() != char.upper():
+        # Only the case-insensitive matching of ASCII letters is covered by the folding
+        if not char.isascii():
+            return None
+        return {char.lower()}
+
+    return {char}
+
+
+def _class_chars(items: list, flags: int) -> Optional[set[str]]:
+    """The characters matched by a character class, or None if there are too many or unknown"""
+    chars: set[str] = set()
+
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            variants = _char_variants(av, flags)
+        elif op is sre_constants.RANGE:
+            low, high = av
+            if high - low >= MAX_CLASS_SIZE:
+                return None
+            variants = set()
+            for codepoint in range(low, high + 1):
+                variant = _char_variants(codepoint, flags)
+                if variant is None:
+                    return None
+                variants |= variant
+        else:
+            # NEGATE, CATEGORY and the like
+            return None
+
+        if variants is None:
+            return None
+        chars |= variants
+        if len(chars) > MAX_CLASS_SIZE:
+            return None
+
+    return chars
+
+
+def _prefixes(info: RegexInfo) -> set[str]:
+    """Strings that every match of info starts with"""
+    prefixes = set(info.exact) if info.exact is not None else set(info.prefix)
+    return prefixes | {""} if info.emptyable else prefixes
+
+
+def _suffixes(info: RegexInfo) -> set[str]:
+    """Strings that every match of info ends with"""
+    suffixes = set(info.exact) if info.exact is not None else set(info.suffix)
+    return suffixes | {""} if info.emptyable else suffixes
+
+
+def _concat(left: RegexInfo, right: RegexInfo) -> RegexInfo:
+    match = query_and(left.match, right.match)
+
+    if left.exact is not None and right.exact is not None:
+        return _simplify(RegexInfo(
+            emptyable=left.emptyable and right.emptyable,
+            exact=_cross(left.exact, right.exact),
+            match=match
+        ))
+
+    if left.exact is not None:
+        prefix = _cross(left.exact, _prefixes(right))
+    elif left.emptyable:
+        prefix = left.prefix | _prefixes(right)
+    else:
+        prefix = set(left.prefix)
+
+    if right.exact is not None:
+        suffix = _cross(_suffixes(left), right.exact)
+    elif right.emptyable:
+        suffix = right.suffix | _suffixes(left)
+    else:
+        suffix = set(right.suffix)
+
+    if left.exact is None and right.exact is None:
+        # Matches crossing the boundary between left and right contain trigrams as well
+        match = query_and(match, query_for_strings(_cross(_suffixes(left), _prefixes(right))))
+
+    return _simplify(RegexInfo(
+        emptyable=left.emptyable and right.emptyable,
+        exact=None,
+        prefix=prefix,
+        suffix=suffix,
+        match=match
+    ))
+
+
+def _alternate(left: RegexInfo, right: RegexInfo) -> RegexInfo:
+    if left.exact is not None and right.exact is not None:
+        return _simplify(RegexInfo(
+            emptyable=left.emptyable or right.emptyable,
+            exact=left.exact | right.exact,
+            match=query_or(left.match, right.match)
+        ))
+
+    if left.exact is not None:
+        left = _simplify(left, force=True)
+    if right.exact is not None:
+        right = _simplify(right, force=True)
+
+    return _simplify(RegexInfo(
+        emptyable=left.emptyable or right.emptyable,
+        exact=None,
+        prefix=left.prefix | right.prefix,
+        suffix=left.suffix | right.suffix,
+        match=query_or(left.match, right.match)
+    ))
+
+
+def _analyze_sequence(subpattern: Iterable, flags: int) -> RegexInfo:
+    info = _empty_string()
+    for op, av in subpattern:
+        info = _concat(info, _analyze(op, av, flags))
+    return info
+
+
+def _analyze(op, av, flags: int) -> RegexInfo:  # pylint: disable=too-many-return-statements,too-many-branches
+    if op is sre_constants.LITERAL:
+        variants = _char_variants(av, flags)
+        return _any_char() if variants is None else _chars(variants)
+
+    if op is sre_constants.IN:
+        chars = _class_chars(av, flags)
+        return _any_char() if chars is None else _chars(chars)
+
+    if op in (sre_constants.ANY, sre_constants.NOT_LITERAL):
+        return _any_char()
+
+    if op is sre_constants.SUBPATTERN:
+        _group, add_flags, del_flags, subpattern = av
+        return _analyze_sequence(subpattern, (flags | add_flags) & ~del_flags)
+
+    if op is sre_constants.BRANCH:
+        _unused, branches = av
+        info = None
+        for branch in branches:
+            branch_info = _analyze_sequence(branch, flags)
+            info = branch_info if info is None else _alternate(info, branch_info)
+        return info if info is not None else _empty_string()
+
+    if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) or op.name == "POSSESSIVE_REPEAT":
+        minimum, maximum, subpattern = av
+        sub = _analyze_sequence(subpattern, flags)
+
+        if minimum == 0:
+            if maximum == 1 and sub.exact is not None:
+                # x?
+                return _simplify(RegexInfo(emptyable=True, exact=sub.exact | {""}, match=ALL))
+            return _any_string()
+
+        if minimum == 1 and maximum == 1:
+            return sub
+
+        # x+, x{n,m}: at least one x, followed by anything
+        sub = _simplify(sub, force=True)
+        return RegexInfo(
+            emptyable=sub.emptyable,
+            exact=None,
+            prefix=sub.prefix,
+            suffix=sub.suffix,
+            match=sub.match
+        )
+
+    if op.name == "ATOMIC_GROUP":
+        return _analyze_sequence(av, flags)
+
+    if op in (sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+        # Zero-width
+        return _empty_string()
+
+    # Backreferences, conditionals and anything else we do not know about may match anything
+    return _any_string()
+
+
+def regexp_query(pattern: re.Pattern) -> TrigramQuery:
+    """Translate a compiled regex into a trigram query that holds for every text it matches in"""
+    if not isinstance(pattern.pattern, str):
+        return ALL
+
+    parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    info = _analyze_sequence(parsed, pattern.flags | parsed.state.flags)
+
+    if info.exact is not None:
+        return query_and(info.match, query_for_strings(info.exact))
+
+    return query_and(
+        info.match,
+        query_for_strings(info.prefix),
+        query_for_strings(info.suffix)
+    )
+
+
+# Index lookups
+
+def _lookup_postings(trigrams: set[str]) -> dict[str, set[int]]:
+    postings: dict[str, set[int]] = {trigram: set() for trigram in trigrams}
+
+    for posting in TrigramPosting.objects.filter(trigram__in=trigrams).iterator():
+        postings[posting.trigram].update(decode_postings(posting.postings))
+
+    return postings
+
+
+def _collect_trigrams(query: TrigramQuery) -> set[str]:
+    trigrams = set(query.trigrams)
+    for subquery in query.subqueries:
+        trigrams |= _collect_trigrams(subquery)
+    return trigrams
+
+
+def _evaluate(query: TrigramQuery, postings: dict[str, set[int]]) -> Optional[set[int]]:
+    """Evaluate a query to a set of uitspraak ids; None means all uitspraken"""
+    if query.op == "all":
+        return None
+    if query.op == "none":
+        return set()
+
+    results = [postings[trigram] for trigram in query.trigrams]
+    results += [_evaluate(subquery, postings) for subquery in query.subqueries]
+
+    if query.op == "and":
+        known = sorted((r for r in results if r is not None), key=len)
+        if not known:
+            return None
+        return known[0].intersection(*known[1:])
+
+    if any(r is None for r in results):
+        return None
+    return set().union(*results)
+
+
+def regexp_candidates(pattern: re.Pattern) -> Optional[set[int]]:
+    """Return the ids of the indexed uitspraken which may contain a match for pattern
+
+    Returns None if the pattern cannot be indexed, or if there is no trigram index; in that case,
+    all uitspraken need to be scanned. Uitspraken which have not been indexed (yet) are never
+    part of the returned set and always need to be scanned, see Uitspraak.trigram_indexed.
+    """
+    query = regexp_query(pattern)
+    logger.debug("Trigram query for %s: %s", pattern.pattern, query)
+
+    if query.op == "all":
+        logger.info("Pattern %s cannot be indexed", pattern.pattern)
+        return None
+
+    if not Uitspraak.objects.filter(trigram_indexed=True).exists():
+        logger.info("There is no trigram index")
+        return None
+
+    return _evaluate(query, _lookup_postings(_collect_trigrams(query)))
+
+
+def _load_tekst(chunk: list[Uitspraak], candidates: set[int]) -> Iterator[tuple[Uitspraak, Optional[str]]]:
+    scan = [uitspraak.id for uitspraak in chunk if uitspraak.id in candidates or not uitspraak.trigram_indexed]
+    teksten = dict(Uitspraak.objects.filter(id__in=scan).values_list("id", "tekst")) if scan else {}
+
+    for uitspraak in chunk:
+        yield uitspraak, teksten.get(uitspraak.id)
+
+
+def with_candidate_tekst(
+    uitspraken: QuerySet[Uitspraak], candidates: Optional[set[int]], chunk_size: int = 2000
+) -> Iterator[tuple[Uitspraak, Optional[str]]]:
+    """Iterate over the uitspraken with their tekst, or None if the trigram index rules out a match
+
+    Without candidates (see regexp_candidates()), the tekst is loaded with the uitspraken. Otherwise,
+    it is deferred, and only the tekst of the candidates and of the uitspraken that are not indexed
+    is loaded, with one query per chunk.
+    """
+    if candidates is None:
+        for uitspraak in uitspraken.iterator(chunk_size=chunk_size):
+            yield uitspraak, uitspraak.tekst
+        return
+
+    chunk = []
+    for uitspraak in uitspraken.defer("raw_xml", "tekst").iterator(chunk_size=chunk_size):
+        chunk.append(uitspraak)
+        if len(chunk) == chunk_size:
+            yield from _load_tekst(chunk, candidates)
+            chunk = []
+
+    yield from _load_tekst(chunk, candidates)
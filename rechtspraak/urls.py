@@ -0,0 +1,25 @@
+"""
+    rechtspraak/urls.py
+
+    URL configuration of the read-only JSON API.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+from django.urls import path
+
+from rechtspraak import views
+
+app_name = "rechtspraak"
+
+urlpatterns = [
+    path("counts/", views.counts, name="counts"),
+    path("uitspraken/", views.uitspraak_list, name="uitspraak_list"),
+    path("uitspraken.<str:export_format>", views.uitspraak_stream, name="uitspraak_stream"),
+    path("uitspraken/batch/", views.uitspraak_batch, name="uitspraak_batch"),
+    path("uitspraken/<str:ecli>/", views.uitspraak_detail, name="uitspraak_detail"),
+]
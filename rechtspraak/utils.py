@@ -16,11 +16,23 @@ import datetime
 import logging
 import xml.etree.ElementTree as ET
 
-import requests
+from dataclasses import dataclass
+from typing import Optional
 
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError
+from django.utils import timezone
+
+from rechtspraak.blobstore import raw_xml_store, store_raw_xml
+from rechtspraak.counts import uitspraak_contribution, update_counts
 from rechtspraak.models import Instantie, Rechtsgebied, ProcedureSoort, Uitspraak
+from rechtspraak.profiling import stage, timed
 
 logger = logging.getLogger(__name__)
+
+INSTANTIE_TYPES_KEY = "rechtspraak:instantie_types"
+
 XML_NAMESPACES = {
     "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
     "dcterms": "http://purl.org/dc/terms/",
@@ -31,8 +43,26 @@ XML_NAMESPACES = {
 }
 
 
-def create_uitspraak_from_xmlstring(xmlstring: str, xmlfilename: str) -> Uitspraak:
-    """Create a new Uitspraak object based on an XML string as provided by de Rechtspraak.
+@dataclass
+class ParsedUitspraak:
+    """The fields of an uitspraak as parsed from its XML, before the instantie and labels are looked up"""
+
+    ecli: str
+    instantie_naam: str
+    zaaknummer: str
+    publicatiedatum: Optional[datetime.datetime]
+    uitspraakdatum: Optional[datetime.datetime]
+    uitspraak_type: str
+    procedure_identifiers: list[str]
+    rechtsgebied_identifiers: list[str]
+    inhoudsindicatie: str
+    tekst: str
+    raw_xml: str
+
+
+@timed("parse")
+def parse_uitspraak_xml(xmlstring: str, xmlfilename: str) -> ParsedUitspraak:
+    """Parse an XML string as provided by de Rechtspraak, without touching the database.
 
     The expected XML structure is based on the structure as described in "Open Data van de Rechtspraak",
     version 1.15, dated 2019-03-20.
@@ -47,12 +77,6 @@ def create_uitspraak_from_xmlstring(xmlstring: str, xmlfilename: str) -> Uitspra
     ecli = xmlroot.find("rdf:RDF/rdf:Description/dcterms:identifier", XML_NAMESPACES).text
     instantie_naam = xmlroot.find("rdf:RDF/rdf:Description/dcterms:creator", XML_NAMESPACES).text
 
-    try:
-        instantie = Instantie.objects.get(naam=instantie_naam)
-    except Instantie.DoesNotExist:
-        logger.error("Could not find instantie for naam %s", instantie_naam)
-        instantie = Instantie.objects.get(afkorting="XX")
-
     try:
         uitspraakdatum = datetime.datetime.strptime(
             xmlroot.find("rdf:RDF/rdf:Description/dcterms:date", XML_NAMESPACES).text,
@@ -82,16 +106,10 @@ def create_uitspraak_from_xmlstring(xmlstring: str, xmlfilename: str) -> Uitspra
         uitspraak_type = "Uitspraak"
 
     proceduresoorten_xml = xmlroot.findall("rdf:RDF/rdf:Description/psi:procedure", XML_NAMESPACES)
-    proceduresoorten: list[ProcedureSoort] = []
-
-    for proceduresoort_xml in proceduresoorten_xml:
-        proceduresoorten.append(ProcedureSoort.objects.get(identifier=proceduresoort_xml.get("resourceIdentifier")))
+    procedure_identifiers = [proceduresoort_xml.get("resourceIdentifier") for proceduresoort_xml in proceduresoorten_xml]
 
     rechtsgebieden_xml = xmlroot.findall("rdf:RDF/rdf:Description/dcterms:subject", XML_NAMESPACES)
-    rechtsgebieden: list[Rechtsgebied] = []
-
-    for rechtsgebied_xml in rechtsgebieden_xml:
-        rechtsgebieden.append(Rechtsgebied.objects.get(identifier=rechtsgebied_xml.get("resourceIdentifier")))
+    rechtsgebied_identifiers = [rechtsgebied_xml.get("resourceIdentifier") for rechtsgebied_xml in rechtsgebieden_xml]
 
     inhoudsindicatie_xml = xmlroot.find("rs:inhoudsindicatie", XML_NAMESPACES)
     inhoudsindicatie = ""
@@ -121,33 +139,87 @@ def create_uitspraak_from_xmlstring(xmlstring: str, xmlfilename: str) -> Uitspra
         except AttributeError:
             logger.error("Neither uitspraak nor conclusie in XML %s", xmlfilename)
 
-    uitspraak, created = Uitspraak.objects.update_or_create(
+    return ParsedUitspraak(
         ecli=ecli,
-        instantie=instantie
+        instantie_naam=instantie_naam,
+        zaaknummer=zaaknummer,
+        publicatiedatum=publicatiedatum,
+        uitspraakdatum=uitspraakdatum,
+        uitspraak_type=uitspraak_type,
+        procedure_identifiers=procedure_identifiers,
+        rechtsgebied_identifiers=rechtsgebied_identifiers,
+        inhoudsindicatie=inhoudsindicatie,
+        tekst=uitspraak_text,
+        raw_xml=xmlstring
     )
 
-    uitspraak.zaaknummer = zaaknummer
-    uitspraak.publicatiedatum = publicatiedatum
-    uitspraak.uitspraakdatum = uitspraakdatum
-    uitspraak.raw_xml = xmlstring
 
-    uitspraak.inhoudsindicatie = inhoudsindicatie
-    uitspraak.tekst = uitspraak_text
+def create_uitspraak_from_xmlstring(xmlstring: str, xmlfilename: str) -> Uitspraak:
+    """Create a new Uitspraak object based on an XML string as provided by de Rechtspraak.
+
+    xmlstring -- the actual XML in string format
+    xmlfilename -- the filename the XML string was read from; only used for logging purposes.
+
+    Call bump_data_version() once all uitspraken have been created.
+    """
+    parsed = parse_uitspraak_xml(xmlstring, xmlfilename)
 
-    uitspraak.uitspraak_type = uitspraak_type
+    with stage("lookup"):
+        try:
+            instantie = Instantie.objects.get(naam=parsed.instantie_naam)
+        except Instantie.DoesNotExist:
+            logger.error("Could not find instantie for naam %s", parsed.instantie_naam)
+            instantie = Instantie.objects.get(afkorting="XX")
+
+        proceduresoorten = [ProcedureSoort.objects.get(identifier=identifier) for identifier in parsed.procedure_identifiers]
+        rechtsgebieden = [Rechtsgebied.objects.get(identifier=identifier) for identifier in parsed.rechtsgebied_identifiers]
+
+    with stage("write"):
+        uitspraak, created = Uitspraak.objects.update_or_create(
+            ecli=parsed.ecli,
+            instantie=instantie
+        )
 
-    for proceduresoort in proceduresoorten:
-        uitspraak.procedure_soorten.add(proceduresoort)
+        if created:
+            counts_before = None
+            rechtsgebied_ids: set[int] = set()
+        else:
+            rechtsgebied_ids = set(uitspraak.rechtsgebieden.values_list("id", flat=True))
+            counts_before = uitspraak_contribution(uitspraak, rechtsgebied_ids)
 
-    for rechtsgebied in rechtsgebieden:
-        uitspraak.rechtsgebieden.add(rechtsgebied)
+        uitspraak.zaaknummer = parsed.zaaknummer
+        uitspraak.publicatiedatum = parsed.publicatiedatum
+        uitspraak.uitspraakdatum = parsed.uitspraakdatum
+        uitspraak.raw_xml, uitspraak.raw_xml_hash = store_raw_xml(parsed.raw_xml)
 
-    uitspraak.save()
+        uitspraak.inhoudsindicatie = parsed.inhoudsindicatie
+        if uitspraak.tekst != parsed.tekst:
+            uitspraak.tekst_modified = timezone.now()
+        uitspraak.tekst = parsed.tekst
+        uitspraak.trigram_indexed = False
+
+        uitspraak.uitspraak_type = parsed.uitspraak_type
+
+        for proceduresoort in proceduresoorten:
+            uitspraak.procedure_soorten.add(proceduresoort)
+
+        for rechtsgebied in rechtsgebieden:
+            uitspraak.rechtsgebieden.add(rechtsgebied)
+
+        store = raw_xml_store()
+        if store is not None:
+            # The raw XML must be on disk before the hash referring to it is saved
+            store.flush()
+
+        uitspraak.save()
+
+        rechtsgebied_ids.update(rechtsgebied.id for rechtsgebied in rechtsgebieden)
+        update_counts(counts_before, uitspraak_contribution(uitspraak, rechtsgebied_ids))
 
     if created:
-        logger.info("Successfully created uitspraak %s", uitspraak)
+        logger.debug("Successfully created uitspraak %s", uitspraak)
     else:
-        logger.info("Successfully updated uitspraak %s", uitspraak)
+        logger.debug("Successfully updated uitspraak %s", uitspraak)
 
     return uitspraak
 
@@ -155,10 +227,16 @@ def create_uitspraak_from_xmlstring(xmlstring: str, xmlfilename: str) -> Uitspra
 def create_uitspraak_from_ecli(ecli: str) -> Uitspraak:
     """
     Create an Uitspraak by retrieving the XML from the Open Data Rechtspraak API.
+
+    Call bump_data_version() once all uitspraken have been created.
     """
 
+    # pylint: disable=import-outside-toplevel
+    import requests
+
     api_url = "https://data.rechtspraak.nl/uitspraken/content"
-    resp = requests.get(api_url, params={"id": ecli}, timeout=25)
+    with stage("fetch"):
+        resp = requests.get(api_url, params={"id": ecli}, timeout=25)
 
     xmlstring = resp.text
 
@@ -170,6 +248,9 @@ def open_data_rechtspraak_api_request(params: dict, start: int, max: int) -> lis
     Query the ECLI index from Open Data Rechtspraak
     """
 
+    # pylint: disable=import-outside-toplevel
+    import requests
+
     api_url = "https://data.rechtspraak.nl/uitspraken/zoeken"
 
     params["from"] = start
@@ -177,7 +258,8 @@ def open_data_rechtspraak_api_request(params: dict, start: int, max: int) -> lis
 
     logger.debug(params)
 
-    resp = requests.get(api_url, params=params, timeout=25)
+    with stage("fetch"):
+        resp = requests.get(api_url, params=params, timeout=25)
 
     if resp.status_code != 200:
         # TODO error handling
@@ -231,3 +313,29 @@ def get_updated_eclis_for_instantie_since(instantie: Instantie, since: datetime.
         eclis.append(ecli)
 
     return eclis
+
+
+def instantie_types(refresh: bool = False) -> list[str]:
+    """The instantie types in the database
+
+    Cached, as they hardly ever change; refresh to look them up in the database anyway.
+    """
+    types = None if refresh else cache.get(INSTANTIE_TYPES_KEY)
+
+    if types is None:
+        types = list(Instantie.objects.order_by("instantie_type").values_list("instantie_type", flat=True).distinct())
+        cache.set(INSTANTIE_TYPES_KEY, types, timeout=settings.RECHTSPRAAK_CACHE_TIMEOUT)
+
+    return types
+
+
+def check_instantie_type(instantie_type: str) -> None:
+    """Raise a CommandError if there are no instanties of type instantie_type
+
+    Commands check this after parsing their arguments, instead of listing the instantie types as
+    choices, so that constructing a command (e.g. for --help) does not need the database.
+    """
+    if instantie_type in instantie_types() or instantie_type in instantie_types(refresh=True):
+        return
+
+    raise CommandError(f"Unknown instantie type {instantie_type!r}, choose from: {', '.join(instantie_types())}")
@@ -1,6 +1,8 @@
 """
     rechtspraak/views.py
 
+    The read-only JSON API for uitspraken.
+
     Copyright 2023, Martijn Staal <uitspraken [at] martijn-staal.nl>
 
     Available under the EUPL-1.2, or, at your option, any later version.
@@ -8,6 +10,227 @@
     SPDX-License-Identifier: EUPL-1.2
 """
 
-from django.shortcuts import render
+import asyncio
+import csv
+import datetime
+import io
+import json
+import logging
+
+from typing import AsyncIterator, Iterator, Optional
+
+from django.conf import settings
+from django.db.models import QuerySet
+from django.http import HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition, require_GET, require_POST
+
+from rechtspraak.api import (
+    DEFAULT_DETAIL_FIELDS, DEFAULT_LIST_FIELDS, ApiError, fetch_uitspraken, filter_uitspraken, page, parse_fields,
+    parse_limit, select_fields, serialize_uitspraak
+)
+from rechtspraak.cache import cache_response
+from rechtspraak.counts import REPORTS, counts_report
+from rechtspraak.export import DEFAULT_CHUNK_SIZE
+from rechtspraak.models import Uitspraak
+
+logger = logging.getLogger(__name__)
+
+# ETags are added from the response content by ConditionalGetMiddleware, which also answers
+# If-None-Match and If-Modified-Since with 304 Not Modified. GZipMiddleware compresses responses.
+
+
+def json_response(data: dict, status: int = 200) -> JsonResponse:
+    """A JSON response that may be cached by clients and proxies for API_CACHE_MAX_AGE seconds"""
+    response = JsonResponse(data, status=status, json_dumps_params={"ensure_ascii": False})
+    if status == 200:
+        patch_cache_control(response, public=True, max_age=settings.API_CACHE_MAX_AGE)
+    return response
+
+
+def _last_modified(request: HttpRequest, ecli: str) -> Optional[datetime.datetime]:
+    return Uitspraak.objects.filter(ecli=ecli).values_list("last_modified", flat=True).first()
+
+
+@require_GET
+@cache_response("uitspraak_detail")
+@condition(last_modified_func=_last_modified)
+def uitspraak_detail(request: HttpRequest, ecli: str) -> HttpResponse:
+    """A single uitspraak by its ECLI"""
+    try:
+        fields = parse_fields(request.GET.get("fields"), DEFAULT_DETAIL_FIELDS)
+    except ApiError as exc:
+        return json_response({"error": str(exc)}, status=400)
+
+    uitspraak = select_fields(Uitspraak.objects.filter(ecli=ecli), fields).first()
+    if uitspraak is None:
+        return json_response({"error": f"Uitspraak {ecli} not found"}, status=404)
+
+    return json_response(serialize_uitspraak(uitspraak, fields))
+
+
+@require_GET
+@cache_response("uitspraak_list")
+def uitspraak_list(request: HttpRequest) -> HttpResponse:
+    """A page of uitspraken, ordered by uitspraakdatum, optionally filtered
+
+    Pass the next_cursor of a response as the cursor parameter to get the next page. Lists have no
+    Last-Modified, as the latest change to any uitspraak matching the filters would take a scan of
+    all of them; clients revalidate with the ETag of the content instead.
+    """
+    try:
+        fields = parse_fields(request.GET.get("fields"), DEFAULT_LIST_FIELDS)
+        limit = parse_limit(request.GET.get("limit"))
+        uitspraken, next_cursor = page(
+            select_fields(filter_uitspraken(request.GET), fields),
+            request.GET.get("cursor"),
+            limit
+        )
+    except ApiError as exc:
+        return json_response({"error": str(exc)}, status=400)
+
+    data: dict = {
+        "results": [serialize_uitspraak(uitspraak, fields) for uitspraak in uitspraken],
+        "next_cursor": next_cursor,
+        "next": None
+    }
+
+    if next_cursor is not None:
+        params = request.GET.copy()
+        params["cursor"] = next_cursor
+        data["next"] = f"{request.path}?{params.urlencode()}"
+
+    return json_response(data)
+
+
+def _batch_content(eclis: list[str], fields: list[str]) -> Iterator[str]:
+    missing = []
+
+    yield '{"results": ['
+    first = True
+    for ecli, uitspraak in fetch_uitspraken(eclis, fields):
+        if uitspraak is None:
+            missing.append(ecli)
+            continue
+
+        if not first:
+            yield ", "
+        yield json.dumps(serialize_uitspraak(uitspraak, fields), ensure_ascii=False)
+        first = False
+
+    yield f'], "missing": {json.dumps(missing, ensure_ascii=False)}}}'
+
+
+@csrf_exempt
+@require_POST
+def uitspraak_batch(request: HttpRequest) -> HttpResponse:
+    """Many uitspraken at once, by ECLI
+
+    Expects a JSON body like {"eclis": ["ECLI:NL:HR:2024:1", ...]}, with at most API_MAX_BATCH_SIZE
+    ECLIs. The results are streamed in the order of the request; ECLIs that are not in the database
+    are listed under "missing".
+    """
+    try:
+        fields = parse_fields(request.GET.get("fields"), DEFAULT_LIST_FIELDS)
+
+        try:
+            eclis = json.loads(request.body)["eclis"]
+        except (ValueError, KeyError, TypeError) as exc:
+            raise ApiError('Expected a JSON body like {"eclis": ["ECLI:NL:HR:2024:1"]}') from exc
+
+        if not isinstance(eclis, list) or not all(isinstance(ecli, str) for ecli in eclis):
+            raise ApiError("eclis must be a list of strings")
+
+        if len(eclis) > settings.API_MAX_BATCH_SIZE:
+            raise ApiError(f"At most {settings.API_MAX_BATCH_SIZE} ECLIs can be requested at once")
+    except ApiError as exc:
+        return json_response({"error": str(exc)}, status=400)
+
+    return StreamingHttpResponse(
+        _batch_content([ecli.strip() for ecli in eclis], fields),
+        content_type="application/json"
+    )
+
+
+@require_GET
+@cache_response("counts")
+def counts(request: HttpRequest) -> HttpResponse:
+    """The number of uitspraken per instantie type (default), per instantie type and year, or per rechtsgebied"""
+    report = request.GET.get("per", "instantie_type")
+    if report not in REPORTS:
+        return json_response({"error": f"per must be one of {', '.join(REPORTS)}"}, status=400)
+
+    return json_response({"results": counts_report(report)})
+
+
+# Rows are sent to the client in messages of about this many characters
+STREAM_BUFFER_SIZE = 1 << 16
+
+STREAM_CONTENT_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _csv_value(value: object) -> object:
+    return "; ".join(value) if isinstance(value, list) else value
+
+
+async def _stream_uitspraken(uitspraken: QuerySet[Uitspraak], fields: list[str], export_format: str) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    csvwr = csv.writer(buffer)
+    streamed = 0
+
+    if export_format == "csv":
+        csvwr.writerow(fields)
+
+    try:
+        # Under ASGI, the next chunk is only fetched when the client has received the previous
+        # messages. On PostgreSQL, aiterator reads the chunks from a server-side cursor, so a slow
+        # client holds at most one chunk in memory; other databases, such as SQLite, fetch them
+        # from an ordinary cursor, whose driver may hold more of the result. Under WSGI, Django
+        # collects the whole response in memory before sending it.
+        async for uitspraak in uitspraken.aiterator(chunk_size=DEFAULT_CHUNK_SIZE):
+            record = serialize_uitspraak(uitspraak, fields)
+
+            if export_format == "csv":
+                csvwr.writerow([_csv_value(value) for value in record.values()])
+            else:
+                buffer.write(json.dumps(record, ensure_ascii=False))
+                buffer.write("\n")
+
+            streamed += 1
+            if buffer.tell() >= STREAM_BUFFER_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        yield buffer.getvalue()
+    except (asyncio.CancelledError, GeneratorExit):
+        # The client disconnected; the ASGI handler cancels the response, which closes the cursor
+        logger.info("Client disconnected after %s uitspraken", streamed)
+        raise
+
+    logger.info("Streamed %s uitspraken", streamed)
+
+
+@require_GET
+async def uitspraak_stream(request: HttpRequest, export_format: str) -> HttpResponse:
+    """All uitspraken matching the filters of uitspraak_list, streamed as NDJSON or CSV
+
+    Only streams incrementally when served over ASGI (uitspraken.asgi); under WSGI the response is
+    built in memory first.
+    """
+    if export_format not in STREAM_CONTENT_TYPES:
+        return json_response({"error": f"Format must be one of {', '.join(STREAM_CONTENT_TYPES)}"}, status=404)
+
+    try:
+        fields = parse_fields(request.GET.get("fields"), DEFAULT_LIST_FIELDS)
+        uitspraken = select_fields(filter_uitspraken(request.GET), fields).order_by("id")
+    except ApiError as exc:
+        return json_response({"error": str(exc)}, status=400)
 
-# Create your views here.
+    response = StreamingHttpResponse(
+        _stream_uitspraken(uitspraken, fields, export_format),
+        content_type=f"{STREAM_CONTENT_TYPES[export_format]}; charset=utf-8"
+    )
+    response["Content-Disposition"] = f'attachment; filename="uitspraken.{export_format}"'
+    return response
@@ -0,0 +1,230 @@
+"""
+    rechtspraak/waardelijsten.py
+
+    Synchronisation of the instanties, rechtsgebieden and procedures with the waardelijsten of Open
+    Data Rechtspraak.
+
+    The waardelijsten are fetched concurrently, with conditional requests: the ETag and
+    Last-Modified of the last download of a waardelijst are kept in the cache, so a waardelijst
+    that has not changed since is not downloaded again. As the cache may outlive the database, a
+    waardelijst whose table is empty is always downloaded. A downloaded waardelijst is compared with
+    the database in memory, and only the new and changed rows are written, with a bulk upsert; all
+    waardelijsten are written in a single transaction. Rows that are no longer in a waardelijst are
+    kept, as uitspraken may refer to them.
+
+    Copyright 2025 Martijn Staal <uitspraken [at] martijn-staal.nl>
+
+    Available under the EUPL-1.2, or, at your option, any later version.
+
+    SPDX-License-Identifier: EUPL-1.2
+"""
+
+import datetime
+import logging
+import xml.etree.ElementTree as ET
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Optional
+
+from django.core.cache import cache
+from django.db import models, transaction
+
+from rechtspraak.cache import bump_data_version
+from rechtspraak.models import Instantie, ProcedureSoort, Rechtsgebied
+from rechtspraak.profiling import stage
+from rechtspraak.utils import instantie_types
+
+logger = logging.getLogger(__name__)
+
+VALIDATORS_KEY = "rechtspraak:waardelijst:{}"
+
+# The begin date of instanties for which the waardelijst does not give one
+UNKNOWN_BEGIN_DATE = datetime.date(1000, 1, 1)
+
+
+def _date(text: Optional[str]) -> Optional[datetime.date]:
+    return datetime.date.fromisoformat(text) if text else None
+
+
+def parse_instanties(content: bytes) -> list[dict[str, Any]]:
+    """The instanties in the waardelijst Instanties, as values for the fields of Instantie"""
+    return [
+        {
+            "naam": instantie.findtext("Naam"),
+            "instantie_type": instantie.findtext("Type"),
+            "identifier": instantie.findtext("Identifier"),
+            "afkorting": instantie.findtext("Afkorting") or "",
+            "begin_date": _date(instantie.findtext("BeginDate")) or UNKNOWN_BEGIN_DATE,
+            "end_date": _date(instantie.findtext("EndDate"))
+        }
+        for instantie in ET.fromstring(content).iter("Instantie")
+    ]
+
+
+def _label_parser(tag: str) -> Callable[[bytes], list[dict[str, Any]]]:
+    def parse(content: bytes) -> list[dict[str, Any]]:
+        return [
+            {"naam": label.findtext("Naam"), "identifier": label.findtext("Identifier")}
+            for label in ET.fromstring(content).iter(tag)
+        ]
+
+    parse.__doc__ = f"The {tag} elements in a waardelijst, as values for their naam and identifier"
+    return parse
+
+
+@dataclass(frozen=True)
+class Waardelijst:
+    """A waardelijst of Open Data Rechtspraak and the model its rows are stored in"""
+
+    name: str
+    url: str
+    model: type[models.Model]
+    # The unique field by which rows of the waardelijst are matched with the database
+    key: str
+    fields: tuple[str, ...]
+    parse: Callable[[bytes], list[dict[str, Any]]]
+
+
+WAARDELIJSTEN = {
+    waardelijst.name: waardelijst for waardelijst in [
+        Waardelijst(
+            "instanties",
+            "https://data.rechtspraak.nl/Waardelijst/Instanties",
+            Instantie,
+            "naam",
+            ("naam", "instantie_type", "identifier", "afkorting", "begin_date", "end_date"),
+            parse_instanties
+        ),
+        Waardelijst(
+            "rechtsgebieden",
+            "https://data.rechtspraak.nl/Waardelijst/Rechtsgebieden",
+            Rechtsgebied,
+            "identifier",
+            ("naam", "identifier"),
+            _label_parser("Rechtsgebied")
+        ),
+        Waardelijst(
+            "procedures",
+            "https://data.rechtspraak.nl/Waardelijst/Proceduresoorten",
+            ProcedureSoort,
+            "identifier",
+            ("naam", "identifier"),
+            _label_parser("Proceduresoort")
+        ),
+    ]
+}
+
+
+@dataclass
+class SyncResult:
+    """What the synchronisation of a waardelijst changed"""
+
+    name: str
+    not_modified: bool = False
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    # Rows in the database that are not in the waardelijst (anymore)
+    missing: int = 0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.created or self.updated)
+
+    def __str__(self) -> str:
+        if self.not_modified:
+            return f"{self.name}: not modified"
+        return f"{self.name}: {self.created} created, {self.updated} updated, {self.unchanged} unchanged, {self.missing} not in the waardelijst"
+
+
+def fetch(waardelijst: Waardelijst, force: bool = False) -> tuple[Optional[bytes], dict[str, str]]:
+    """Download a waardelijst, unless it has not been modified since the last download
+
+    Returns the content, or None if it was not modified, and the validators of the response.
+    """
+    # pylint: disable=import-outside-toplevel
+    import requests
+
+    validators = {} if force else cache.get(VALIDATORS_KEY.format(waardelijst.name), {})
+
+    headers = {}
+    if "ETag" in validators:
+        headers["If-None-Match"] = validators["ETag"]
+    if "Last-Modified" in validators:
+        headers["If-Modified-Since"] = validators["Last-Modified"]
+
+    resp = requests.get(waardelijst.url, headers=headers, timeout=30)
+
+    if resp.status_code == 304:
+        return None, validators
+
+    resp.raise_for_status()
+    return resp.content, {name: resp.headers[name] for name in ["ETag", "Last-Modified"] if name in resp.headers}
+
+
+def apply_waardelijst(waardelijst: Waardelijst, rows: Iterable[dict[str, Any]]) -> SyncResult:
+    """Write the new and changed rows of a waardelijst to the database, with a single upsert"""
+    result = SyncResult(waardelijst.name)
+
+    existing = {values[waardelijst.key]: values for values in waardelijst.model.objects.values(*waardelijst.fields)}
+    # Later rows take precedence over earlier ones with the same key, as with one update_or_create per row
+    fetched = {row[waardelijst.key]: row for row in rows}
+
+    changes = []
+    for key, row in fetched.items():
+        if key not in existing:
+            result.created += 1
+        elif existing[key] != row:
+            result.updated += 1
+        else:
+            result.unchanged += 1
+            continue
+        changes.append(waardelijst.model(**row))
+
+    result.missing = len(existing.keys() - fetched.keys())
+
+    if changes:
+        waardelijst.model.objects.bulk_create(
+            changes,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=[waardelijst.key],
+            update_fields=[field for field in waardelijst.fields if field != waardelijst.key]
+        )
+
+    return result
+
+
+def sync_waardelijsten(names: Optional[Iterable[str]] = None, force: bool = False) -> list[SyncResult]:
+    """Synchronise the waardelijsten with the given names, by default all, with the database
+
+    force -- download the waardelijsten even if they have not been modified since the last download
+    """
+    waardelijsten = [WAARDELIJSTEN[name] for name in (names or WAARDELIJSTEN)]
+
+    # The validators in the cache say nothing about a table that is empty, e.g. in a new database
+    with stage("lookup"):
+        forced = [force or not waardelijst.model.objects.exists() for waardelijst in waardelijsten]
+
+    with stage("fetch"), ThreadPoolExecutor(max_workers=len(waardelijsten)) as executor:
+        fetched = list(executor.map(fetch, waardelijsten, forced))
+
+    results = []
+    with stage("write"), transaction.atomic():
+        for waardelijst, (content, _validators) in zip(waardelijsten, fetched):
+            if content is None:
+                results.append(SyncResult(waardelijst.name, not_modified=True))
+            else:
+                results.append(apply_waardelijst(waardelijst, waardelijst.parse(content)))
+
+    # Only now that the changes are committed, a next run may skip the waardelijsten that were not modified since
+    for waardelijst, (_content, validators) in zip(waardelijsten, fetched):
+        cache.set(VALIDATORS_KEY.format(waardelijst.name), validators, timeout=None)
+
+    if any(result.changed for result in results):
+        bump_data_version()
+    if any(result.changed for result in results if result.name == "instanties"):
+        instantie_types(refresh=True)
+
+    return results
@@ -49,6 +49,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'django.middleware.gzip.GZipMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -89,6 +91,23 @@ DATABASES = {
     }
 }
 
+# On PostgreSQL, partition the uitspraak table by year of uitspraakdatum (see rechtspraak/partitioning.py).
+# Applied by the migrations; an existing database can be converted with
+# ./manage.py create_uitspraak_partitions --convert
+
+RECHTSPRAAK_PARTITION_BY_YEAR = False
+
+# Keep the raw XML of uitspraken in pack files in this directory instead of in the database, e.g.
+# BASE_DIR / 'rawxml' (see rechtspraak/blobstore.py). Existing raw XML is moved there with
+# ./manage.py move_raw_xml_to_store
+
+RECHTSPRAAK_RAW_XML_STORE = None
+
+# The packed copy of the tekst of all uitspraken for fast scans, built with ./manage.py build_corpus_pack
+# (see rechtspraak/corpuspack.py)
+
+RECHTSPRAAK_CORPUS_PACK = BASE_DIR / 'corpuspack'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -131,6 +150,34 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache for responses of the JSON API and for reports, see rechtspraak/cache.py. The management
+# commands bump a data version in this cache when the data changes, so it must be shared between
+# the commands and the web server: use the file-based cache, or Redis, e.g.
+#     {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://127.0.0.1:6379"}
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000
+        }
+    }
+}
+
+# Number of seconds that cached responses and reports are kept, unless the data changes before
+
+RECHTSPRAAK_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Number of seconds that clients and proxies may cache responses of the JSON API
+
+API_CACHE_MAX_AGE = 60
+
+# The maximum number of ECLIs in a single request to the batch endpoint of the JSON API
+
+API_MAX_BATCH_SIZE = 10000
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -157,6 +204,7 @@ LOGGING = {
     },
     'root': {
         'handlers': ['console', 'file'],
-        'level': 'DEBUG',
+        # Per-uitspraak messages are logged at DEBUG; set this to 'DEBUG' to see them
+        'level': 'INFO',
     },
 }